@@ -3,16 +3,29 @@
 """
 Script pour ajouter la valeur "compo_structure" à chaque datasheet
 en analysant la composition et en générant des UUIDs pour les stats.
+
+Les UUIDs sont déterministes (uuid5 de l'id de la datasheet et du nom de la
+stat) : relancer le script sur un nouveau téléchargement redonne les mêmes ids.
+
+Sans fichier en argument, tous les fichiers de archive/ sont traités (--jobs N
+pour les répartir sur N processus) et les diagnostics (compositions illisibles,
+stats introuvables) sont regroupés dans un rapport JSON au lieu d'être affichés.
 """
 
+import argparse
 import json
 import os
 import re
 import sys
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from json_io import write_json_atomic
+
 # Icônes pour améliorer la lisibilité
 ICONS = {
     "success": "✅",
@@ -25,11 +38,24 @@ ICONS = {
     "skip": "⏭️"
 }
 
-def generate_uuid() -> str:
-    """Génère un UUID v4."""
-    return str(uuid.uuid4())
+# Rapport des diagnostics du mode dossier
+REPORT_FILE = "compo_structure_report.json"
+
+def report(diagnostics: Optional[List[Dict]], kind: str, message: str, **details) -> None:
+    """Affiche un diagnostic, ou l'ajoute à la liste diagnostics si elle est fournie."""
+    if diagnostics is None:
+        print(message)
+    else:
+        diagnostics.append({"type": kind, **details})
+
+# Espace de noms des UUIDs générés par ce script
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/jbtroissant/40KDataSource/compo_structure")
 
-def parse_composition_entry(entry: str) -> Tuple[str, int, int, int]:
+def generate_uuid(*parts: str) -> str:
+    """Génère un UUID v5 déterministe à partir de ses composants (ex: id de datasheet, nom de stat)."""
+    return str(uuid.uuid5(ID_NAMESPACE, "/".join(parts)))
+
+def parse_composition_entry(entry: str, diagnostics: Optional[List[Dict]] = None) -> Tuple[str, int, int, int]:
     """
     Parse une entrée de composition et retourne (nom, count, min, max).
     
@@ -53,7 +79,8 @@ def parse_composition_entry(entry: str) -> Tuple[str, int, int, int]:
     match = re.match(pattern, entry)
     
     if not match:
-        print(f"{ICONS['warning']} Impossible de parser l'entrée de composition: {entry}")
+        report(diagnostics, "unparsed_composition",
+               f"{ICONS['warning']} Impossible de parser l'entrée de composition: {entry}", entry=entry)
         return (entry, 1, 1, 1)
     
     min_count = int(match.group(1))
@@ -65,59 +92,97 @@ def parse_composition_entry(entry: str) -> Tuple[str, int, int, int]:
     
     return (name, count, min_count, max_count)
 
-def find_matching_stat_name(unit_name: str, stats: List[Dict]) -> Optional[str]:
+class StatIndex:
     """
-    Trouve le nom de stat correspondant au nom d'unité.
-    
-    Stratégies de correspondance:
-    1. Correspondance exacte
-    2. Correspondance sans pluriel (Outriders -> Outrider)
-    3. Correspondance partielle (Outrider Sergeant -> Outrider)
+    Index des stats d'une datasheet par nom, construit une fois par datasheet.
+
+    Les correspondances sont mémorisées par nom d'unité : une composition qui
+    répète un nom ne refait pas la recherche.
     """
-    # Nettoyer le nom
-    clean_unit_name = unit_name.strip()
-    
-    # 1. Correspondance exacte
-    for stat in stats:
-        if stat.get('name', '').strip() == clean_unit_name:
-            return stat.get('name')
-    
-    # 2. Correspondance sans pluriel
-    if clean_unit_name.endswith('s'):
-        singular_name = clean_unit_name[:-1]
+
+    def __init__(self, stats: List[Dict], datasheet_id: str = ""):
+        self.stats = stats
+        self.datasheet_id = datasheet_id
+        # Nom exact -> première stat de ce nom
+        self.by_name: Dict[str, Dict] = {}
+        # Nom sans espaces autour -> nom de la première stat correspondante
+        self.by_stripped: Dict[str, str] = {}
+        self.stripped_names: List[str] = []
         for stat in stats:
-            if stat.get('name', '').strip() == singular_name:
-                return stat.get('name')
-    
-    # 3. Correspondance partielle (pour les cas comme "Outrider Sergeant" -> "Outrider")
-    for stat in stats:
-        stat_name = stat.get('name', '').strip()
-        if stat_name in clean_unit_name or clean_unit_name in stat_name:
-            return stat_name
-    
-    # 4. Correspondance avec le nom de la datasheet (fallback)
-    return None
+            self.by_name.setdefault(stat.get('name'), stat)
+            self.by_stripped.setdefault(stat.get('name', '').strip(), stat.get('name'))
+            self.stripped_names.append(stat.get('name', '').strip())
+        self._matches: Dict[str, Optional[str]] = {}
+
+    def match_name(self, unit_name: str) -> Optional[str]:
+        """
+        Trouve le nom de stat correspondant au nom d'unité.
+
+        Stratégies de correspondance:
+        1. Correspondance exacte
+        2. Correspondance sans pluriel (Outriders -> Outrider)
+        3. Correspondance partielle (Outrider Sergeant -> Outrider)
+        """
+        if unit_name in self._matches:
+            return self._matches[unit_name]
+
+        # Nettoyer le nom
+        clean_unit_name = unit_name.strip()
 
-def ensure_stat_has_id(stat: Dict) -> str:
-    """S'assure qu'une stat a un ID, en génère un si nécessaire."""
+        # 1. Correspondance exacte, puis 2. sans pluriel
+        if clean_unit_name in self.by_stripped:
+            match = self.by_stripped[clean_unit_name]
+        elif clean_unit_name.endswith('s') and clean_unit_name[:-1] in self.by_stripped:
+            match = self.by_stripped[clean_unit_name[:-1]]
+        else:
+            # 3. Correspondance partielle (pour les cas comme "Outrider Sergeant" -> "Outrider")
+            match = next((stat_name for stat_name in self.stripped_names
+                          if stat_name in clean_unit_name or clean_unit_name in stat_name), None)
+
+        self._matches[unit_name] = match
+        return match
+
+    def stat_id(self, stat: Dict) -> str:
+        """
+        S'assure qu'une stat de la datasheet a un ID, en génère un (déterministe) si nécessaire.
+
+        Seule la première stat d'un nom est indexée (by_name) : deux stats de même
+        nom ne peuvent donc pas recevoir le même ID.
+        """
+        return ensure_stat_has_id(stat, self.datasheet_id)
+
+def find_matching_stat_name(unit_name: str, stats: List[Dict]) -> Optional[str]:
+    """Trouve le nom de stat correspondant au nom d'unité (voir StatIndex.match_name)."""
+    return StatIndex(stats).match_name(unit_name)
+
+def ensure_stat_has_id(stat: Dict, datasheet_id: str = "") -> str:
+    """S'assure qu'une stat a un ID, en génère un (déterministe) si nécessaire."""
     if 'id' not in stat:
-        stat['id'] = generate_uuid()
+        stat['id'] = generate_uuid(datasheet_id, "stat", stat.get('name', ''))
     return stat['id']
 
-def create_compo_structure(composition: List[str], stats: List[Dict]) -> List[Dict]:
+def create_compo_structure(composition: List[str], stats: List[Dict], datasheet_id: str = "",
+                           diagnostics: Optional[List[Dict]] = None) -> List[Dict]:
     """
     Crée la structure compo_structure à partir de la composition et des stats.
+
+    datasheet_id sert à dériver les UUIDs générés (stats sans id, entrées sans stat) ;
+    l'ID d'une entrée sans stat dépend aussi de sa position dans la composition,
+    deux entrées de même nom ont donc des IDs différents.
+    Si diagnostics est une liste, les avertissements y sont ajoutés au lieu d'être affichés.
     """
     compo_structure = []
+    index = StatIndex(stats, datasheet_id)
     
     # Si il n'y a qu'une seule stat, utiliser son ID pour toutes les entrées
     single_stat_id = None
     if len(stats) == 1:
-        single_stat_id = ensure_stat_has_id(stats[0])
-        print(f"{ICONS['info']} Une seule stat trouvée, utilisation de l'ID unique: {single_stat_id}")
+        single_stat_id = index.stat_id(stats[0])
+        if diagnostics is None:
+            print(f"{ICONS['info']} Une seule stat trouvée, utilisation de l'ID unique: {single_stat_id}")
     
-    for entry in composition:
-        name, count, min_count, max_count = parse_composition_entry(entry)
+    for position, entry in enumerate(composition):
+        name, count, min_count, max_count = parse_composition_entry(entry, diagnostics)
         
         # Si il n'y a qu'une seule stat, utiliser son ID
         if single_stat_id:
@@ -131,18 +196,14 @@ def create_compo_structure(composition: List[str], stats: List[Dict]) -> List[Di
             continue
         
         # Sinon, chercher la stat correspondante
-        matching_stat_name = find_matching_stat_name(name, stats)
+        matching_stat_name = index.match_name(name)
         
         if matching_stat_name:
             # Trouver la stat correspondante dans la liste
-            matching_stat = None
-            for stat in stats:
-                if stat.get('name') == matching_stat_name:
-                    matching_stat = stat
-                    break
+            matching_stat = index.by_name.get(matching_stat_name)
             
             if matching_stat:
-                stat_id = ensure_stat_has_id(matching_stat)
+                stat_id = index.stat_id(matching_stat)
                 
                 compo_structure.append({
                     "name": name,
@@ -152,21 +213,24 @@ def create_compo_structure(composition: List[str], stats: List[Dict]) -> List[Di
                     "max": max_count
                 })
             else:
-                print(f"{ICONS['warning']} Stat trouvée mais pas dans la liste: {matching_stat_name}")
+                report(diagnostics, "stat_not_in_list",
+                       f"{ICONS['warning']} Stat trouvée mais pas dans la liste: {matching_stat_name}",
+                       entry=name, stat=matching_stat_name)
                 # Créer une entrée avec un ID généré
                 compo_structure.append({
                     "name": name,
-                    "id": generate_uuid(),
+                    "id": generate_uuid(datasheet_id, "compo", name, str(position)),
                     "count": count,
                     "min": min_count,
                     "max": max_count
                 })
         else:
-            print(f"{ICONS['warning']} Aucune stat correspondante trouvée pour: {name}")
+            report(diagnostics, "unmatched_stat",
+                   f"{ICONS['warning']} Aucune stat correspondante trouvée pour: {name}", entry=name)
             # Créer une entrée avec un ID généré
             compo_structure.append({
                 "name": name,
-                "id": generate_uuid(),
+                "id": generate_uuid(datasheet_id, "compo", name, str(position)),
                 "count": count,
                 "min": min_count,
                 "max": max_count
@@ -174,67 +238,161 @@ def create_compo_structure(composition: List[str], stats: List[Dict]) -> List[Di
     
     return compo_structure
 
+def annotate_datasheets(data: Dict, diagnostics: Optional[List[Dict]] = None) -> int:
+    """
+    Ajoute compo_structure aux datasheets qui n'en ont pas encore.
+
+    Retourne le nombre de datasheets modifiées ; les diagnostics ajoutés à la
+    liste portent le nom et l'id de leur datasheet.
+    """
+    processed = 0
+    for datasheet in data['datasheets']:
+        # Vérifier si compo_structure existe déjà
+        if 'composition' in datasheet and 'stats' in datasheet and 'compo_structure' not in datasheet:
+            datasheet_diagnostics = None if diagnostics is None else []
+            datasheet['compo_structure'] = create_compo_structure(
+                datasheet['composition'],
+                datasheet['stats'],
+                datasheet.get('id') or datasheet.get('name', ''),
+                datasheet_diagnostics
+            )
+            processed += 1
+            if datasheet_diagnostics:
+                for diagnostic in datasheet_diagnostics:
+                    diagnostic.update(datasheet=datasheet.get('name'), datasheet_id=datasheet.get('id'))
+                diagnostics.extend(datasheet_diagnostics)
+    return processed
+
+def annotate_file(file_path: Path, diagnostics: Optional[List[Dict]] = None) -> Dict:
+    """
+    Ajoute compo_structure aux datasheets d'un fichier de faction.
+
+    Le fichier n'est réécrit que si au moins une datasheet a reçu sa
+    compo_structure (une sauvegarde .json.backup est créée la première fois).
+    Retourne {"file", "has_datasheets", "processed", "written", "backup"}.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    result = {"file": file_path.name, "has_datasheets": 'datasheets' in data,
+              "processed": 0, "written": False, "backup": None}
+    if not result["has_datasheets"]:
+        return result
+
+    result["processed"] = annotate_datasheets(data, diagnostics)
+    if result["processed"]:
+        # Sauvegarder avec backup
+        backup_path = file_path.with_suffix('.json.backup')
+        if not backup_path.exists():
+            os.rename(file_path, backup_path)
+            result["backup"] = backup_path.name
+        write_json_atomic(file_path, data)
+        result["written"] = True
+    return result
+
 def process_faction_file(file_path: Path) -> None:
-    """Traite un fichier de faction."""
+    """Traite un fichier de faction en affichant chaque étape."""
     print(f"{ICONS['processing']} Traitement de {file_path.name}...")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        result = annotate_file(file_path)
         
-        if 'datasheets' not in data:
+        if not result["has_datasheets"]:
             print(f"{ICONS['warning']} Pas de datasheets dans {file_path.name}")
-            return
-        
-        modified = False
-        processed_datasheets = 0
-        
-        for datasheet in data['datasheets']:
-            if 'composition' in datasheet and 'stats' in datasheet:
-                # Vérifier si compo_structure existe déjà
-                if 'compo_structure' not in datasheet:
-                    compo_structure = create_compo_structure(
-                        datasheet['composition'], 
-                        datasheet['stats']
-                    )
-                    datasheet['compo_structure'] = compo_structure
-                    modified = True
-                    processed_datasheets += 1
-        
-        if modified:
-            # Sauvegarder avec backup
-            backup_path = file_path.with_suffix('.json.backup')
-            if not backup_path.exists():
-                os.rename(file_path, backup_path)
-                print(f"{ICONS['info']} Backup créé: {backup_path.name}")
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            print(f"{ICONS['success']} {file_path.name} traité et sauvegardé ({processed_datasheets} datasheets modifiées)")
+        elif result["written"]:
+            if result["backup"]:
+                print(f"{ICONS['info']} Backup créé: {result['backup']}")
+            print(f"{ICONS['success']} {file_path.name} traité et sauvegardé ({result['processed']} datasheets modifiées)")
         else:
             print(f"{ICONS['skip']} {file_path.name} déjà traité ou pas de modifications")
     
     except Exception as e:
         print(f"{ICONS['error']} Erreur lors du traitement de {file_path.name}: {e}")
 
-def print_usage():
-    """Affiche l'utilisation du script."""
-    print(f"{ICONS['info']} Utilisation:")
-    print("  python add_compo_structure.py                    # Traite tous les fichiers du dossier archive")
-    print("  python add_compo_structure.py <fichier.json>     # Traite un seul fichier spécifique")
-    print("  python add_compo_structure.py --help             # Affiche cette aide")
+def run_faction_file(file_path: Path) -> Dict:
+    """
+    Traite un fichier pour le mode dossier, sans affichage.
+
+    Retourne le résultat de annotate_file complété de "ok", "error", "elapsed"
+    et "diagnostics" : une erreur n'interrompt pas le traitement des autres fichiers.
+    """
+    diagnostics = []
+    start = time.perf_counter()
+    try:
+        result = annotate_file(file_path, diagnostics)
+        result.update(ok=True, error=None)
+    except Exception as e:
+        result = {"file": file_path.name, "has_datasheets": None, "processed": 0,
+                  "written": False, "backup": None, "ok": False, "error": str(e)}
+    result["elapsed"] = time.perf_counter() - start
+    result["diagnostics"] = diagnostics
+    return result
+
+def process_archive(archive_dir: Path, jobs: int = 1, report_path: str = REPORT_FILE) -> List[Dict]:
+    """
+    Traite tous les fichiers JSON d'un dossier, sur jobs processus.
+
+    Affiche une ligne par fichier (dans l'ordre alphabétique) et écrit dans
+    report_path le rapport des fichiers et de tous les diagnostics.
+    """
+    json_files = sorted(archive_dir.glob("*.json"))
+    if not json_files:
+        print(f"{ICONS['warning']} Aucun fichier JSON trouvé dans le dossier {archive_dir}")
+        return []
+
+    print(f"{ICONS['info']} Traitement de {len(json_files)} fichiers ({jobs} processus)...")
+    start = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(run_faction_file, json_files))
+    else:
+        results = [run_faction_file(file_path) for file_path in json_files]
+    wall_clock = time.perf_counter() - start
+
+    diagnostics = []
+    for result in results:
+        if not result["ok"]:
+            print(f"{ICONS['error']} {result['file']}: {result['error']}")
+        elif result["written"]:
+            print(f"{ICONS['success']} {result['file']}: {result['processed']} datasheets modifiées"
+                  + (f", {len(result['diagnostics'])} diagnostics" if result["diagnostics"] else ""))
+        else:
+            print(f"{ICONS['skip']} {result['file']}: "
+                  + ("déjà traité" if result["has_datasheets"] else "pas de datasheets"))
+        diagnostics.extend({"file": result["file"], **diagnostic} for diagnostic in result["diagnostics"])
+
+    counts = {}
+    for diagnostic in diagnostics:
+        counts[diagnostic["type"]] = counts.get(diagnostic["type"], 0) + 1
+    write_json_atomic(report_path, {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": {result["file"]: {key: result[key] for key in ("ok", "error", "processed", "written")}
+                  for result in results},
+        "summary": counts,
+        "diagnostics": diagnostics
+    })
+
+    written = sum(1 for result in results if result["written"])
+    errors = sum(1 for result in results if not result["ok"])
+    print(f"\n{ICONS['success']} {written} fichiers écrits, {len(results) - written - errors} inchangés, "
+          f"{errors} erreurs en {wall_clock:.2f} s")
+    if counts:
+        print(f"{ICONS['warning']} Diagnostics : " + ", ".join(f"{kind} {count}" for kind, count in sorted(counts.items())))
+    print(f"{ICONS['file']} Rapport : {report_path}")
+    return results
 
 def main():
     """Fonction principale."""
-    # Vérifier les arguments
-    if len(sys.argv) > 1:
-        if sys.argv[1] in ['--help', '-h', 'help']:
-            print_usage()
-            return
-        
+    parser = argparse.ArgumentParser(description="Ajoute compo_structure aux datasheets des fichiers de faction")
+    parser.add_argument("file", nargs="?", help="Fichier JSON à traiter (défaut: tous les fichiers de archive/)")
+    parser.add_argument("--archive-dir", default="archive", help="Dossier des fichiers de faction (défaut: archive)")
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de processus en mode dossier (0 = nombre de CPU)")
+    parser.add_argument("--report", default=REPORT_FILE, help=f"Rapport des diagnostics (défaut: {REPORT_FILE})")
+    args = parser.parse_args()
+
+    if args.file:
         # Traiter un fichier spécifique
-        file_path = Path(sys.argv[1])
+        file_path = Path(args.file)
         
         if not file_path.exists():
             print(f"{ICONS['error']} Le fichier {file_path} n'existe pas")
@@ -250,28 +408,14 @@ def main():
         return
     
     # Traiter tous les fichiers du dossier archive
-    archive_dir = Path("archive")
+    archive_dir = Path(args.archive_dir)
     
     if not archive_dir.exists():
-        print(f"{ICONS['error']} Le dossier 'archive' n'existe pas")
-        return
-    
-    # Traiter tous les fichiers JSON dans le dossier archive
-    json_files = list(archive_dir.glob("*.json"))
-    
-    if not json_files:
-        print(f"{ICONS['warning']} Aucun fichier JSON trouvé dans le dossier archive")
-        return
-    
-    print(f"{ICONS['info']} Traitement de {len(json_files)} fichiers...")
-    print(f"{ICONS['info']} Icônes: {ICONS['success']} Succès | {ICONS['warning']} Avertissement | {ICONS['error']} Erreur | {ICONS['skip']} Ignoré")
-    print("-" * 80)
-    
-    for i, file_path in enumerate(json_files, 1):
-        print(f"\n{ICONS['info']} [{i}/{len(json_files)}] ", end="")
-        process_faction_file(file_path)
+        print(f"{ICONS['error']} Le dossier '{archive_dir}' n'existe pas")
+        sys.exit(1)
     
-    print(f"\n{ICONS['success']} Traitement terminé !")
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    process_archive(archive_dir, jobs, args.report)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
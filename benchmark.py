@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks des étapes du pipeline.
+
+Chaque benchmark mesure la version courante du code et, avec --baseline,
+la même fonction dans une révision git antérieure (ex: HEAD~1), sur les mêmes
+données, en vérifiant que les deux produisent le même résultat.
+
+Utilisation:
+  python benchmark.py [--baseline REV] [--repeat N] munitorum
+  python benchmark.py [--baseline REV] [--repeat N] translations [--file archive/space_marines.json]
+  python benchmark.py [--repeat N] pack [--locale fr] [--file-id SM]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+def load_module_at(revision, module_name):
+    """Charge un module du dépôt tel qu'il est dans une révision git."""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:./{module_name}.py"],
+        capture_output=True, check=True
+    ).stdout
+    module = types.ModuleType(f"{module_name}@{revision}")
+    module.__file__ = f"{module_name}.py"
+    exec(compile(source, f"{module_name}.py@{revision}", "exec"), module.__dict__)
+    return module
+
+def best_of(function, repeat):
+    """Meilleur temps (secondes) de plusieurs exécutions, et le résultat de la dernière."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def report(label, elapsed, count, unit):
+    """Affiche une mesure en débit (éléments par seconde)."""
+    print(f"  {label:<28} {elapsed * 1000:9.2f} ms   {count / elapsed:14,.0f} {unit}/s")
+
+def bench_munitorum(args):
+    """Nettoyage et analyse des lignes du PDF Munitorum (texte des pages en cache)."""
+    import extract_munitorum_data as current
+
+    page_texts = current.extract_page_texts(args.pdf)
+    lines = [line for text in page_texts for line in text.split('\n')]
+    print(f"📄 {args.pdf}: {len(page_texts)} pages, {len(lines)} lignes")
+
+    versions = [("courant", current)]
+    if args.baseline:
+        versions.insert(0, (args.baseline, load_module_at(args.baseline, "extract_munitorum_data")))
+
+    outputs = {}
+    for label, module in versions:
+        print(f"\n{label}:")
+        elapsed, cleaned = best_of(lambda: [module.clean_text(line) for line in lines], args.repeat)
+        report("clean_text", elapsed, len(lines), "lignes")
+        elapsed, data = best_of(lambda: module.parse_munitorum_pages(page_texts), args.repeat)
+        report("parse_munitorum_pages", elapsed, len(lines), "lignes")
+        outputs[label] = (cleaned, data)
+
+    if args.baseline:
+        identical = outputs[args.baseline] == outputs["courant"]
+        print(f"\n{'✅' if identical else '❌'} Résultats {'identiques' if identical else 'différents'}")
+
+def read_tree(directory):
+    """Contenu de tous les fichiers d'un dossier (chemin relatif -> octets)."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+def bench_translations(args):
+    """process_file() de extract_and_replace_translations.py sur un fichier de faction."""
+    import extract_and_replace_translations as current
+
+    source = os.path.abspath(args.file)
+    print(f"📄 {args.file}: {os.path.getsize(source) / 1024:.0f} Ko")
+
+    versions = [("courant", current)]
+    if args.baseline:
+        versions.insert(0, (args.baseline, load_module_at(args.baseline, "extract_and_replace_translations")))
+
+    outputs = {}
+    cwd = os.getcwd()
+    for label, module in versions:
+        # process_file écrit dans des dossiers relatifs (fr/, en/, ...) : chaque version
+        # travaille dans son propre dossier temporaire, sur une copie du fichier dans archive/
+        workdir = tempfile.mkdtemp(prefix="bench-translations-")
+        try:
+            os.makedirs(os.path.join(workdir, "archive"))
+            input_file = os.path.join("archive", os.path.basename(source))
+            shutil.copy2(source, os.path.join(workdir, input_file))
+            os.chdir(workdir)
+            print(f"\n{label}:")
+            elapsed, _ = best_of(lambda: module.process_file(input_file), args.repeat)
+            report("process_file", elapsed, 1, "fichiers")
+            outputs[label] = read_tree(workdir)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir)
+
+    if args.baseline:
+        identical = outputs[args.baseline] == outputs["courant"]
+        print(f"\n{'✅' if identical else '❌'} Fichiers générés {'identiques' if identical else 'différents'}")
+
+# Script exécuté dans un interpréteur neuf : charge les traductions, lit une clé,
+# et affiche le temps écoulé (imports compris) et la mémoire résidente maximale (Ko)
+COLD_START_SCRIPT = """
+import resource, sys, time
+start = time.perf_counter()
+mode, path, file_id, key = sys.argv[1:]
+if mode == "json":
+    import json
+    with open(path, 'r', encoding='utf-8') as f:
+        value = json.load(f).get(key)
+elif mode == "json-locale":
+    import json, os
+    flats = {}
+    for filename in os.listdir(path):
+        if filename.endswith(".flat.json"):
+            with open(os.path.join(path, filename), 'r', encoding='utf-8') as f:
+                flats[filename[:-len(".flat.json")]] = json.load(f)
+    value = flats[file_id].get(key)
+elif mode == "pack":
+    from translation_pack import TranslationPack
+    value = TranslationPack(path).get(file_id, key)
+else:
+    value = None
+elapsed = time.perf_counter() - start
+import json
+print(json.dumps({"elapsed": elapsed, "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "value": value}))
+"""
+
+def cold_start(mode, path, file_id, key, repeat):
+    """Meilleur temps et mémoire maximale de plusieurs démarrages à froid (interpréteur neuf)."""
+    best = None
+    rss = 0
+    value = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_START_SCRIPT, mode, path, file_id, key],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout
+        result = json.loads(output)
+        best = result["elapsed"] if best is None else min(best, result["elapsed"])
+        rss = max(rss, result["rss"])
+        value = result["value"]
+    return best, rss, value
+
+def bench_pack(args):
+    """Lecture d'une traduction : json.load du fichier à plat contre le pack binaire (mmap)."""
+    from translation_pack import TranslationPack, pack_path_for
+
+    flat_path = os.path.abspath(os.path.join(args.locale, f"{args.file_id}.flat.json"))
+    pack_path = os.path.abspath(pack_path_for(args.locale))
+    if not os.path.exists(pack_path):
+        print(f"❌ {pack_path} introuvable : lancez d'abord build_translation_packs.py")
+        sys.exit(1)
+    with open(flat_path, 'r', encoding='utf-8') as f:
+        flat = json.load(f)
+    keys = sorted(flat)
+    key = random.Random(0).choice(keys)
+    print(f"📄 {flat_path}: {os.path.getsize(flat_path) / 1024:.0f} Ko, {len(keys)} clés")
+    print(f"📦 {pack_path}: {os.path.getsize(pack_path) / 1024:.0f} Ko")
+
+    print("\nDémarrage à froid (interpréteur neuf, une clé lue) :")
+    _, base_rss, _ = cold_start("none", "", "", "", args.repeat)
+    values = {}
+    candidates = (
+        ("json.load (un fichier)", "json", flat_path),
+        ("json.load (toute la langue)", "json-locale", os.path.abspath(args.locale)),
+        ("pack (mmap)", "pack", pack_path),
+    )
+    for label, mode, path in candidates:
+        elapsed, rss, values[label] = cold_start(mode, path, args.file_id, key, args.repeat)
+        print(f"  {label:<28} {elapsed * 1000:9.2f} ms   {(rss - base_rss) / 1024:+8.1f} Mo RSS")
+
+    print("\nRecherches (processus courant) :")
+    with TranslationPack(pack_path) as pack:
+        elapsed, pack_values = best_of(lambda: [pack.get(args.file_id, k) for k in keys], args.repeat)
+        report("TranslationPack.get", elapsed, len(keys), "clés")
+        elapsed, _ = best_of(lambda: [flat.get(k) for k in keys], args.repeat)
+        report("dict.get (déjà chargé)", elapsed, len(keys), "clés")
+
+    # Les valeurs du pack sont celles des fichiers à plat, références communes résolues
+    from translation_memory import common_path, load_json, resolve
+    common = load_json(common_path(args.locale))
+    expected = resolve(values["json.load (un fichier)"], common)
+    identical = (expected is not None and values["json.load (toute la langue)"] == values["json.load (un fichier)"]
+                 and expected == values["pack (mmap)"]
+                 and pack_values == [resolve(flat[k], common) for k in keys])
+    print(f"\n{'✅' if identical else '❌'} Valeurs {'identiques' if identical else 'différentes'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks du pipeline")
+    parser.add_argument("--baseline", default=None, help="Révision git de référence (ex: HEAD~1)")
+    parser.add_argument("--repeat", type=int, default=5, help="Nombre d'exécutions (meilleur temps retenu)")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    munitorum = subparsers.add_parser("munitorum", help=bench_munitorum.__doc__)
+    munitorum.add_argument("--pdf", default="Input Points/bds.pdf", help="PDF Munitorum")
+    munitorum.set_defaults(run=bench_munitorum)
+
+    translations = subparsers.add_parser("translations", help=bench_translations.__doc__)
+    translations.add_argument("--file", default="archive/space_marines.json", help="Fichier de faction")
+    translations.set_defaults(run=bench_translations)
+
+    pack = subparsers.add_parser("pack", help=bench_pack.__doc__)
+    pack.add_argument("--locale", default="fr", help="Dossier de langue")
+    pack.add_argument("--file-id", default="SM", help="Identifiant du fichier à plat")
+    pack.set_defaults(run=bench_pack)
+
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Impossible de charger la révision {args.baseline}: {e.stderr.decode('utf-8', 'replace').strip()}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script pour générer les bundles de faction traduits, prêts à servir.
+
+Pour chaque langue et chaque structure/<id>.translated.json, écrit
+dist/<langue>/<id>.json : la structure dont toutes les clés sont remplacées par
+leur texte (repli <langue> -> en -> clé brute, références "@common:" résolues),
+en JSON compact, avec ses versions précompressées .gz et .br (module brotli de
+requirements.txt ; s'il manque, seuls .json et .gz sont écrits et le script le signale).
+
+dist/bundles_manifest.json liste le hash SHA-256 et la taille de chaque bundle,
+ainsi qu'un hash de ses fichiers d'entrée : un bundle dont les entrées n'ont pas
+changé n'est pas régénéré (--force pour tout régénérer).
+
+Utilisation:
+  python build_bundles.py [--locales en fr] [--factions SM CSM] [--force]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from json_io import write_bytes_atomic, write_json_if_changed
+from translation_memory import common_path, load_flat, load_json
+from translation_pack import DIST_DIR
+
+STRUCTURE_DIR = "structure"
+STRUCTURE_SUFFIX = ".translated.json"
+
+# Langue de repli des traductions
+FALLBACK_LOCALE = "en"
+
+# Changer cette version force la régénération de tous les bundles
+BUNDLE_VERSION = 1
+
+MANIFEST_FILENAME = "bundles_manifest.json"
+
+def locale_chain(locale):
+    """Langues consultées, dans l'ordre, pour traduire une clé."""
+    return [locale] if locale == FALLBACK_LOCALE else [locale, FALLBACK_LOCALE]
+
+def input_paths(faction_id, locale, structure_dir):
+    """Fichiers dont dépend le bundle d'une faction dans une langue."""
+    paths = [os.path.join(structure_dir, f"{faction_id}{STRUCTURE_SUFFIX}")]
+    for chain_locale in locale_chain(locale):
+        paths.append(os.path.join(chain_locale, f"{faction_id}.flat.json"))
+        paths.append(common_path(chain_locale))
+    return paths
+
+def inputs_hash(paths):
+    """Hash des fichiers d'entrée (chemin et contenu ; un fichier absent compte aussi)."""
+    digest = hashlib.sha256(f"bundle-v{BUNDLE_VERSION}".encode('utf-8'))
+    for path in paths:
+        digest.update(path.encode('utf-8') + b"\0")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(b"<absent>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_translations(faction_id, locale):
+    """Table clé -> texte d'une faction, la langue demandée l'emportant sur la langue de repli."""
+    translations = {}
+    for chain_locale in reversed(locale_chain(locale)):
+        translations.update(load_flat(os.path.join(chain_locale, f"{faction_id}.flat.json")))
+    return translations
+
+def translate_document(value, translations):
+    """Copie du document où chaque chaîne est remplacée par sa traduction (ou gardée telle quelle)."""
+    if isinstance(value, dict):
+        return {key: translate_document(item, translations) for key, item in value.items()}
+    if isinstance(value, list):
+        return [translate_document(item, translations) for item in value]
+    if isinstance(value, str):
+        return translations.get(value, value)
+    return value
+
+def render_bundle(faction_id, locale, structure_dir):
+    """Contenu (octets UTF-8, JSON compact) du bundle d'une faction dans une langue."""
+    with open(os.path.join(structure_dir, f"{faction_id}{STRUCTURE_SUFFIX}"), 'r', encoding='utf-8') as f:
+        structure = json.load(f)
+    bundle = translate_document(structure, load_translations(faction_id, locale))
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def bundle_paths(output_dir, locale, faction_id):
+    """Chemins du bundle et de ses versions compressées."""
+    path = os.path.join(output_dir, locale, f"{faction_id}.json")
+    return {"json": path, "gz": path + ".gz", "br": path + ".br"}
+
+def write_bundle(content, paths):
+    """Écrit un bundle et ses versions compressées ; retourne l'entrée de manifeste."""
+    entry = {"sha256": hashlib.sha256(content).hexdigest(), "size": len(content)}
+    write_bytes_atomic(paths["json"], content)
+
+    # mtime=0 : un même contenu donne toujours le même .gz
+    gz = gzip.compress(content, compresslevel=9, mtime=0)
+    write_bytes_atomic(paths["gz"], gz)
+    entry["gz_size"] = len(gz)
+
+    if brotli is not None:
+        br = brotli.compress(content, quality=11)
+        write_bytes_atomic(paths["br"], br)
+        entry["br_size"] = len(br)
+    elif os.path.exists(paths["br"]):
+        # Un .br d'une génération précédente ne correspond plus au bundle
+        os.remove(paths["br"])
+    return entry
+
+def is_up_to_date(entry, digest, paths):
+    """Indique si un bundle existant a été généré à partir des mêmes entrées."""
+    if not entry or entry.get("inputs") != digest:
+        return False
+    expected = ["json", "gz"] + (["br"] if brotli is not None else [])
+    return all(os.path.exists(paths[kind]) for kind in expected)
+
+def list_factions(structure_dir):
+    """Identifiants des factions ayant une structure traduite."""
+    return sorted(filename[:-len(STRUCTURE_SUFFIX)] for filename in os.listdir(structure_dir)
+                  if filename.endswith(STRUCTURE_SUFFIX))
+
+def build_bundles(locales, factions=None, structure_dir=STRUCTURE_DIR, output_dir=DIST_DIR, force=False):
+    """
+    Génère les bundles manquants ou dont les entrées ont changé.
+
+    Retourne (nombre de bundles générés, nombre de bundles à jour).
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    manifest = load_json(manifest_path)
+    entries = manifest.get("bundles", {})
+    all_factions = list_factions(structure_dir)
+    factions = all_factions if factions is None else factions
+
+    built = 0
+    skipped = 0
+    for locale in locales:
+        os.makedirs(os.path.join(output_dir, locale), exist_ok=True)
+        for faction_id in factions:
+            name = f"{locale}/{faction_id}.json"
+            paths = bundle_paths(output_dir, locale, faction_id)
+            digest = inputs_hash(input_paths(faction_id, locale, structure_dir))
+            if not force and is_up_to_date(entries.get(name), digest, paths):
+                skipped += 1
+                continue
+            entry = write_bundle(render_bundle(faction_id, locale, structure_dir), paths)
+            entry["inputs"] = digest
+            entries[name] = entry
+            built += 1
+            print(f"📦 {name}: {entry['size'] / 1024:.0f} Ko, gz {entry['gz_size'] / 1024:.0f} Ko"
+                  + (f", br {entry['br_size'] / 1024:.0f} Ko" if "br_size" in entry else ""))
+
+        # Bundles des factions qui n'ont plus de structure
+        for name in [name for name in entries if name.startswith(f"{locale}/")]:
+            faction_id = name[len(locale) + 1:-len(".json")]
+            if faction_id not in all_factions:
+                for path in bundle_paths(output_dir, locale, faction_id).values():
+                    if os.path.exists(path):
+                        os.remove(path)
+                del entries[name]
+                print(f"🗑️ {name} supprimé (structure absente)")
+
+    manifest = {"version": BUNDLE_VERSION, "bundles": dict(sorted(entries.items()))}
+    write_json_if_changed(manifest_path, manifest)
+    return built, skipped
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère les bundles de faction traduits et compressés")
+    parser.add_argument("--locales", nargs="+", default=["en", "fr"], help="Langues (défaut: en fr)")
+    parser.add_argument("--factions", nargs="+", default=None, help="Factions à générer (défaut: toutes)")
+    parser.add_argument("--structure-dir", default=STRUCTURE_DIR, help=f"Dossier des structures (défaut: {STRUCTURE_DIR})")
+    parser.add_argument("--output-dir", default=DIST_DIR, help=f"Dossier de sortie (défaut: {DIST_DIR})")
+    parser.add_argument("--force", action="store_true", help="Régénère tous les bundles")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.structure_dir):
+        print(f"❌ Le dossier '{args.structure_dir}' n'existe pas")
+        sys.exit(1)
+    missing = [faction_id for faction_id in args.factions or []
+               if not os.path.exists(os.path.join(args.structure_dir, f"{faction_id}{STRUCTURE_SUFFIX}"))]
+    if missing:
+        print(f"❌ Structure(s) introuvable(s) : {', '.join(missing)}")
+        sys.exit(1)
+    if brotli is None:
+        print("⚠️ Module brotli non installé (pip install -r requirements.txt) : les fichiers .br ne sont pas générés")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    built, skipped = build_bundles(args.locales, args.factions, args.structure_dir, args.output_dir, args.force)
+    print(f"✅ {built} bundles générés, {skipped} à jour")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script pour compiler les fichiers à plat de chaque langue en un pack binaire.
+
+Tous les fichiers <langue>/<id>.flat.json sont regroupés dans dist/<langue>.pack
+(format décrit dans translation_pack.py), les références "@common:<clé>" étant
+remplacées par le texte du fichier commun : un client lit une traduction avec
+TranslationPack sans charger de JSON.
+
+Utilisation:
+  python build_translation_packs.py [--locales en fr] [--output-dir dist]
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+from json_io import write_bytes_atomic
+from translation_memory import COMMON_FILENAME, load_common, load_flat
+from translation_pack import BLOCK_SIZE, DIST_DIR, HEADER, PACK_MAGIC, PACK_VERSION, UINT32, pack_key, pack_path_for
+
+FLAT_SUFFIX = ".flat.json"
+
+def encode_varint(value):
+    """Entier positif en varint (7 bits par octet, bit de poids fort = octet suivant)."""
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def load_locale(directory):
+    """
+    Charge les fichiers à plat de faction d'un dossier de langue : identifiant -> flat.
+
+    Les références au fichier commun sont résolues ; le fichier commun lui-même
+    n'est pas inclus.
+    """
+    common = load_common(directory)
+    flats = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(FLAT_SUFFIX) and filename != COMMON_FILENAME:
+            flats[filename[:-len(FLAT_SUFFIX)]] = load_flat(os.path.join(directory, filename), common)
+    return flats
+
+def build_pack(flats):
+    """Compile des fichiers à plat (identifiant -> flat) en un pack binaire."""
+    entries = sorted(
+        (pack_key(file_id, key).encode('utf-8'), value.encode('utf-8'))
+        for file_id, flat in flats.items()
+        for key, value in flat.items()
+    )
+
+    block_index = []
+    keys = bytearray()
+    value_offsets = [0]
+    values = bytearray()
+    previous = b""
+    for position, (key, value) in enumerate(entries):
+        shared = 0
+        if position % BLOCK_SIZE == 0:
+            # Première clé d'un bloc : stockée complète pour la recherche dichotomique
+            block_index.append(len(keys))
+        else:
+            limit = min(len(previous), len(key))
+            while shared < limit and previous[shared] == key[shared]:
+                shared += 1
+        keys += encode_varint(shared) + encode_varint(len(key) - shared) + key[shared:]
+        values += value
+        value_offsets.append(len(values))
+        previous = key
+
+    block_index_offset = HEADER.size
+    value_offsets_offset = block_index_offset + UINT32.size * len(block_index)
+    keys_offset = value_offsets_offset + UINT32.size * len(value_offsets)
+    values_offset = keys_offset + len(keys)
+    header = HEADER.pack(PACK_MAGIC, PACK_VERSION, BLOCK_SIZE, len(entries), len(block_index),
+                         block_index_offset, value_offsets_offset, keys_offset, values_offset)
+    return b"".join([
+        header,
+        struct.pack(f"<{len(block_index)}I", *block_index),
+        struct.pack(f"<{len(value_offsets)}I", *value_offsets),
+        bytes(keys),
+        bytes(values),
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile les fichiers à plat de chaque langue en un pack binaire")
+    parser.add_argument("--locales", nargs="+", default=["en", "fr"], help="Dossiers de langue (défaut: en fr)")
+    parser.add_argument("--output-dir", default=DIST_DIR, help=f"Dossier des packs (défaut: {DIST_DIR})")
+    args = parser.parse_args()
+
+    missing = [locale for locale in args.locales if not os.path.isdir(locale)]
+    if missing:
+        print(f"❌ Dossier(s) de langue introuvable(s) : {', '.join(missing)}")
+        sys.exit(1)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for locale in args.locales:
+        flats = load_locale(locale)
+        source_size = sum(os.path.getsize(os.path.join(locale, filename))
+                          for filename in os.listdir(locale) if filename.endswith(FLAT_SUFFIX))
+        content = build_pack(flats)
+        path = pack_path_for(locale, args.output_dir)
+        write_bytes_atomic(path, content)
+        count = sum(len(flat) for flat in flats.values())
+        print(f"📦 {path}: {len(flats)} fichiers, {count} clés, "
+              f"{source_size / 1024:.0f} Ko -> {len(content) / 1024:.0f} Ko")
+    print("✅ Packs générés")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script pour détecter les datasheets, enhancements et stratagèmes modifiés
+entre deux instantanés des fichiers d'archive.
+
+Les éléments sont appariés par leur id et comparés par le hash de leur JSON
+canonique ; seuls les éléments dont le hash diffère sont comparés champ par
+champ. Le résultat est un changeset compact (ajouts, suppressions,
+modifications avec chemins de champs) que les scripts suivants peuvent lire
+pour ne traiter que les éléments modifiés.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Sections comparées élément par élément
+SECTIONS = ["datasheets", "enhancements", "stratagems"]
+
+# Fichier de changeset par défaut
+CHANGES_FILE = "archive_changes.json"
+
+def canonical_hash(item):
+    """Hash du JSON canonique d'un élément (clés triées, sans espaces)."""
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+def item_key(item, position):
+    """Clé d'appariement d'un élément : son id, à défaut son nom, à défaut sa position."""
+    if isinstance(item, dict):
+        if item.get("id"):
+            return item["id"]
+        if item.get("name"):
+            return f"name:{item['name']}"
+    return f"index:{position}"
+
+def index_items(items):
+    """Indexe une liste d'éléments par clé d'appariement -> (hash, élément)."""
+    index = {}
+    for position, item in enumerate(items or []):
+        index.setdefault(item_key(item, position), (canonical_hash(item), item))
+    return index
+
+def changed_paths(old, new, prefix=""):
+    """
+    Liste les chemins (séparés par des points) des champs qui diffèrent entre deux valeurs.
+
+    Les listes de même longueur sont comparées élément par élément ; une liste
+    dont la longueur a changé est signalée comme un tout.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in list(old) + [k for k in new if k not in old]:
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in old or key not in new:
+                paths.append(path)
+            elif old[key] != new[key]:
+                paths.extend(changed_paths(old[key], new[key], path))
+        return paths
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        paths = []
+        for position, (old_item, new_item) in enumerate(zip(old, new)):
+            if old_item != new_item:
+                path = f"{prefix}.{position}" if prefix else str(position)
+                paths.extend(changed_paths(old_item, new_item, path))
+        return paths
+    return [prefix] if old != new else []
+
+def describe(key, item):
+    """Résumé compact d'un élément pour le changeset."""
+    entry = {"id": key}
+    if isinstance(item, dict) and item.get("name"):
+        entry["name"] = item["name"]
+    return entry
+
+def diff_documents(old_document, new_document):
+    """
+    Compare deux documents de faction section par section.
+
+    Retourne un dict section -> {"added", "removed", "modified"} ne contenant
+    que les sections qui ont changé.
+    """
+    old_document = old_document or {}
+    new_document = new_document or {}
+    changes = {}
+
+    for section in SECTIONS:
+        old_index = index_items(old_document.get(section))
+        new_index = index_items(new_document.get(section))
+
+        added = [describe(key, item) for key, (_, item) in new_index.items() if key not in old_index]
+        removed = [describe(key, item) for key, (_, item) in old_index.items() if key not in new_index]
+        modified = []
+        for key, (new_hash, new_item) in new_index.items():
+            if key in old_index and old_index[key][0] != new_hash:
+                entry = describe(key, new_item)
+                entry["paths"] = changed_paths(old_index[key][1], new_item)
+                modified.append(entry)
+
+        if added or removed or modified:
+            changes[section] = {"added": added, "removed": removed, "modified": modified}
+
+    return changes
+
+def load_directory_snapshot(directory):
+    """Charge les fichiers JSON d'un dossier d'archive (nom de fichier -> document)."""
+    documents = {}
+    for path in sorted(Path(directory).glob("*.json")):
+        with open(path, 'r', encoding='utf-8') as f:
+            documents[path.name] = json.load(f)
+    return documents
+
+def load_git_snapshot(revision, directory):
+    """Charge les fichiers JSON d'un dossier d'archive tels qu'ils sont dans une révision git."""
+    # Chemin relatif au dossier courant dans la révision (syntaxe REV:./chemin)
+    directory = "./" + Path(directory).as_posix().strip('/')
+    listing = subprocess.run(
+        ["git", "ls-tree", "--name-only", f"{revision}:{directory}"],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    documents = {}
+    for filename in sorted(listing):
+        if filename.endswith(".json"):
+            content = subprocess.run(
+                ["git", "show", f"{revision}:{directory}/{filename}"],
+                capture_output=True, check=True
+            ).stdout
+            # stdout en octets pour laisser json décoder l'UTF-8
+            documents[filename] = json.loads(content)
+    return documents
+
+def diff_snapshots(old_documents, new_documents):
+    """Compare deux instantanés (nom de fichier -> document) et retourne les changements par fichier."""
+    files = {}
+    for filename in sorted(set(old_documents) | set(new_documents)):
+        changes = diff_documents(old_documents.get(filename), new_documents.get(filename))
+        if changes:
+            files[filename] = changes
+    return files
+
+def make_changeset(files, old_source, new_source):
+    """Enveloppe les changements par fichier dans un changeset daté."""
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "old": old_source,
+        "new": new_source,
+        "files": files
+    }
+
+def save_changeset(changeset, path=CHANGES_FILE):
+    """Sauvegarde un changeset."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(changeset, f, indent=2, ensure_ascii=False)
+
+def load_changeset(path=CHANGES_FILE):
+    """Charge un changeset (None s'il n'existe pas)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dirty_ids(changeset, filename=None, section=None):
+    """
+    Ids des éléments ajoutés ou modifiés d'un changeset.
+
+    filename et section restreignent la recherche à un fichier d'archive
+    (ex: "space_marines.json") et à une section (ex: "datasheets").
+    """
+    ids = set()
+    for name, changes in changeset.get("files", {}).items():
+        if filename is not None and name != filename:
+            continue
+        for section_name, section_changes in changes.items():
+            if section is not None and section_name != section:
+                continue
+            for entry in section_changes["added"] + section_changes["modified"]:
+                ids.add(entry["id"])
+    return ids
+
+def print_summary(files):
+    """Affiche un résumé du changeset par fichier et par section."""
+    if not files:
+        print("ℹ️ Aucun changement détecté")
+        return
+    for filename, changes in files.items():
+        print(f"📁 {filename}")
+        for section, section_changes in changes.items():
+            print(f"   {section}: +{len(section_changes['added'])} "
+                  f"-{len(section_changes['removed'])} ~{len(section_changes['modified'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Détecte les éléments modifiés entre deux instantanés de l'archive")
+    parser.add_argument("--old", default="HEAD",
+                        help="Instantané précédent : dossier ou révision git (défaut: HEAD)")
+    parser.add_argument("--new", default="archive", help="Dossier de l'instantané courant (défaut: archive)")
+    parser.add_argument("--output", default=CHANGES_FILE, help=f"Fichier de changeset (défaut: {CHANGES_FILE})")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.new):
+        print(f"❌ Le dossier '{args.new}' n'existe pas")
+        sys.exit(1)
+
+    try:
+        if os.path.isdir(args.old):
+            old_documents = load_directory_snapshot(args.old)
+        else:
+            old_documents = load_git_snapshot(args.old, args.new)
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode('utf-8', 'replace') if isinstance(e.stderr, bytes) else e.stderr
+        print(f"❌ Impossible de lire l'instantané '{args.old}': {(stderr or str(e)).strip()}")
+        sys.exit(1)
+
+    new_documents = load_directory_snapshot(args.new)
+    files = diff_snapshots(old_documents, new_documents)
+
+    print_summary(files)
+    save_changeset(make_changeset(files, args.old, args.new), args.output)
+    print(f"\n✅ Changeset sauvegardé dans {args.output}")
+
+if __name__ == "__main__":
+    main()
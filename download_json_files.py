@@ -1,267 +1,690 @@
-import requests
+import argparse
 import os
+import hashlib
 import json
+import posixpath
+import sys
+import tarfile
+import time
+import zipfile
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urljoin
 
-def download_json_files():
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from diff_archive import diff_documents, make_changeset, save_changeset
+from json_io import dump_json
+
+# URL de base
+BASE_URL = "https://raw.githubusercontent.com/game-datacards/datasources/main/10th/gdc/"
+
+# Liste des fichiers JSON à télécharger
+JSON_FILES = [
+    "adeptasororitas.json",
+    "adeptuscustodes.json",
+    "adeptusmechanicus.json",
+    "aeldari.json",
+    "agents.json",
+    "astramilitarum.json",
+    "blacktemplar.json",
+    "bloodangels.json",
+    "chaos_spacemarines.json",
+    "chaosdaemons.json",
+    "chaosknights.json",
+    "darkangels.json",
+    "deathguard.json",
+    "deathwatch.json",
+    "drukhari.json",
+    "emperors_children.json",
+    "greyknights.json",
+    "gsc.json",
+    "imperialknights.json",
+    "necrons.json",
+    "orks.json",
+    "space_marines.json",
+    "spacewolves.json",
+    "tau.json",
+    "thousandsons.json",
+    "tyranids.json",
+    "unaligned.json",
+    "votann.json",
+    "worldeaters.json"
+]
+
+# Dossier de destination
+OUTPUT_DIR = "archive"
+
+# Règles de normalisation appliquées après le téléchargement, dans l'ordre.
+#   - remove_duplicates : retire de target les datasheets dont le nom existe dans l'un des sources
+#   - inject_datasheets : copie dans target les datasheets nommées de source qui y manquent
+NORMALIZATION_RULES = [
+    {
+        "action": "remove_duplicates",
+        "target": "space_marines.json",
+        "sources": [
+            "spacewolves.json",
+            "agents.json",
+            "bloodangels.json",
+            "blacktemplar.json",
+            "darkangels.json",
+            "deathwatch.json"
+        ]
+    },
+    {
+        "action": "inject_datasheets",
+        "source": "chaosdaemons.json",
+        "target": "thousandsons.json",
+        "names": [
+            "Blue Horrors",
+            "Flamers",
+            "Kairos Fateweaver",
+            "Lord of Change",
+            "Pink Horrors",
+            "Screamers"
+        ]
+    },
+    {
+        "action": "inject_datasheets",
+        "source": "chaosdaemons.json",
+        "target": "worldeaters.json",
+        "names": [
+            "Bloodcrushers",
+            "Bloodletters",
+            "Bloodthirster",
+            "Flesh Hounds",
+            "Skarbrand"
+        ]
+    },
+    {
+        "action": "inject_datasheets",
+        "source": "chaosdaemons.json",
+        "target": "emperors_children.json",
+        "names": [
+            "Daemonettes",
+            "Fiends",
+            "Keeper of Secrets",
+            "Seekers",
+            "Shalaxi Helbane"
+        ]
+    },
+    {
+        "action": "inject_datasheets",
+        "source": "chaosdaemons.json",
+        "target": "deathguard.json",
+        "names": [
+            "Beasts of Nurgle",
+            "Great Unclean One",
+            "Nurglings",
+            "Plague Drones",
+            "Plaguebearers",
+            "Rotigus"
+        ]
+    }
+]
+
+# Paramètres par défaut du téléchargement concurrent
+DEFAULT_WORKERS = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30
+
+def create_session(workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """
+    Crée une session HTTP partagée entre les workers.
+
+    Le pool de connexions est dimensionné sur le nombre de workers pour que
+    chaque thread réutilise une connexion TLS déjà ouverte, et les erreurs
+    transitoires (connexion, 429, 5xx) sont rejouées avec un backoff exponentiel.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def default_manifest_path(output_dir):
+    """Chemin du manifeste associé à un dossier de sortie (ex: archive -> archive_manifest.json)."""
+    output_dir = os.path.abspath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), f"{os.path.basename(output_dir)}_manifest.json")
+
+def default_changes_path(output_dir):
+    """Chemin du changeset associé à un dossier de sortie (ex: archive -> archive_changes.json)."""
+    output_dir = os.path.abspath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), f"{os.path.basename(output_dir)}_changes.json")
+
+def default_raw_dir(output_dir):
+    """
+    Dossier des copies amont des cibles de règles (ex: archive -> archive_raw).
+
+    Le fichier d'archive d'une cible est normalisé : sa copie telle que reçue
+    permet de rejouer les règles quand seule une de leurs sources a changé.
+    """
+    output_dir = os.path.abspath(output_dir)
+    return os.path.join(os.path.dirname(output_dir), f"{os.path.basename(output_dir)}_raw")
+
+def load_manifest(manifest_path):
+    """Charge le manifeste des téléchargements précédents (vide s'il n'existe pas)."""
+    if not os.path.exists(manifest_path):
+        return {"files": {}}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Manifeste illisible, téléchargement complet: {e}")
+        return {"files": {}}
+    manifest.setdefault("files", {})
+    return manifest
+
+def save_manifest(manifest, manifest_path):
+    """Sauvegarde le manifeste des téléchargements."""
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+def download_file(session, base_url, filename, output_dir, entry=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Télécharge un fichier et indique s'il a changé depuis le dernier téléchargement.
+
+    entry est l'entrée du manifeste pour ce fichier : son ETag et sa date de
+    modification sont renvoyés en requête conditionnelle, et un 304 ou un
+    contenu de même SHA-256 marque le fichier comme inchangé.
+
+    Le fichier n'est pas écrit ici : son contenu est retourné (clé content)
+    pour passer par l'étape de normalisation avant l'écriture.
+    """
+    file_url = urljoin(base_url, filename)
+    output_path = os.path.join(output_dir, filename)
+    result = {"filename": filename, "ok": False, "status": "failed", "size": 0,
+              "elapsed": 0.0, "error": None, "entry": entry, "content": None}
+    start = time.perf_counter()
+
+    # Requête conditionnelle seulement si le fichier local existe encore
+    headers = {}
+    if entry and os.path.exists(output_path):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        response = session.get(file_url, headers=headers, timeout=timeout)
+        response.raise_for_status()  # Lève une exception si la requête échoue
+
+        result["ok"] = True
+        if response.status_code == 304:
+            result["status"] = "unchanged"
+        else:
+            content = response.content
+            result["size"] = len(content)
+            result["entry"] = make_manifest_entry(
+                content,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            )
+
+            if entry and entry.get("sha256") == result["entry"]["sha256"] and os.path.exists(output_path):
+                result["status"] = "unchanged"
+            else:
+                result["status"] = "changed"
+                result["content"] = content
+
+    except requests.exceptions.RequestException as e:
+        result["error"] = f"Erreur lors du téléchargement de {filename}: {e}"
+
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+def make_manifest_entry(content, etag=None, last_modified=None):
+    """Construit l'entrée de manifeste d'un fichier à partir de son contenu amont."""
+    return {
+        "etag": etag,
+        "last_modified": last_modified,
+        "sha256": hashlib.sha256(content).hexdigest(),
+        "size": len(content)
+    }
+
+def download_json_files(base_url=BASE_URL, output_dir=OUTPUT_DIR, json_files=None,
+                        workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                        manifest_path=None, force=False):
     """
     Télécharge une liste de fichiers JSON depuis l'URL GitHub spécifiée.
+
+    Les fichiers sont récupérés en parallèle par un pool de threads partageant
+    une même session HTTP. Seuls les fichiers réellement modifiés en amont sont
+    normalisés puis réécrits ; la liste des factions modifiées est enregistrée
+    dans le manifeste (clé last_run) pour que les étapes suivantes puissent
+    ignorer les autres.
+
+    Retourne la liste des résultats par fichier.
     """
-    # URL de base
-    base_url = "https://raw.githubusercontent.com/game-datacards/datasources/main/10th/gdc/"
-    
-    # Liste des fichiers JSON à télécharger
-    json_files = [
-        "adeptasororitas.json",
-        "adeptuscustodes.json",
-        "adeptusmechanicus.json",
-        "aeldari.json",
-        "agents.json",
-        "astramilitarum.json",
-        "blacktemplar.json",
-        "bloodangels.json",
-        "chaos_spacemarines.json",
-        "chaosdaemons.json",
-        "chaosknights.json",
-        "darkangels.json",
-        "deathguard.json",
-        "deathwatch.json",
-        "drukhari.json",
-        "emperors_children.json",
-        "greyknights.json",
-        "gsc.json",
-        "imperialknights.json",
-        "necrons.json",
-        "orks.json",
-        "space_marines.json",
-        "spacewolves.json",
-        "tau.json",
-        "thousandsons.json",
-        "tyranids.json",
-        "unaligned.json",
-        "votann.json",
-        "worldeaters.json"
-    ]
-    
+    if json_files is None:
+        json_files = JSON_FILES
+    if manifest_path is None:
+        manifest_path = default_manifest_path(output_dir)
+
     # Utiliser le dossier archive comme destination
-    output_dir = "archive"
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Dossier '{output_dir}' créé.")
-    
-    # Télécharger chaque fichier
-    for filename in json_files:
-        file_url = urljoin(base_url, filename)
-        output_path = os.path.join(output_dir, filename)
-        
-        try:
-            print(f"Téléchargement de {filename}...")
-            response = requests.get(file_url)
-            response.raise_for_status()  # Lève une exception si la requête échoue
-            
-            # Sauvegarder le fichier
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            
-            print(f"✓ {filename} téléchargé avec succès")
-            
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Erreur lors du téléchargement de {filename}: {e}")
-        except Exception as e:
-            print(f"✗ Erreur lors de la sauvegarde de {filename}: {e}")
-    
-    print(f"\nTéléchargement terminé. Les fichiers sont dans le dossier '{output_dir}' et ont remplacé les fichiers existants.")
-    
-    # Nettoyer space_marines.json en supprimant les datasheets en double
-    clean_space_marines_json()
-    
-    # Ajouter les datasheets de démons du chaos
-    add_daemon_datasheets()
-
-def clean_space_marines_json():
+
+    manifest = {"files": {}} if force else load_manifest(manifest_path)
+
+    print(f"Téléchargement de {len(json_files)} fichiers ({workers} workers)...")
+    start = time.perf_counter()
+    results = []
+
+    session = create_session(workers, retries, backoff)
+    with session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(download_file, session, base_url, filename, output_dir,
+                            revalidation_entry(manifest, filename, output_dir))
+            for filename in json_files
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["status"] == "changed":
+                print(f"✓ {result['filename']} téléchargé avec succès ({result['size'] / 1024:.0f} Ko, {result['elapsed']:.2f} s)")
+            elif result["status"] == "unchanged":
+                print(f"⏭️ {result['filename']} inchangé ({result['elapsed']:.2f} s)")
+            else:
+                print(f"✗ {result['error']}")
+
+    wall_time = time.perf_counter() - start
+    results.sort(key=lambda r: json_files.index(r["filename"]))
+    cumulated = sum(r["elapsed"] for r in results)
+
+    print(f"\nTéléchargement terminé en {wall_time:.2f} s (cumul des requêtes: {cumulated:.2f} s)")
+
+    ingest_results(results, output_dir, manifest, manifest_path, source=base_url)
+    return results
+
+def snapshot_filename(member_path, json_files):
     """
-    Supprime les datasheets de space_marines.json qui existent déjà dans les autres fichiers de chapitres.
+    Retourne le nom de fichier de faction correspondant à un chemin d'archive,
+    ou None si le membre n'est pas à extraire.
+
+    Seuls les fichiers à la racine ou sous un dossier .../10th/gdc/ sont retenus,
+    ce qui couvre l'archive GitHub du dépôt (datasources-main/10th/gdc/...)
+    comme une archive à plat des fichiers.
     """
-    print("\n🧹 Nettoyage de space_marines.json...")
-    
-    # Fichiers contenant des datasheets à exclure
-    chapter_files = [
-        "spacewolves.json",
-        "agents.json", 
-        "bloodangels.json",
-        "blacktemplar.json",
-        "darkangels.json",
-        "deathwatch.json"
-    ]
-    
-    # Charger space_marines.json
-    space_marines_path = os.path.join("archive", "space_marines.json")
-    if not os.path.exists(space_marines_path):
-        print("❌ space_marines.json non trouvé")
-        return
-    
-    try:
-        with open(space_marines_path, 'r', encoding='utf-8') as f:
-            space_marines_data = json.load(f)
-        
-        # Collecter tous les noms de datasheets des chapitres
-        chapter_datasheet_names = set()
-        
-        for chapter_file in chapter_files:
-            chapter_path = os.path.join("archive", chapter_file)
-            if os.path.exists(chapter_path):
-                try:
-                    with open(chapter_path, 'r', encoding='utf-8') as f:
-                        chapter_data = json.load(f)
-                    
-                    if 'datasheets' in chapter_data:
-                        for datasheet in chapter_data['datasheets']:
-                            if 'name' in datasheet:
-                                chapter_datasheet_names.add(datasheet['name'])
-                    
-                    print(f"📖 {chapter_file}: {len(chapter_data.get('datasheets', []))} datasheets lues")
-                    
-                except Exception as e:
-                    print(f"⚠️ Erreur lors de la lecture de {chapter_file}: {e}")
-            else:
-                print(f"⚠️ {chapter_file} non trouvé")
-        
-        print(f"📋 Total des datasheets des chapitres: {len(chapter_datasheet_names)}")
-        
-        # Filtrer les datasheets de space_marines.json
-        original_count = len(space_marines_data.get('datasheets', []))
-        filtered_datasheets = []
-        removed_count = 0
-        
-        for datasheet in space_marines_data.get('datasheets', []):
-            if 'name' in datasheet:
-                if datasheet['name'] in chapter_datasheet_names:
-                    print(f"🗑️ Suppression: {datasheet['name']}")
-                    removed_count += 1
-                else:
-                    filtered_datasheets.append(datasheet)
+    member_path = member_path.replace('\\', '/').strip('/')
+    parent, filename = posixpath.split(member_path)
+    if filename not in json_files:
+        return None
+    if parent == "" or parent == "10th/gdc" or parent.endswith("/10th/gdc"):
+        return filename
+    return None
+
+def read_snapshot(source, json_files):
+    """
+    Lit les fichiers de faction d'un instantané local en un seul parcours séquentiel.
+
+    source peut être un dossier miroir (racine du dépôt ou dossier 10th/gdc),
+    une archive zip ou une archive tar (éventuellement compressée). Les archives
+    tar sont lues en flux et seuls les membres utiles sont décompressés.
+
+    Retourne un dict nom de fichier -> contenu.
+    """
+    contents = {}
+
+    if os.path.isdir(source):
+        gdc_dir = os.path.join(source, "10th", "gdc")
+        if os.path.isdir(gdc_dir):
+            source = gdc_dir
+        for filename in json_files:
+            path = os.path.join(source, filename)
+            if os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    contents[filename] = f.read()
+
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                filename = snapshot_filename(info.filename, json_files)
+                if filename and not info.is_dir() and filename not in contents:
+                    with archive.open(info) as member:
+                        contents[filename] = member.read()
+
+    elif tarfile.is_tarfile(source):
+        # Mode flux : un seul passage sur l'archive, sans index préalable des membres
+        with tarfile.open(source, mode="r|*") as archive:
+            for info in archive:
+                filename = snapshot_filename(info.name, json_files)
+                if filename and info.isfile() and filename not in contents:
+                    contents[filename] = archive.extractfile(info).read()
+
+    else:
+        raise ValueError(f"Format d'instantané non reconnu: {source}")
+
+    return contents
+
+def import_snapshot(source, output_dir=OUTPUT_DIR, json_files=None, manifest_path=None, force=False):
+    """
+    Importe les fichiers de faction depuis un instantané local au lieu de les télécharger.
+
+    Les fichiers passent ensuite par la même comparaison avec le manifeste,
+    la même normalisation et la même écriture que les téléchargements.
+    Retourne la liste des résultats par fichier.
+    """
+    if json_files is None:
+        json_files = JSON_FILES
+    if manifest_path is None:
+        manifest_path = default_manifest_path(output_dir)
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        print(f"Dossier '{output_dir}' créé.")
+
+    manifest = {"files": {}} if force else load_manifest(manifest_path)
+
+    print(f"Import de {len(json_files)} fichiers depuis {source}...")
+    start = time.perf_counter()
+    contents = read_snapshot(source, json_files)
+    wall_time = time.perf_counter() - start
+
+    results = []
+    for filename in json_files:
+        entry = revalidation_entry(manifest, filename, output_dir)
+        result = {"filename": filename, "ok": False, "status": "failed", "size": 0,
+                  "elapsed": 0.0, "error": None, "entry": entry, "content": None}
+        if filename not in contents:
+            result["error"] = f"{filename} absent de {source}"
+            print(f"✗ {result['error']}")
+        else:
+            content = contents[filename]
+            result["ok"] = True
+            result["size"] = len(content)
+            result["entry"] = make_manifest_entry(content)
+            output_path = os.path.join(output_dir, filename)
+            if entry and entry.get("sha256") == result["entry"]["sha256"] and os.path.exists(output_path):
+                result["status"] = "unchanged"
             else:
-                # Garder les datasheets sans nom
-                filtered_datasheets.append(datasheet)
-        
-        # Mettre à jour space_marines.json
-        space_marines_data['datasheets'] = filtered_datasheets
-        
-        # Sauvegarder directement
-        with open(space_marines_path, 'w', encoding='utf-8') as f:
-            json.dump(space_marines_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"✅ Nettoyage terminé:")
-        print(f"   - Datasheets originales: {original_count}")
-        print(f"   - Datasheets supprimées: {removed_count}")
-        print(f"   - Datasheets restantes: {len(filtered_datasheets)}")
-        
-    except Exception as e:
-        print(f"❌ Erreur lors du nettoyage: {e}")
+                result["status"] = "changed"
+                result["content"] = content
+                print(f"✓ {filename} importé ({len(content) / 1024:.0f} Ko)")
+        results.append(result)
+
+    print(f"\nImport terminé en {wall_time:.2f} s")
+
+    ingest_results(results, output_dir, manifest, manifest_path, source=os.path.abspath(source))
+    return results
 
-def add_daemon_datasheets():
+def ingest_results(results, output_dir, manifest, manifest_path, source):
     """
-    Ajoute les datasheets de démons du chaos dans les fichiers appropriés.
+    Normalise et écrit les fichiers modifiés, puis met à jour le manifeste.
+
+    results est la liste des résultats par fichier (statut changed/unchanged/failed,
+    contenu amont et entrée de manifeste), quelle que soit leur provenance.
     """
-    print("\n👹 Ajout des datasheets de démons du chaos...")
-    
-    # Charger chaosdaemons.json
-    chaosdaemons_path = os.path.join("archive", "chaosdaemons.json")
-    if not os.path.exists(chaosdaemons_path):
-        print("❌ chaosdaemons.json non trouvé")
-        return
-    
-    try:
-        with open(chaosdaemons_path, 'r', encoding='utf-8') as f:
-            chaosdaemons_data = json.load(f)
-        
-        # Définir les mappings des datasheets à ajouter
-        daemon_mappings = {
-            "thousandsons.json": [
-                "Blue Horrors",
-                "Flamers", 
-                "Kairos Fateweaver",
-                "Lord of Change",
-                "Pink Horrors",
-                "Screamers"
-            ],
-            "worldeaters.json": [
-                "Bloodcrushers",
-                "Bloodletters", 
-                "Bloodthirster",
-                "Flesh Hounds",
-                "Skarbrand"
-            ],
-            "emperors_children.json": [
-                "Daemonettes",
-                "Fiends",
-                "Keeper of Secrets", 
-                "Seekers",
-                "Shalaxi Helbane"
-            ],
-            "deathguard.json": [
-                "Beasts of Nurgle",
-                "Great Unclean One",
-                "Nurglings",
-                "Plague Drones",
-                "Plaguebearers",
-                "Rotigus"
-            ]
-        }
-        
-        # Traiter chaque fichier cible
-        for target_file, daemon_names in daemon_mappings.items():
-            target_path = os.path.join("archive", target_file)
-            
-            if not os.path.exists(target_path):
-                print(f"⚠️ {target_file} non trouvé, ignoré")
-                continue
-            
+    payloads = {r["filename"]: r["content"] for r in results if r["status"] == "changed"}
+    changed = list(payloads)
+    unchanged = [r["filename"] for r in results if r["status"] == "unchanged"]
+    failed = [r["filename"] for r in results if r["status"] == "failed"]
+
+    print(f"📋 {len(changed)} modifiés, {len(unchanged)} inchangés, {len(failed)} en erreur")
+
+    # Normalisation en mémoire puis une seule écriture par fichier.
+    # Les fichiers touchés par une règle comptent comme modifiés pour les étapes suivantes.
+    changes = {}
+    written = normalize_and_write(payloads, output_dir, changes)
+    for filename in written:
+        if filename not in changed:
+            changed.append(filename)
+        if filename in unchanged:
+            unchanged.remove(filename)
+
+    # Mettre à jour le manifeste (les fichiers en erreur gardent leur ancienne entrée)
+    for result in results:
+        if result["ok"] and result["entry"]:
+            manifest["files"][result["filename"]] = result["entry"]
+    manifest["source"] = source
+    manifest["last_run"] = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "changed": changed,
+        "unchanged": unchanged,
+        "failed": failed
+    }
+    save_manifest(manifest, manifest_path)
+
+    # Changeset élément par élément par rapport aux fichiers remplacés
+    changes_path = default_changes_path(output_dir)
+    save_changeset(make_changeset(dict(sorted(changes.items())), os.path.abspath(output_dir), source), changes_path)
+
+    if changed:
+        print(f"\n🔄 Factions modifiées: {', '.join(changed)}")
+    else:
+        print("\nℹ️ Aucune faction modifiée depuis le dernier téléchargement")
+
+def revalidation_entry(manifest, filename, output_dir):
+    """
+    Entrée de manifeste utilisée pour revalider un fichier (None pour le récupérer en entier).
+
+    Une cible de règle sans copie amont dans default_raw_dir est toujours
+    récupérée : son fichier d'archive, déjà normalisé, ne peut pas servir de
+    point de départ aux règles.
+    """
+    if filename in rule_targets() and not os.path.exists(os.path.join(default_raw_dir(output_dir), filename)):
+        return None
+    return manifest["files"].get(filename)
+
+def rule_targets():
+    """Fichiers modifiés par les règles de normalisation."""
+    return {rule["target"] for rule in NORMALIZATION_RULES}
+
+def rule_inputs(rule):
+    """Liste des fichiers lus par une règle de normalisation."""
+    if rule["action"] == "remove_duplicates":
+        return [rule["target"]] + rule["sources"]
+    return [rule["source"], rule["target"]]
+
+def normalize_and_write(payloads, archive_dir, changes=None, raw_dir=None):
+    """
+    Applique NORMALIZATION_RULES aux documents téléchargés et écrit chaque fichier une seule fois.
+
+    payloads associe le nom de fichier au contenu amont de chaque fichier modifié.
+    Une règle n'est appliquée que si l'un de ses fichiers d'entrée a changé ; les
+    fichiers qu'elle lit sans qu'ils aient changé sont chargés depuis archive_dir,
+    sauf sa cible : elle est reconstruite depuis sa copie amont (raw_dir, par
+    défaut default_raw_dir(archive_dir)), que chaque téléchargement d'une cible
+    met à jour. Les index nom -> datasheet sont construits une seule fois par document.
+
+    Les fichiers non touchés par une règle sont écrits tels que reçus ; les autres
+    sont sérialisés après normalisation. Une cible reconstruite sans avoir été
+    téléchargée n'est écrite que si son contenu change. Retourne la liste des
+    fichiers écrits.
+
+    Si changes est fourni, il reçoit pour chaque fichier écrit les datasheets,
+    enhancements et stratagèmes modifiés par rapport à la version remplacée.
+    """
+    if raw_dir is None:
+        raw_dir = default_raw_dir(archive_dir)
+    targets = rule_targets()
+    documents = {}
+    indexes = {}
+    modified = set()
+    # Cibles non téléchargées relues depuis leur copie amont : contenu brut
+    rebuilt = {}
+
+    def load(filename):
+        # Document en mémoire (téléchargé), copie amont d'une cible, ou à défaut fichier existant de l'archive
+        if filename not in documents:
+            documents[filename] = None
             try:
-                # Charger le fichier cible
-                with open(target_path, 'r', encoding='utf-8') as f:
-                    target_data = json.load(f)
-                
-                # Collecter les datasheets à ajouter
-                datasheets_to_add = []
-                existing_names = {ds.get('name', '') for ds in target_data.get('datasheets', [])}
-                
-                for daemon_name in daemon_names:
-                    # Chercher la datasheet dans chaosdaemons.json
-                    found = False
-                    for datasheet in chaosdaemons_data.get('datasheets', []):
-                        if datasheet.get('name') == daemon_name:
-                            if daemon_name not in existing_names:
-                                datasheets_to_add.append(datasheet)
-                                print(f"➕ Ajout de {daemon_name} dans {target_file}")
-                                found = True
-                            else:
-                                print(f"⏭️ {daemon_name} existe déjà dans {target_file}")
-                                found = True
-                            break
-                    
-                    if not found:
-                        print(f"⚠️ {daemon_name} non trouvé dans chaosdaemons.json")
-                
-                # Ajouter les datasheets au fichier cible
-                if datasheets_to_add:
-                    target_data['datasheets'].extend(datasheets_to_add)
-                    
-                    # Sauvegarder directement
-                    with open(target_path, 'w', encoding='utf-8') as f:
-                        json.dump(target_data, f, indent=2, ensure_ascii=False)
-                    
-                    print(f"✅ {len(datasheets_to_add)} datasheets ajoutées à {target_file}")
+                raw_path = os.path.join(raw_dir, filename)
+                if filename in payloads:
+                    documents[filename] = json.loads(payloads[filename])
+                elif filename in targets and os.path.exists(raw_path):
+                    with open(raw_path, 'rb') as f:
+                        rebuilt[filename] = f.read()
+                    documents[filename] = json.loads(rebuilt[filename])
                 else:
-                    print(f"ℹ️ Aucune nouvelle datasheet à ajouter à {target_file}")
-                
+                    path = os.path.join(archive_dir, filename)
+                    if os.path.exists(path):
+                        with open(path, 'r', encoding='utf-8') as f:
+                            documents[filename] = json.load(f)
             except Exception as e:
-                print(f"❌ Erreur lors du traitement de {target_file}: {e}")
-        
-        print("✅ Ajout des datasheets de démons terminé")
-        
+                print(f"⚠️ Erreur lors de la lecture de {filename}: {e}")
+            if documents[filename] is None:
+                print(f"⚠️ {filename} non trouvé")
+        return documents[filename]
+
+    def datasheet_index(filename):
+        # Premier datasheet de chaque nom, comme le faisait la recherche linéaire
+        if filename not in indexes:
+            index = {}
+            for datasheet in load(filename).get('datasheets', []):
+                if 'name' in datasheet:
+                    index.setdefault(datasheet['name'], datasheet)
+            indexes[filename] = index
+        return indexes[filename]
+
+    for rule in NORMALIZATION_RULES:
+        if not any(filename in payloads for filename in rule_inputs(rule)):
+            continue
+        if any(load(filename) is None for filename in rule_inputs(rule)):
+            print(f"⚠️ Règle {rule['action']} sur {rule['target']} ignorée")
+            continue
+
+        if rule["action"] == "remove_duplicates":
+            if remove_duplicate_datasheets(rule, load(rule["target"]), [datasheet_index(f) for f in rule["sources"]]):
+                modified.add(rule["target"])
+                indexes.pop(rule["target"], None)
+        elif rule["action"] == "inject_datasheets":
+            if inject_datasheets(rule, load(rule["target"]), datasheet_index(rule["source"]), datasheet_index(rule["target"])):
+                modified.add(rule["target"])
+
+    # Écriture unique de chaque fichier
+    written = []
+    for filename in list(payloads) + sorted((modified | set(rebuilt)) - set(payloads)):
+        path = os.path.join(archive_dir, filename)
+        if filename in modified:
+            content = dump_json(documents[filename]).encode('utf-8')
+        else:
+            content = payloads[filename] if filename in payloads else rebuilt[filename]
+        if filename not in payloads and os.path.exists(path):
+            with open(path, 'rb') as f:
+                if f.read() == content:
+                    continue
+        if changes is not None:
+            record_changes(changes, filename, path, content)
+        try:
+            with open(path, 'wb') as f:
+                f.write(content)
+            written.append(filename)
+            if filename in targets and filename in payloads:
+                # Copie amont de la cible, point de départ des prochaines normalisations
+                os.makedirs(raw_dir, exist_ok=True)
+                with open(os.path.join(raw_dir, filename), 'wb') as f:
+                    f.write(payloads[filename])
+        except Exception as e:
+            print(f"✗ Erreur lors de la sauvegarde de {filename}: {e}")
+
+    return written
+
+def record_changes(changes, filename, path, new_document):
+    """Compare un document (ou son contenu brut) au fichier qu'il va remplacer."""
+    try:
+        if isinstance(new_document, bytes):
+            new_document = json.loads(new_document)
+        previous = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+        file_changes = diff_documents(previous, new_document)
+        if file_changes:
+            changes[filename] = file_changes
     except Exception as e:
-        print(f"❌ Erreur lors du chargement de chaosdaemons.json: {e}")
+        print(f"⚠️ Impossible de comparer {filename} à sa version précédente: {e}")
+
+def remove_duplicate_datasheets(rule, target_data, source_indexes):
+    """
+    Supprime de target les datasheets qui existent déjà dans les fichiers sources
+    (ex: datasheets de chapitres dans space_marines.json).
+
+    Retourne True si le document a été modifié.
+    """
+    print(f"\n🧹 Nettoyage de {rule['target']}...")
+
+    original = target_data.get('datasheets', [])
+    filtered = []
+    for datasheet in original:
+        # Garder les datasheets sans nom
+        if 'name' in datasheet and any(datasheet['name'] in index for index in source_indexes):
+            print(f"🗑️ Suppression: {datasheet['name']}")
+        else:
+            filtered.append(datasheet)
+
+    removed_count = len(original) - len(filtered)
+    if removed_count:
+        target_data['datasheets'] = filtered
+
+    print(f"✅ Nettoyage terminé: {len(original)} datasheets, {removed_count} supprimées, {len(filtered)} restantes")
+    return removed_count > 0
+
+def inject_datasheets(rule, target_data, source_index, target_index):
+    """
+    Ajoute dans target les datasheets nommées de source qui n'y sont pas encore
+    (ex: démons du chaos dans les fichiers de légion).
+
+    Retourne True si le document a été modifié.
+    """
+    added = []
+    for name in rule["names"]:
+        datasheet = source_index.get(name)
+        if datasheet is None:
+            print(f"⚠️ {name} non trouvé dans {rule['source']}")
+        elif name not in target_index:
+            added.append(datasheet)
+            target_index[name] = datasheet
+
+    if added:
+        target_data.setdefault('datasheets', []).extend(added)
+        print(f"➕ {len(added)} datasheets de {rule['source']} ajoutées à {rule['target']}: {', '.join(ds['name'] for ds in added)}")
+    return bool(added)
+
+def main():
+    parser = argparse.ArgumentParser(description="Télécharge les fichiers de faction depuis game-datacards/datasources")
+    parser.add_argument("--base-url", default=BASE_URL, help="URL de base des fichiers JSON")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Dossier de destination (défaut: archive)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Nombre de téléchargements simultanés")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="Nombre de tentatives par fichier")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF, help="Facteur de backoff entre les tentatives (secondes)")
+    parser.add_argument("--manifest", default=None, help="Manifeste ETag/SHA-256 (défaut: <output-dir>_manifest.json)")
+    parser.add_argument("--force", action="store_true", help="Ignore le manifeste et retélécharge tout")
+    parser.add_argument("--from", dest="snapshot", default=None,
+                        help="Importe depuis un instantané local (dossier miroir, .zip ou .tar[.gz]) au lieu de télécharger")
+    args = parser.parse_args()
+
+    if args.snapshot:
+        if not os.path.exists(args.snapshot):
+            print(f"❌ Instantané introuvable: {args.snapshot}")
+            sys.exit(1)
+        try:
+            import_snapshot(args.snapshot, output_dir=args.output_dir, manifest_path=args.manifest, force=args.force)
+        except (ValueError, OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+            print(f"❌ Erreur lors de la lecture de l'instantané: {e}")
+            sys.exit(1)
+        return
+
+    download_json_files(
+        base_url=args.base_url,
+        output_dir=args.output_dir,
+        workers=max(1, args.workers),
+        retries=args.retries,
+        backoff=args.backoff,
+        manifest_path=args.manifest,
+        force=args.force
+    )
 
 if __name__ == "__main__":
-    download_json_files() 
\ No newline at end of file
+    main() 
\ No newline at end of file
@@ -1,9 +1,128 @@
+import argparse
+import contextlib
+import io
 import json
 import re
 import os
 import sys
 import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
 from collections import defaultdict
+from functools import lru_cache
+
+from json_io import write_json_atomic, write_json_if_changed
+from translation_memory import expand_flat, is_reference, load_common, make_reference, normalize_text, resolve
+
+def load_flat_file(path):
+    """Charge un fichier à plat (dict vide s'il n'existe pas)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def pending_path_for(flat_file_fr):
+    """Fichier des traductions à faire à côté du flat FR (ex: fr/SM.flat.json -> fr/SM.pending.json)."""
+    if flat_file_fr.endswith('.flat.json'):
+        return flat_file_fr[:-len('.flat.json')] + '.pending.json'
+    return os.path.splitext(flat_file_fr)[0] + '.pending.json'
+
+def sync_flat_files(translations, flat_file_en, flat_file_fr):
+    """
+    Met à jour les fichiers à plat EN et FR sans perdre les traductions existantes.
+
+    Le flat EN reçoit les textes anglais extraits. Pour chaque clé, la valeur
+    FR existante est conservée si le texte anglais d'origine (ancien flat EN) n'a
+    pas changé ; une clé renommée dont le texte anglais est identique reprend la
+    traduction de l'ancienne clé, si elle était traduite. Une clé nouvelle dont
+    le texte anglais normalisé est déjà traduit dans la mémoire commune
+    ("memory") en reprend la traduction : une référence si le texte est
+    identique à l'entrée commune, sinon le texte de la traduction. Les autres
+    clés nouvelles ("added") et celles dont l'anglais a changé ("stale")
+    reçoivent le texte anglais et sont listées dans le fichier pending à côté
+    du flat FR ; les clés disparues ("removed") sont retirées. Les entrées d'un
+    fichier pending précédent restent en attente tant que la valeur FR est
+    encore le texte anglais. Retourne le nombre de clés de chaque catégorie
+    pour cette synchronisation.
+
+    Les références vers la mémoire de traduction (common.flat.json, voir
+    translation_memory.py) sont résolues pour les comparaisons et conservées
+    pour les clés dont le texte anglais n'a pas changé.
+    """
+    common_en = load_common(os.path.dirname(flat_file_en))
+    common_fr = load_common(os.path.dirname(flat_file_fr))
+    raw_en = load_flat_file(flat_file_en)
+    raw_fr = load_flat_file(flat_file_fr)
+    previous_en = expand_flat(raw_en, common_en)
+    previous_fr = expand_flat(raw_fr, common_fr)
+    pending_file = pending_path_for(flat_file_fr)
+    previous_pending = load_flat_file(pending_file)
+
+    # Texte anglais -> première clé traduite qui le portait, pour suivre les clés
+    # renommées (une valeur FR encore égale à l'anglais n'est pas une traduction)
+    previous_key_by_text = {}
+    for key, text in previous_en.items():
+        if key in previous_fr and previous_fr[key] != text:
+            previous_key_by_text.setdefault(text, key)
+
+    # Texte anglais normalisé -> clé commune, pour les textes traduits dans la mémoire
+    memory_keys = {normalize_text(text): key for key, text in common_en.items()
+                   if isinstance(text, str) and isinstance(common_fr.get(key), str)
+                   and normalize_text(common_fr[key]) != normalize_text(text)}
+
+    en = dict(translations)
+    fr = {}
+    added = {}
+    stale = {}
+    counts = {"kept": 0, "renamed": 0, "memory": 0, "added": 0, "stale": 0, "removed": 0}
+    for key, text in translations.items():
+        if key in previous_en and key in previous_fr:
+            if previous_en[key] == text:
+                if is_reference(raw_en[key]):
+                    en[key] = raw_en[key]
+                fr[key] = raw_fr[key]
+                counts["kept"] += 1
+            else:
+                fr[key] = text
+                stale[key] = {"en": text, "previous_en": previous_en[key], "previous_fr": previous_fr[key]}
+                counts["stale"] += 1
+        elif text in previous_key_by_text:
+            previous_key = previous_key_by_text[text]
+            if is_reference(raw_en[previous_key]):
+                en[key] = raw_en[previous_key]
+            fr[key] = raw_fr[previous_key]
+            counts["renamed"] += 1
+        elif normalize_text(text) in memory_keys:
+            common_key = memory_keys[normalize_text(text)]
+            if common_en[common_key] == text:
+                en[key] = fr[key] = make_reference(common_key)
+            else:
+                fr[key] = common_fr[common_key]
+            counts["memory"] += 1
+        else:
+            fr[key] = text
+            added[key] = text
+            counts["added"] += 1
+    removed = [key for key in previous_fr if key not in translations]
+    counts["removed"] = len(removed)
+
+    # Reporter les clés encore non traduites d'une synchronisation précédente
+    for section, pending in (("added", added), ("stale", stale)):
+        for key, entry in previous_pending.get(section, {}).items():
+            text = entry["en"] if isinstance(entry, dict) else entry
+            if (key not in added and key not in stale and translations.get(key) == text
+                    and resolve(fr[key], common_fr) == text):
+                pending[key] = entry
+
+    write_json_if_changed(flat_file_en, en)
+    write_json_if_changed(flat_file_fr, fr)
+
+    counts["pending"] = len(added) + len(stale)
+    if added or stale or removed:
+        write_json_atomic(pending_file, {"added": added, "stale": stale, "removed": removed})
+    elif os.path.exists(pending_file):
+        os.remove(pending_file)
+    return counts
 
 def process_file(input_file):
     BASENAME = os.path.splitext(os.path.basename(input_file))[0]
@@ -60,51 +179,53 @@ def process_file(input_file):
     # Préfixes à traiter en priorité
     PRIORITY_PREFIXES = ["Feel No Pain ", "Scouts ", "Deadly Demise ", "Firing Deck "]
 
-    # Fonction utilitaire pour savoir si on est dans un profil d'arme
-    PROFILE_PATHS = [
-        ["meleeWeapons", "profiles"],
-        ["rangedWeapons", "profiles"]
-    ]
-    # Fonction utilitaire pour savoir si on est dans stats
-    STATS_PATH = ["stats"]
-
-    def is_profile_path(path):
-        # Ignore les indices numériques dans le chemin
-        filtered_path = [p for p in path if not p.isdigit()]
-        for profile_path in PROFILE_PATHS:
-            for i in range(len(filtered_path) - len(profile_path) + 1):
-                if filtered_path[i:i+len(profile_path)] == profile_path:
-                    return True
-        return False
-
-    def is_stats_path(path):
-        # On est dans stats si le chemin contient 'stats' suivi d'un index
-        for i in range(len(path)-1):
-            if path[i] == "stats" and path[i+1].isdigit():
-                return True
-        return False
-
-    def is_enhancement_path(path):
-        # On est dans enhancements si le chemin contient 'enhancements' suivi d'un index
-        for i in range(len(path)-1):
-            if path[i] == "enhancements" and path[i+1].isdigit():
-                return True
-        return False
-
-    def is_stratagem_path(path):
-        # On est dans stratagems si le chemin contient 'stratagems' suivi d'un index
-        for i in range(len(path)-1):
-            if path[i] == "stratagems" and path[i+1].isdigit():
-                return True
-        return False
+    # Noms de listes d'armes dont les "profiles" sont des profils d'armes
+    PROFILE_PARENTS = {"meleeWeapons", "rangedWeapons"}
+
+    # Contexte d'un chemin, mis à jour à chaque descente au lieu de rescanner le chemin :
+    # (dans un profil d'arme, dans stats, dans enhancements, dans stratagems,
+    #  dernier composant non numérique, dernier composant)
+    ROOT_CONTEXT = (False, False, False, False, None, None)
+
+    def descend(context, component):
+        """Contexte du chemin path + [component] à partir de celui de path, en O(1)."""
+        in_profile, in_stats, in_enhancement, in_stratagem, last_name, last = context
+        if component.isdigit():
+            # 'stats', 'enhancements' ou 'stratagems' suivi d'un index
+            return (
+                in_profile,
+                in_stats or last == "stats",
+                in_enhancement or last == "enhancements",
+                in_stratagem or last == "stratagems",
+                last_name,
+                component
+            )
+        # 'meleeWeapons' / 'rangedWeapons' puis 'profiles', en ignorant les indices numériques
+        in_profile = in_profile or (component == "profiles" and last_name in PROFILE_PARENTS)
+        return (in_profile, in_stats, in_enhancement, in_stratagem, component, component)
+
+    def path_context(path):
+        """Contexte d'un chemin complet (utilisé uniquement à la racine d'un appel)."""
+        context = ROOT_CONTEXT
+        for component in path:
+            context = descend(context, component)
+        return context
 
     ENHANCEMENT_TRANSLATE_FIELDS = {"name", "description", "detachment"}
 
-    # Nettoyage pour générer des clés valides
+    # Nettoyage pour générer des clés valides : une table de traduction pour les
+    # remplacements caractère par caractère, puis le filtre final
+    KEY_TRANSLATION = str.maketrans({
+        ' ': '_', '-': '_', '/': '_', '–': '_', '—': '_',
+        '’': None, "'": None, '"': None, '.': None, ',': None,
+        '(': None, ')': None, '?': None, ':': None
+    })
+    KEY_DISALLOWED_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+    # Mémoïsé : les mêmes composants (noms de champs, indices) reviennent sur chaque nœud
+    @lru_cache(maxsize=None)
     def clean_key(key):
-        key = key.replace(' ', '_').replace('-', '_').replace('’', '').replace("'", "").replace('"', '').replace('.', '').replace(',', '').replace('(', '').replace(')', '').replace('/', '_').replace('?', '').replace(':', '').replace('–', '_').replace('—', '_')
-        key = re.sub(r'[^a-zA-Z0-9_]', '', key)
-        return key
+        return KEY_DISALLOWED_RE.sub('', key.translate(KEY_TRANSLATION))
 
     # --- NOUVEAU : mapping index->nom pour datasheets, stratagems, enhancements, detachments, rules.army ---
     datasheet_index_to_name = {}
@@ -152,6 +273,56 @@ def process_file(input_file):
             if rule_name:
                 army_rule_index_to_name[str(idx)] = clean_key(rule_name)
 
+    # Listes dont l'index est remplacé par le nom de l'élément dans les clés
+    INDEX_NAMES = {
+        "datasheets": datasheet_index_to_name,
+        "stratagems": stratagem_index_to_name,
+        "enhancements": enhancement_index_to_name,
+        "detachments": detachment_index_to_name
+    }
+
+    # Préfixe de clé d'un chemin, construit au fil de la descente au lieu d'être
+    # recalculé depuis la racine pour chaque texte :
+    # (composants résolus déjà joints par des points, composants en attente,
+    #  avant-dernier composant, dernier composant).
+    # Un composant est en attente tant que le suivant peut encore le remplacer par
+    # un nom : 'datasheets' (etc.) avant un index, 'rules' ou 'rules', 'army' avant un index de règle d'armée.
+    ROOT_KEY_PREFIX = (None, (), None, None)
+
+    def join_key(resolved, *components):
+        return '.'.join(components) if resolved is None else '.'.join((resolved,) + components)
+
+    def key_descend(prefix, component):
+        """Préfixe de clé du chemin path + [component] à partir de celui de path."""
+        resolved, pending, _, last = prefix
+        if pending:
+            if pending[0] == "rules":
+                if len(pending) == 1 and component == "army":
+                    return (resolved, ("rules", "army"), last, component)
+                if len(pending) == 2 and component in army_rule_index_to_name:
+                    resolved = join_key(resolved, "rules", "army", army_rule_index_to_name[component])
+                    return (resolved, (), last, component)
+            elif component in INDEX_NAMES[pending[0]]:
+                resolved = join_key(resolved, pending[0], INDEX_NAMES[pending[0]][component])
+                return (resolved, (), last, component)
+            # Pas de remplacement : les composants en attente restent tels quels
+            resolved = join_key(resolved, *pending)
+        if component in INDEX_NAMES or component == "rules":
+            return (resolved, (component,), last, component)
+        return (join_key(resolved, component), (), last, component)
+
+    def make_key(prefix, k):
+        """Clé de traduction du champ k dans le chemin dont prefix est le préfixe de clé."""
+        resolved, pending, before_last, last = prefix
+        # Pour la clé courante
+        if k in INDEX_NAMES and last in INDEX_NAMES[k]:
+            tail = (k, INDEX_NAMES[k][last])
+        elif k == "army" and before_last == "rules" and last in army_rule_index_to_name:
+            tail = ("rules", "army", army_rule_index_to_name[last])
+        else:
+            tail = (clean_key(str(k)),)
+        return join_key(resolved, *(pending + tail))
+
     def extract_texts_nested(obj):
         """
         Retourne un objet imbriqué ne contenant que les champs textuels à traduire, avec la même structure que le JSON d'origine.
@@ -193,9 +364,16 @@ def process_file(input_file):
         else:
             return None
 
-    def extract_texts(obj, path=None, translations=None, replaced=None, value_to_key=None):
+    def extract_texts(obj, path=None, translations=None, replaced=None, value_to_key=None, context=None,
+                      key_prefix=None):
         if path is None:
             path = []
+        if context is None:
+            context = path_context(path)
+        if key_prefix is None:
+            key_prefix = ROOT_KEY_PREFIX
+            for component in path:
+                key_prefix = key_descend(key_prefix, component)
         if translations is None:
             translations = {}
         if replaced is None:
@@ -210,71 +388,9 @@ def process_file(input_file):
                 or any(val.startswith(prefix) for prefix in PRIORITY_PREFIXES)
             )
 
-        def make_key(path, k):
-            # --- NOUVEAU : remplace l'index de datasheet, stratagem, enhancement, detachment, rules.army par le nom ---
-            new_path = []
-            i = 0
-            while i < len(path):
-                if path[i] == "datasheets" and i+1 < len(path):
-                    idx = path[i+1]
-                    if idx in datasheet_index_to_name:
-                        new_path.append("datasheets")
-                        new_path.append(datasheet_index_to_name[idx])
-                        i += 2
-                        continue
-                if path[i] == "stratagems" and i+1 < len(path):
-                    idx = path[i+1]
-                    if idx in stratagem_index_to_name:
-                        new_path.append("stratagems")
-                        new_path.append(stratagem_index_to_name[idx])
-                        i += 2
-                        continue
-                if path[i] == "enhancements" and i+1 < len(path):
-                    idx = path[i+1]
-                    if idx in enhancement_index_to_name:
-                        new_path.append("enhancements")
-                        new_path.append(enhancement_index_to_name[idx])
-                        i += 2
-                        continue
-                if path[i] == "detachments" and i+1 < len(path):
-                    idx = path[i+1]
-                    if idx in detachment_index_to_name:
-                        new_path.append("detachments")
-                        new_path.append(detachment_index_to_name[idx])
-                        i += 2
-                        continue
-                if path[i] == "rules" and i+1 < len(path) and path[i+1] == "army" and i+2 < len(path):
-                    idx = path[i+2]
-                    if idx in army_rule_index_to_name:
-                        new_path.append("rules")
-                        new_path.append("army")
-                        new_path.append(army_rule_index_to_name[idx])
-                        i += 3
-                        continue
-                new_path.append(path[i])
-                i += 1
-            # Pour la clé courante
-            if k == "datasheets" and len(path) > 0 and path[-1] in datasheet_index_to_name:
-                new_path.append("datasheets")
-                new_path.append(datasheet_index_to_name[path[-1]])
-            elif k == "stratagems" and len(path) > 0 and path[-1] in stratagem_index_to_name:
-                new_path.append("stratagems")
-                new_path.append(stratagem_index_to_name[path[-1]])
-            elif k == "enhancements" and len(path) > 0 and path[-1] in enhancement_index_to_name:
-                new_path.append("enhancements")
-                new_path.append(enhancement_index_to_name[path[-1]])
-            elif k == "detachments" and len(path) > 0 and path[-1] in detachment_index_to_name:
-                new_path.append("detachments")
-                new_path.append(detachment_index_to_name[path[-1]])
-            elif k == "army" and len(path) > 1 and path[-2] == "rules" and path[-1] in army_rule_index_to_name:
-                new_path.append("rules")
-                new_path.append("army")
-                new_path.append(army_rule_index_to_name[path[-1]])
-            else:
-                new_path.append(clean_key(str(k)))
-            return '.'.join(new_path)
 
         if isinstance(obj, dict):
+            in_profile, in_stats, in_enhancement, in_stratagem = context[:4]
             temp = {}
             for k, v in obj.items():
                 if k == "link":
@@ -298,14 +414,14 @@ def process_file(input_file):
                         value_to_key[v] = v
                         temp[k] = v
                         continue
-                if is_enhancement_path(path):
+                if in_enhancement:
                     if k in ENHANCEMENT_TRANSLATE_FIELDS and isinstance(v, TEXT_TYPES) and v.strip() != "" and not v.strip().startswith("http"):
                         if is_priority_value(v):
                             key = v
                         elif v in value_to_key:
                             key = value_to_key[v]
                         else:
-                            key = make_key(path, k)
+                            key = make_key(key_prefix, k)
                             value_to_key[v] = key
                         translations[key] = v
                         temp[k] = key
@@ -313,14 +429,14 @@ def process_file(input_file):
                     else:
                         temp[k] = v
                         continue
-                if is_stratagem_path(path):
+                if in_stratagem:
                     if isinstance(v, TEXT_TYPES) and v.strip() != "" and not v.strip().startswith("http"):
                         if is_priority_value(v):
                             key = v
                         elif v in value_to_key:
                             key = value_to_key[v]
                         else:
-                            key = make_key(path, k)
+                            key = make_key(key_prefix, k)
                             value_to_key[v] = key
                         translations[key] = v
                         temp[k] = key
@@ -329,14 +445,16 @@ def process_file(input_file):
                         temp[k] = v
                         continue
                 new_path = path + [clean_key(str(k))]
-                if is_profile_path(path):
+                new_context = descend(context, new_path[-1])
+                new_key_prefix = key_descend(key_prefix, new_path[-1])
+                if in_profile:
                     if k == "name" and isinstance(v, TEXT_TYPES) and v.strip() != "" and not v.strip().startswith("http"):
                         if is_priority_value(v):
                             key = v
                         elif v in value_to_key:
                             key = value_to_key[v]
                         else:
-                            key = make_key(path, k)
+                            key = make_key(key_prefix, k)
                             value_to_key[v] = key
                         translations[key] = v
                         temp[k] = key
@@ -344,7 +462,7 @@ def process_file(input_file):
                     elif k in PROFILE_FIELDS:
                         temp[k] = v
                         continue
-                if is_stats_path(path) and k in STATS_FIELDS:
+                if in_stats and k in STATS_FIELDS:
                     temp[k] = v
                     continue
                 if isinstance(v, TEXT_TYPES) and v.strip() != "" and not v.strip().startswith("http"):
@@ -353,7 +471,7 @@ def process_file(input_file):
                     elif v in value_to_key:
                         key = value_to_key[v]
                     else:
-                        key = make_key(path, k)
+                        key = make_key(key_prefix, k)
                         value_to_key[v] = key
                     translations[key] = v
                     temp[k] = key
@@ -366,7 +484,7 @@ def process_file(input_file):
                             elif item in value_to_key:
                                 key = value_to_key[item]
                             else:
-                                key = make_key(new_path, str(idx))
+                                key = make_key(new_key_prefix, str(idx))
                                 value_to_key[item] = key
                             translations[key] = item
                             temp[k].append(key)
@@ -378,7 +496,8 @@ def process_file(input_file):
                                     sub = {}
                                 else:
                                     sub = []
-                                extract_texts(item, new_path + [str(idx)], translations, sub, value_to_key)
+                                extract_texts(item, new_path + [str(idx)], translations, sub, value_to_key,
+                                              descend(new_context, str(idx)), key_descend(new_key_prefix, str(idx)))
                                 if (isinstance(sub, dict) and not sub) or (isinstance(sub, list) and not sub):
                                     sublist.append(item)
                                 else:
@@ -389,7 +508,7 @@ def process_file(input_file):
                                 elif item in value_to_key:
                                     key = value_to_key[item]
                                 else:
-                                    key = make_key(new_path, str(idx))
+                                    key = make_key(new_key_prefix, str(idx))
                                     value_to_key[item] = key
                                 translations[key] = item
                                 sublist.append(key)
@@ -398,7 +517,7 @@ def process_file(input_file):
                         temp[k] = sublist
                 elif isinstance(v, dict):
                     sub = {}
-                    extract_texts(v, new_path, translations, sub, value_to_key)
+                    extract_texts(v, new_path, translations, sub, value_to_key, new_context, new_key_prefix)
                     if not sub:
                         temp[k] = v
                     else:
@@ -415,7 +534,8 @@ def process_file(input_file):
                         sub = {}
                     else:
                         sub = []
-                    extract_texts(item, path + [str(idx)], translations, sub, value_to_key)
+                    extract_texts(item, path + [str(idx)], translations, sub, value_to_key,
+                                  descend(context, str(idx)), key_descend(key_prefix, str(idx)))
                     if (isinstance(sub, dict) and not sub) or (isinstance(sub, list) and not sub):
                         sublist.append(item)
                     else:
@@ -426,7 +546,7 @@ def process_file(input_file):
                     elif item in value_to_key:
                         key = value_to_key[item]
                     else:
-                        key = make_key(path, str(idx))
+                        key = make_key(key_prefix, str(idx))
                         value_to_key[item] = key
                     translations[key] = item
                     sublist.append(key)
@@ -436,162 +556,64 @@ def process_file(input_file):
             replaced.extend(sublist)
         return translations, replaced
 
-    # --- NOUVEAU : Fonction pour réorganiser les enhancements ---
-    def reorganize_enhancements(data):
-        if BASENAME == "core":
-            return data
-        
-        if "enhancements" not in data:
-            return data
-
-        enhancements = data.pop("enhancements")
-        
-        # Si pas de détachements, on les crée
-        if "detachments" not in data:
-            data["detachments"] = []
-
-        # Pour chaque enhancement
-        for enhancement in enhancements:
-            detachment_name = enhancement.get("detachment", "")
-            if not detachment_name:
-                continue
-
-            # Supprime la clé 'detachment' de l'enhancement
-            enhancement.pop("detachment", None)
-
-            # Cherche le détachement correspondant
-            found = False
-            for i, detachment in enumerate(data["detachments"]):
-                # Si le détachement est une chaîne, on le compare directement
-                if isinstance(detachment, str) and detachment == detachment_name:
-                    # Convertit le détachement en objet
-                    data["detachments"][i] = {
-                        "name": detachment_name,
-                        "enhancements": [enhancement]
-                    }
-                    found = True
-                    break
-                # Si le détachement est un objet, on compare son nom
-                elif isinstance(detachment, dict) and detachment.get("name") == detachment_name:
-                    if "enhancements" not in detachment:
-                        detachment["enhancements"] = []
-                    detachment["enhancements"].append(enhancement)
-                    found = True
-                    break
-
-            # Si le détachement n'existe pas, on le crée
-            if not found:
-                new_detachment = {
-                    "name": detachment_name,
-                    "enhancements": [enhancement]
-                }
-                data["detachments"].append(new_detachment)
-
-        return data
-
-    # --- NOUVEAU : Fonction pour réorganiser les règles de détachement ---
-    def reorganize_detachment_rules(data):
+    # --- NOUVEAU : Regroupement des enhancements, règles et stratagèmes par détachement ---
+    def reorganize_detachments(data):
+        """
+        Rattache les enhancements, les règles de détachement (rules.detachment) et
+        les stratagèmes à leur détachement, en une seule passe.
+
+        Un index nom -> position du premier détachement portant ce nom (chaîne ou
+        objet) est construit une fois ; un détachement sous forme de chaîne est
+        converti en objet à son premier élément. Les listes sont parcourues dans
+        l'ordre enhancements, règles, stratagèmes : l'ordre des détachements créés
+        et des éléments rattachés est celui d'un traitement liste par liste.
+        """
         if BASENAME == "core":
             return data
-        
-        if "rules" not in data or "detachment" not in data["rules"]:
-            return data
-
-        detachment_rules = data["rules"].pop("detachment")
-        
-        # Si pas de détachements, on les crée
-        if "detachments" not in data:
-            data["detachments"] = []
 
-        # Pour chaque règle de détachement
-        for rule in detachment_rules:
-            detachment_name = rule.get("detachment", "")
-            if not detachment_name:
-                continue
-
-            # Supprime la clé 'detachment' de la règle
-            rule.pop("detachment", None)
-
-            # Cherche le détachement correspondant
-            found = False
-            for i, detachment in enumerate(data["detachments"]):
-                # Si le détachement est une chaîne, on le compare directement
-                if isinstance(detachment, str) and detachment == detachment_name:
-                    # Convertit le détachement en objet
-                    data["detachments"][i] = {
-                        "name": detachment_name,
-                        "rules": [rule]
-                    }
-                    found = True
-                    break
-                # Si le détachement est un objet, on compare son nom
-                elif isinstance(detachment, dict) and detachment.get("name") == detachment_name:
-                    if "rules" not in detachment:
-                        detachment["rules"] = []
-                    detachment["rules"].append(rule)
-                    found = True
-                    break
-
-            # Si le détachement n'existe pas, on le crée
-            if not found:
-                new_detachment = {
-                    "name": detachment_name,
-                    "rules": [rule]
-                }
-                data["detachments"].append(new_detachment)
-
-        return data
-
-    # --- NOUVEAU : Fonction pour réorganiser les stratagèmes ---
-    def reorganize_stratagems(data):
-        if BASENAME == "core":
-            return data
-        
-        if "stratagems" not in data:
+        sources = []
+        if "enhancements" in data:
+            sources.append(("enhancements", data.pop("enhancements")))
+        if "rules" in data and "detachment" in data["rules"]:
+            sources.append(("rules", data["rules"].pop("detachment")))
+        if "stratagems" in data:
+            sources.append(("stratagems", data.pop("stratagems")))
+        if not sources:
             return data
 
-        stratagems = data.pop("stratagems")
-        
         # Si pas de détachements, on les crée
         if "detachments" not in data:
             data["detachments"] = []
+        detachments = data["detachments"]
 
-        # Pour chaque stratagème
-        for stratagem in stratagems:
-            detachment_name = stratagem.get("detachment", "")
-            if not detachment_name:
-                continue
+        detachment_index = {}
+        for i, detachment in enumerate(detachments):
+            if isinstance(detachment, dict):
+                detachment_name = detachment.get("name")
+            else:
+                detachment_name = detachment
+            if isinstance(detachment_name, str):
+                detachment_index.setdefault(detachment_name, i)
+
+        for field, items in sources:
+            for item in items:
+                detachment_name = item.get("detachment", "")
+                if not detachment_name:
+                    continue
 
-            # Supprime la clé 'detachment' du stratagème
-            stratagem.pop("detachment", None)
+                # Supprime la clé 'detachment' de l'élément
+                item.pop("detachment", None)
 
-            # Cherche le détachement correspondant
-            found = False
-            for i, detachment in enumerate(data["detachments"]):
-                # Si le détachement est une chaîne, on le compare directement
-                if isinstance(detachment, str) and detachment == detachment_name:
+                i = detachment_index.get(detachment_name)
+                if i is None:
+                    # Si le détachement n'existe pas, on le crée
+                    detachment_index[detachment_name] = len(detachments)
+                    detachments.append({"name": detachment_name, field: [item]})
+                elif isinstance(detachments[i], str):
                     # Convertit le détachement en objet
-                    data["detachments"][i] = {
-                        "name": detachment_name,
-                        "stratagems": [stratagem]
-                    }
-                    found = True
-                    break
-                # Si le détachement est un objet, on compare son nom
-                elif isinstance(detachment, dict) and detachment.get("name") == detachment_name:
-                    if "stratagems" not in detachment:
-                        detachment["stratagems"] = []
-                    detachment["stratagems"].append(stratagem)
-                    found = True
-                    break
-
-            # Si le détachement n'existe pas, on le crée
-            if not found:
-                new_detachment = {
-                    "name": detachment_name,
-                    "stratagems": [stratagem]
-                }
-                data["detachments"].append(new_detachment)
+                    detachments[i] = {"name": detachment_name, field: [item]}
+                else:
+                    detachments[i].setdefault(field, []).append(item)
 
         return data
 
@@ -612,9 +634,7 @@ def process_file(input_file):
         return data
 
     # Réorganisation des enhancements, des règles et des stratagèmes avant l'extraction
-    data = reorganize_enhancements(data)
-    data = reorganize_detachment_rules(data)
-    data = reorganize_stratagems(data)
+    data = reorganize_detachments(data)
     data = add_invul_to_stats(data)
 
     # Extraction et remplacement
@@ -624,10 +644,8 @@ def process_file(input_file):
     FLAT_FILE_FR = os.path.join(FR_DIR, f'{data_id}.flat.json')
     FLAT_FILE_EN = os.path.join(EN_DIR, f'{data_id}.flat.json')
 
-    with open(FLAT_FILE_FR, 'w', encoding='utf-8') as f:
-        json.dump(translations, f, ensure_ascii=False, indent=2)
-    with open(FLAT_FILE_EN, 'w', encoding='utf-8') as f:
-        json.dump(translations, f, ensure_ascii=False, indent=2)
+    # Synchronisation incrémentale : les traductions FR existantes sont conservées
+    counts = sync_flat_files(translations, FLAT_FILE_EN, FLAT_FILE_FR)
 
     # Fichier JSON modifié (clé à la place du texte) dans le dossier "updated translations in progress"
     OUTPUT_DIR = 'updated translations in progress'
@@ -637,42 +655,98 @@ def process_file(input_file):
         json.dump(replaced, f, ensure_ascii=False, indent=2)
 
     print(f"Traitement terminé pour {input_file}. Fichiers à plat dans {FLAT_FILE_FR} et {FLAT_FILE_EN}, JSON modifié dans {OUTPUT_FILE}.")
-
-def main():
-    if len(sys.argv) < 2:
-        print("Usage :")
-        print("  Pour un fichier unique : python extract_and_replace_translations.py <fichier.json>")
-        print("  Pour un dossier entier : python extract_and_replace_translations.py --dir <dossier>")
+    print(f"  Traductions FR : {counts['kept']} conservées, {counts['renamed']} reprises (clé renommée), "
+          f"{counts['memory']} reprises de la mémoire commune, {counts['added']} ajoutées, {counts['stale']} obsolètes, {counts['removed']} supprimées")
+    if counts['pending']:
+        print(f"  {counts['pending']} clés à traduire : {pending_path_for(FLAT_FILE_FR)}")
+
+def run_process_file(input_file):
+    """
+    Traite un fichier en capturant sa sortie, pour le mode --dir.
+
+    Retourne un dict {"file", "ok", "error", "elapsed", "output"} : les erreurs
+    sont collectées au lieu d'interrompre le traitement des autres fichiers.
+    """
+    output = io.StringIO()
+    start = time.perf_counter()
+    error = None
+    with contextlib.redirect_stdout(output):
+        try:
+            process_file(input_file)
+        except Exception as e:
+            error = str(e)
+    return {
+        "file": input_file,
+        "ok": error is None,
+        "error": error,
+        "elapsed": time.perf_counter() - start,
+        "output": output.getvalue()
+    }
+
+def process_directory(directory, jobs=1):
+    """
+    Traite tous les fichiers JSON d'un dossier, sur jobs processus.
+
+    Les fichiers sont indépendants : avec jobs > 1 ils sont répartis sur un pool
+    de processus. Les résultats sont affichés dans l'ordre alphabétique des
+    fichiers quel que soit l'ordre de fin, suivis d'un résumé des temps.
+    """
+    json_files = sorted(f for f in os.listdir(directory) if f.endswith('.json'))
+    if not json_files:
+        print(f"Aucun fichier JSON trouvé dans {directory}")
         sys.exit(1)
 
-    if sys.argv[1] == "--dir":
-        if len(sys.argv) != 3:
-            print("Usage pour le traitement d'un dossier : python extract_and_replace_translations.py --dir <dossier>")
-            sys.exit(1)
-        
-        directory = sys.argv[2]
-        if not os.path.isdir(directory):
-            print(f"Erreur : {directory} n'est pas un dossier valide")
-            sys.exit(1)
-
-        json_files = [f for f in os.listdir(directory) if f.endswith('.json')]
-        if not json_files:
-            print(f"Aucun fichier JSON trouvé dans {directory}")
-            sys.exit(1)
+    input_files = [os.path.join(directory, json_file) for json_file in json_files]
+    print(f"Traitement de {len(json_files)} fichiers JSON dans {directory} ({jobs} processus)")
 
-        print(f"Traitement de {len(json_files)} fichiers JSON dans {directory}")
-        for json_file in json_files:
-            input_file = os.path.join(directory, json_file)
-            try:
-                process_file(input_file)
-            except Exception as e:
-                print(f"Erreur lors du traitement de {json_file}: {str(e)}")
+    start = time.perf_counter()
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(run_process_file, input_files))
     else:
-        input_file = sys.argv[1]
-        if not os.path.isfile(input_file):
-            print(f"Erreur : {input_file} n'est pas un fichier valide")
+        results = [run_process_file(input_file) for input_file in input_files]
+    wall_clock = time.perf_counter() - start
+
+    for result in results:
+        print(result["output"], end="")
+        if not result["ok"]:
+            print(f"Erreur lors du traitement de {os.path.basename(result['file'])}: {result['error']}")
+
+    errors = [result for result in results if not result["ok"]]
+    total = sum(result["elapsed"] for result in results)
+    print(f"\nRésumé : {len(results) - len(errors)} fichiers traités, {len(errors)} erreurs")
+    print(f"Temps total : {wall_clock:.2f} s (somme des fichiers : {total:.2f} s, {jobs} processus)")
+    for result in sorted(results, key=lambda r: r["elapsed"], reverse=True):
+        status = "ok" if result["ok"] else "erreur"
+        print(f"  {os.path.basename(result['file']):<32} {result['elapsed']:6.2f} s  {status}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Extraction et remplacement des textes à traduire")
+    parser.add_argument("input_file", nargs="?", help="Fichier JSON à traiter")
+    parser.add_argument("--dir", dest="directory", help="Dossier dont tous les fichiers JSON sont traités")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de processus pour --dir (0 = nombre de CPU)")
+    args = parser.parse_args()
+
+    if args.directory:
+        if args.input_file:
+            parser.error("indiquer soit un fichier, soit --dir <dossier>")
+        if not os.path.isdir(args.directory):
+            print(f"Erreur : {args.directory} n'est pas un dossier valide")
+            sys.exit(1)
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        process_directory(args.directory, jobs)
+    elif args.input_file:
+        if not os.path.isfile(args.input_file):
+            print(f"Erreur : {args.input_file} n'est pas un fichier valide")
             sys.exit(1)
-        process_file(input_file)
+        process_file(args.input_file)
+    else:
+        print("Usage :")
+        print("  Pour un fichier unique : python extract_and_replace_translations.py <fichier.json>")
+        print("  Pour un dossier entier : python extract_and_replace_translations.py --dir <dossier> [--jobs N]")
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -1,213 +1,388 @@
+import argparse
+import copy
+import hashlib
 import json
+import os
 import re
 import fitz
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import chain
 from typing import Dict, List, Any
 
+# Caractères supprimés par le nettoyage : contrôles C0/C1, espaces et contrôles
+# étendus (U+2000-U+200F, U+2028-U+202F, U+205F-U+206F) et U+FFFD-U+FFFF
+_DELETED_CHARS = dict.fromkeys(chain(
+    range(0x00, 0x20), range(0x7F, 0xA0),
+    range(0x2000, 0x2010), range(0x2028, 0x2030), range(0x205F, 0x2070),
+    range(0xFFFD, 0x10000)
+))
+
+# Caractères retirés des noms : tout sauf lettres, chiffres, espaces, tirets, parenthèses et points
+NAME_DISALLOWED_RE = re.compile(r'[^\w\s\-\(\)\.]')
+
 def clean_text(text: str) -> str:
     """Nettoie le texte en supprimant les caractères spéciaux tout en préservant les accents"""
-    # Supprimer tous les caractères de contrôle et caractères non imprimables
-    # Inclure une plage plus large pour capturer les caractères problématiques
-    text = re.sub(r'[\x00-\x1F\x7F-\x9F\uFFFD\uFFFE\uFFFF]', '', text)
-    
-    # Supprimer les caractères de remplacement Unicode et autres caractères problématiques
-    text = re.sub(r'[\uFFFD-\uFFFF]', '', text)
-    
-    # Supprimer les caractères de contrôle étendus
-    text = re.sub(r'[\u2000-\u200F\u2028-\u202F\u205F-\u206F]', '', text)
-    
-    # Nettoyer les espaces multiples et caractères d'espacement
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Supprimer les caractères de début/fin de ligne invisibles
-    text = re.sub(r'^[\s\uFEFF\xA0]+|[\s\uFEFF\xA0]+$', '', text)
-    
-    return text.strip()
+    # Une seule table de traduction pour les caractères à supprimer, puis
+    # espaces multiples réduits à un seul et caractères invisibles retirés en bordure
+    return ' '.join(text.translate(_DELETED_CHARS).split()).strip('\uFEFF ')
 
 def clean_name(text: str) -> str:
     """Nettoie spécifiquement les noms d'unités et d'améliorations"""
-    # Appliquer le nettoyage de base
-    text = clean_text(text)
-    
-    # Supprimer les caractères non-ASCII problématiques supplémentaires
     # Garder seulement les lettres, chiffres, espaces, tirets, parenthèses et points
-    text = re.sub(r'[^\w\s\-\(\)\.]', '', text)
-    
-    # Nettoyer les espaces en début et fin
-    text = text.strip()
-    
-    return text
+    return NAME_DISALLOWED_RE.sub('', clean_text(text)).strip()
+
+# Types de lignes reconnus par le lexer
+TOKEN_SUPPLEMENT = "supplement"        # CODEX SUPPLEMENT: (nom sur la ligne suivante)
+TOKEN_FACTION = "faction"              # CODEX: / INDEX:
+TOKEN_PAGE_HEADER = "page_header"      # en-têtes de page à ignorer
+TOKEN_ENHANCEMENTS = "enhancements"    # DETACHMENT ENHANCEMENTS
+TOKEN_NUMBER = "number"                # ligne purement numérique
+TOKEN_UNIT_NAME = "unit_name"          # texte sans points pouvant être un nom d'unité
+TOKEN_TEXT = "text"                    # autre texte sans points (titres en majuscules...)
+TOKEN_MODEL_COST = "model_cost"        # "5 models ... 90 pts"
+TOKEN_OPTION_COST = "option_cost"      # "Invader ATV +60 pts"
+TOKEN_POINTS = "points"                # autre ligne avec des points (améliorations)
+
+SUPPLEMENT_PREFIX = 'CODEX SUPPLEMENT:'
+FACTION_PREFIXES = ('CODEX:', 'INDEX:')
+ENHANCEMENTS_PREFIX = 'DETACHMENT ENHANCEMENTS'
+AGENTS_FACTION = 'AGENTS OF THE IMPERIUM'
+AGENTS_NOTE = 'EVERY MODEL HAS IMPERIUM KEYWORD'
+
+PAGE_HEADER_RE = re.compile(r'FORGE WORLD POINTS VALUES|MUNITORUM|FIELD MANUAL')
+NOT_UNIT_RE = re.compile(r'FORGE WORLD|DETACHMENT|MUNITORUM|FIELD MANUAL|CONTENTS')
+OPTION_COST_SEARCH_RE = re.compile(r'\+\d+\s*pts')
+OPTION_COST_RE = re.compile(r'^(.+?)\s*\+(\d+)\s*pts')
+MODEL_COST_RE = re.compile(r'(\d+)\s*model.*?(\d+)\s*pts')
+ENHANCEMENT_RE = re.compile(r'^(.+?)(\d+)\s*pts')
+MODEL_COUNT_RE = re.compile(r'^(\d+)\s*(model|models)', re.IGNORECASE)
 
-def extract_munitorum_data(pdf_path: str) -> Dict[str, Any]:
+def classify_line(line: str) -> str:
+    """Classe une ligne nettoyée (non vide) dans un type de token, indépendamment du contexte."""
+    if line.startswith(SUPPLEMENT_PREFIX):
+        return TOKEN_SUPPLEMENT
+    if line.startswith(FACTION_PREFIXES):
+        return TOKEN_FACTION
+    if PAGE_HEADER_RE.search(line):
+        return TOKEN_PAGE_HEADER
+    if line.startswith(ENHANCEMENTS_PREFIX):
+        return TOKEN_ENHANCEMENTS
+    if line.isdigit():
+        return TOKEN_NUMBER
+    if 'pts' not in line:
+        if not line.isupper() and len(line) > 3 and not NOT_UNIT_RE.search(line):
+            return TOKEN_UNIT_NAME
+        return TOKEN_TEXT
+    if 'model' in line:
+        return TOKEN_MODEL_COST
+    if OPTION_COST_SEARCH_RE.search(line):
+        return TOKEN_OPTION_COST
+    return TOKEN_POINTS
+
+def lex_page(text: str) -> List[tuple]:
     """
-    Extrait les données du PDF Munitorum Field Manual
+    Découpe le texte d'une page en tokens (type, ligne, ligne suivante).
+
+    La ligne suivante (nettoyée, dans la même page) sert au nom des CODEX SUPPLEMENT.
     """
+    lines = [clean_text(line) for line in text.split('\n')]
+    tokens = []
+    for i, line in enumerate(lines):
+        if line:
+            next_line = lines[i + 1] if i + 1 < len(lines) else ''
+            tokens.append((classify_line(line), line, next_line))
+    return tokens
+
+# Version de l'extraction du texte : à incrémenter si la façon d'obtenir le texte
+# d'une page change, pour invalider le cache des pages
+EXTRACTOR_VERSION = f"1-pymupdf{fitz.VersionBind}"
+
+# Dossier du cache de texte, à côté du PDF
+PAGE_CACHE_DIRNAME = ".page_cache"
+
+def extract_pages(pdf_path: str, page_numbers: List[int]) -> List[str]:
+    """Extrait le texte des pages demandées ; chaque worker ouvre son propre document."""
     doc = fitz.open(pdf_path)
-    data = {"factions": []}
+    try:
+        return [doc.load_page(page_num).get_text() for page_num in page_numbers]
+    finally:
+        doc.close()
+
+def split_pages(page_numbers: List[int], jobs: int) -> List[List[int]]:
+    """Découpe la liste des pages en tranches contiguës de tailles équilibrées, une par worker."""
+    jobs = max(1, min(jobs, len(page_numbers)))
+    size, extra = divmod(len(page_numbers), jobs)
+    chunks = []
+    start = 0
+    for i in range(jobs):
+        stop = start + size + (1 if i < extra else 0)
+        chunks.append(page_numbers[start:stop])
+        start = stop
+    return chunks
+
+def file_sha256(path: str) -> str:
+    """SHA-256 du contenu d'un fichier."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def page_cache_path(pdf_path: str, pdf_sha: str) -> str:
+    """Fichier de cache des pages d'un PDF, identifié par son SHA-256."""
+    return os.path.join(os.path.dirname(pdf_path), PAGE_CACHE_DIRNAME, f"{pdf_sha}.json")
+
+def load_page_cache(cache_path: str) -> Dict[str, str]:
+    """
+    Charge le texte des pages en cache (numéro de page -> texte).
+
+    Le cache n'est utilisé que s'il a été produit par la même version de l'extraction.
+    """
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if cache.get("extractor_version") != EXTRACTOR_VERSION:
+        return {}
+    return cache.get("pages", {})
+
+def save_page_cache(cache_path: str, pdf_sha: str, pages: Dict[str, str]):
+    """Sauvegarde le texte des pages en cache."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as f:
+        json.dump({"pdf_sha256": pdf_sha, "extractor_version": EXTRACTOR_VERSION, "pages": pages},
+                  f, ensure_ascii=False)
+
+def extract_page_texts(pdf_path: str, jobs: int = 1, use_cache: bool = True) -> List[str]:
+    """
+    Extrait le texte de chaque page du PDF, dans l'ordre des pages.
+
+    Le texte des pages est mis en cache, par SHA-256 du PDF, numéro de page et
+    version de l'extraction : tant que le PDF ne change pas, seules les pages
+    absentes du cache sont décodées par PyMuPDF.
+
+    Avec jobs > 1, l'extraction (page.get_text(), l'essentiel du temps) est
+    répartie sur un pool de processus par tranches de pages ; les tranches sont
+    recollées dans l'ordre, le résultat est donc identique à une extraction série.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    if page_count == 0:
+        return []
+
+    pdf_sha = file_sha256(pdf_path)
+    cache_path = page_cache_path(pdf_path, pdf_sha)
+    cached = load_page_cache(cache_path) if use_cache else {}
+    missing = [page_num for page_num in range(page_count) if str(page_num) not in cached]
+
+    if missing:
+        chunks = split_pages(missing, jobs)
+        if len(chunks) == 1:
+            texts = extract_pages(pdf_path, missing)
+        else:
+            texts = []
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                futures = [executor.submit(extract_pages, pdf_path, chunk) for chunk in chunks]
+                for future in futures:
+                    texts.extend(future.result())
+        cached.update((str(page_num), text) for page_num, text in zip(missing, texts))
+        if use_cache:
+            save_page_cache(cache_path, pdf_sha, cached)
+
+    return [cached[str(page_num)] for page_num in range(page_count)]
+
+def write_text_sidecar(pdf_path: str, page_texts: List[str]) -> str:
+    """
+    Écrit le texte du PDF à côté de celui-ci (ex: bds.pdf -> bds.txt), tel que lu par test_mapping.py.
+
+    Le fichier n'est réécrit que si son contenu change.
+    """
+    sidecar_path = os.path.splitext(pdf_path)[0] + ".txt"
+    content = "\n".join(text.rstrip("\n") for text in page_texts) + "\n"
+    if os.path.exists(sidecar_path):
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return sidecar_path
+    with open(sidecar_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return sidecar_path
+
+def extract_munitorum_data(pdf_path: str, jobs: int = 1, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Extrait les données du PDF Munitorum Field Manual
+    """
+    page_texts = extract_page_texts(pdf_path, jobs, use_cache)
+    write_text_sidecar(pdf_path, page_texts)
+    return parse_munitorum_pages(page_texts)
+
+# Version de l'analyse (lexer + machine à états) : à incrémenter si le résultat
+# de l'analyse d'une section change, pour invalider l'index de l'extraction incrémentale
+PARSER_VERSION = 1
+
+def text_hash(text: str) -> str:
+    """Hash court d'un texte."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def split_sections(page_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Découpe les tokens des pages en sections de faction.
+
+    Une section commence à chaque ligne CODEX: / INDEX: / CODEX SUPPLEMENT: (la
+    première section contient ce qui précède la première faction). Chaque section
+    porte les pages qu'elle couvre, l'état "Agents of the Imperium" hérité de la
+    section précédente (un CODEX SUPPLEMENT ne le réinitialise pas) et un hash de
+    son contenu : deux sections de même hash donnent la même faction.
+    """
+    sections = []
+    section = {"tokens": [], "pages": [0, 0], "in_agents": False}
+    in_agents_section = False
+    for page_num, text in enumerate(page_texts):
+        for token in lex_page(text):
+            if token[0] is TOKEN_SUPPLEMENT or token[0] is TOKEN_FACTION:
+                sections.append(section)
+                section = {"tokens": [], "pages": [page_num, page_num], "in_agents": in_agents_section}
+                if token[0] is TOKEN_FACTION:
+                    in_agents_section = AGENTS_FACTION in token[1]
+            section["tokens"].append(token)
+            section["pages"][1] = page_num
+    sections.append(section)
+
+    for section in sections:
+        tokens = section["tokens"]
+        # Seule la ligne suivante du premier token (nom d'un CODEX SUPPLEMENT) est utilisée
+        content = [section["in_agents"], tokens[0][2] if tokens else ""] + [line for _, line, _ in tokens]
+        section["hash"] = text_hash(json.dumps(content, ensure_ascii=False))
+    return sections
+
+def parse_section(tokens: List[tuple], in_agents_section: bool = False) -> List[Dict[str, Any]]:
+    """
+    Construit les factions (au plus une par section), unités et améliorations à partir des tokens
+    """
+    factions = []
     
     current_faction = None
     current_unit = None
     current_enhancement_category = None
-    in_agents_section = False
     in_enhancements_section = False
     
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text = page.get_text()
-        lines = text.split('\n')
-        
-        for i, line in enumerate(lines):
-            line = clean_text(line)
-            if not line:
-                continue
-            
-            # Détection des factions (CODEX SUPPLEMENT: sur deux lignes)
-            if line.startswith('CODEX SUPPLEMENT:'):
+    for token, line, next_line in tokens:
+        # Nouvelle faction : sauvegarder la précédente et réinitialiser l'état
+        if token is TOKEN_SUPPLEMENT or token is TOKEN_FACTION:
+            if token is TOKEN_SUPPLEMENT:
                 # Concaténer la ligne suivante pour le nom complet
-                next_line = ''
-                if i + 1 < len(lines):
-                    next_line = clean_text(lines[i + 1])
                 faction_name = f"{line} {next_line}".strip()
-                # Sauvegarder la faction précédente
-                if current_faction and current_faction["name"]:
-                    data["factions"].append(current_faction)
-                current_faction = {
-                    "name": faction_name,
-                    "units": [],
-                    "enhancements": []
-                }
-                current_unit = None
-                current_enhancement_category = None
-                in_enhancements_section = False
-                continue
-            
-            # Détection des sections CODEX/INDEX (factions)
-            if line.startswith('CODEX:') or line.startswith('INDEX:'):
+            else:
                 faction_name = line.replace('CODEX:', '').replace('INDEX:', '').strip()
-                
                 # Gestion spéciale pour Agents of the Imperium
-                if 'AGENTS OF THE IMPERIUM' in faction_name:
-                    in_agents_section = True
-                else:
-                    in_agents_section = False
-                
-                # Sauvegarder la faction précédente
-                if current_faction and current_faction["name"]:
-                    data["factions"].append(current_faction)
-                
-                current_faction = {
-                    "name": faction_name,
-                    "units": [],
-                    "enhancements": []
-                }
-                current_unit = None
-                current_enhancement_category = None
-                in_enhancements_section = False
-                continue
+                in_agents_section = AGENTS_FACTION in faction_name
             
-            # Ignorer les sections "EVERY MODEL HAS IMPERIUM KEYWORD" pour Agents
-            if in_agents_section and 'EVERY MODEL HAS IMPERIUM KEYWORD' in line:
-                continue
-            
-            # Ignorer les en-têtes de page et sections spéciales
-            if any(skip in line for skip in ['FORGE WORLD POINTS VALUES', 'MUNITORUM', 'FIELD MANUAL']):
-                continue
-            
-            # Détection des sections DETACHMENT ENHANCEMENTS
-            if line.startswith('DETACHMENT ENHANCEMENTS'):
-                in_enhancements_section = True
-                current_enhancement_category = None
+            if current_faction and current_faction["name"]:
+                factions.append(current_faction)
+            current_faction = {
+                "name": faction_name,
+                "units": [],
+                "enhancements": []
+            }
+            current_unit = None
+            current_enhancement_category = None
+            in_enhancements_section = False
+            continue
+        
+        # Ignorer les sections "EVERY MODEL HAS IMPERIUM KEYWORD" pour Agents
+        if in_agents_section and AGENTS_NOTE in line:
+            continue
+        
+        # Ignorer les en-têtes de page et sections spéciales
+        if token is TOKEN_PAGE_HEADER:
+            continue
+        
+        # Détection des sections DETACHMENT ENHANCEMENTS
+        if token is TOKEN_ENHANCEMENTS:
+            in_enhancements_section = True
+            current_enhancement_category = None
+            continue
+        
+        # Si on est dans la section des améliorations, traiter différemment
+        if in_enhancements_section:
+            # Ignorer les lignes purement numériques
+            if token is TOKEN_NUMBER:
                 continue
-            
-            # Si on est dans la section des améliorations, traiter différemment
-            if in_enhancements_section:
-                # Ignorer les lignes purement numériques
-                if line.isdigit():
-                    continue
-                # Détection d'une nouvelle catégorie (ligne non vide, sans 'pts', non numérique)
-                if line and 'pts' not in line and not line.isdigit():
-                    category_name = clean_name(line.strip())
-                    current_enhancement_category = {
-                        "category": category_name,
-                        "enhancements": []
-                    }
-                    if current_faction:
-                        current_faction["enhancements"].append(current_enhancement_category)
-                    continue
-                # Ajout des améliorations à la catégorie courante
-                if current_enhancement_category and 'pts' in line:
-                    enhancement_pattern = r'^(.+?)(\d+)\s*pts'
-                    enhancement_match = re.match(enhancement_pattern, line)
-                    if enhancement_match:
-                        enhancement_name = clean_name(enhancement_match.group(1).strip())
-                        enhancement_cost = enhancement_match.group(2)
-                        current_enhancement_category["enhancements"].append({
-                            "name": enhancement_name,
-                            "cost": enhancement_cost
-                        })
-                    else:
-                        print(f"Ligne enhancement non reconnue: '{line}' dans {current_enhancement_category['category']}")
-                    continue
-            
-            # Détection des unités (lignes sans points qui ne sont pas des en-têtes)
-            if (current_faction and 
-                not in_enhancements_section and
-                not line.startswith('CODEX:') and 
-                not line.startswith('INDEX:') and
-                'pts' not in line and
-                not line.isupper() and
-                len(line) > 3 and
-                not any(skip in line for skip in ['FORGE WORLD', 'DETACHMENT', 'MUNITORUM', 'FIELD MANUAL', 'CONTENTS'])):
-                
-                # C'est probablement le nom d'une unité
-                current_unit = {
-                    "name": clean_name(line),
-                    "costs": []
+            # Détection d'une nouvelle catégorie (ligne sans 'pts')
+            if token is TOKEN_UNIT_NAME or token is TOKEN_TEXT:
+                current_enhancement_category = {
+                    "category": clean_name(line),
+                    "enhancements": []
                 }
+                if current_faction:
+                    current_faction["enhancements"].append(current_enhancement_category)
                 continue
-            
-            # Détection des coûts pour l'unité courante
-            if current_unit and 'pts' in line and 'model' in line:
-                # Pattern pour extraire le nombre de modèles et les points
-                # Exemple: "1 model 160 pts" ou "5 model 65 pts"
-                cost_pattern = r'(\d+)\s*model.*?(\d+)\s*pts'
-                cost_matches = re.findall(cost_pattern, line)
-                
-                for model_count, cost_value in cost_matches:
-                    current_unit["costs"].append({
-                        "name": "model",
-                        "model": model_count,
-                        "cost": cost_value
-                    })
-                
-                # Si c'est le premier coût, ajouter l'unité à la faction
-                if len(current_unit["costs"]) == 1:
-                    current_faction["units"].append(current_unit)
-                continue
-
-            # Détection des options supplémentaires du type "Nom d'option +XX pts" (ex: Invader ATV +60 pts)
-            if current_unit and re.search(r'\+\d+\s*pts', line):
-                # Pattern pour extraire les options supplémentaires
-                # Exemple: "Invader ATV +60 pts"
-                option_pattern = r'^(.+?)\s*\+(\d+)\s*pts'
-                option_match = re.match(option_pattern, line)
-                if option_match:
-                    option_name = clean_name(option_match.group(1).strip())
-                    option_cost = option_match.group(2)
-                    current_unit["costs"].append({
-                        "cost_name": option_name,
-                        "cost": f"+{option_cost}"
+            # Ajout des améliorations à la catégorie courante
+            if current_enhancement_category:
+                enhancement_match = ENHANCEMENT_RE.match(line)
+                if enhancement_match:
+                    current_enhancement_category["enhancements"].append({
+                        "name": clean_name(enhancement_match.group(1).strip()),
+                        "cost": enhancement_match.group(2)
                     })
+                else:
+                    print(f"Ligne enhancement non reconnue: '{line}' dans {current_enhancement_category['category']}")
                 continue
+        
+        # Détection des unités (lignes sans points qui ne sont pas des en-têtes)
+        elif current_faction and (token is TOKEN_UNIT_NAME or (token is TOKEN_NUMBER and len(line) > 3)):
+            # C'est probablement le nom d'une unité
+            current_unit = {
+                "name": clean_name(line),
+                "costs": []
+            }
+            continue
+        
+        if not current_unit:
+            continue
+        
+        # Détection des coûts pour l'unité courante
+        # Exemple: "1 model 160 pts" ou "5 model 65 pts"
+        if token is TOKEN_MODEL_COST:
+            for model_count, cost_value in MODEL_COST_RE.findall(line):
+                current_unit["costs"].append({
+                    "name": "model",
+                    "model": model_count,
+                    "cost": cost_value
+                })
+            
+            # Si c'est le premier coût, ajouter l'unité à la faction
+            if len(current_unit["costs"]) == 1:
+                current_faction["units"].append(current_unit)
+        
+        # Détection des options supplémentaires du type "Nom d'option +XX pts" (ex: Invader ATV +60 pts)
+        elif token is TOKEN_OPTION_COST:
+            option_match = OPTION_COST_RE.match(line)
+            if option_match:
+                current_unit["costs"].append({
+                    "cost_name": clean_name(option_match.group(1).strip()),
+                    "cost": f"+{option_match.group(2)}"
+                })
     
     # Ajouter la dernière faction
     if current_faction and current_faction["name"]:
-        data["factions"].append(current_faction)
-    
-    doc.close()
+        factions.append(current_faction)
+
+    return factions
+
+def post_process_factions(factions: List[Dict[str, Any]]):
+    """
+    Post-traitement des factions : coûts ALLIED des Imperial Agents, améliorations vides, renommage.
 
+    Le post-traitement est idempotent : il peut être réappliqué à des factions
+    reprises d'une extraction précédente.
+    """
     # === POST-TRAITEMENT IMPERIAL AGENTS ALLIED (par catégorie) ===
     agents_faction = None
-    for faction in data["factions"]:
+    for faction in factions:
         if "IMPERIAL AGENTS" in faction["name"].upper():
             agents_faction = faction
             break
@@ -219,7 +394,7 @@ def extract_munitorum_data(pdf_path: str) -> Dict[str, Any]:
                 if unit["name"].strip() == enh["category"].strip():
                     for enh_item in enh.get("enhancements", []):
                         # Essayer d'extraire le nombre et le type depuis le nom de l'enhancement (ex: '1 model')
-                        m = re.match(r'^(\d+)\s*(model|models)', enh_item["name"].strip(), re.IGNORECASE)
+                        m = MODEL_COUNT_RE.match(enh_item["name"].strip())
                         if m:
                             model = int(m.group(1))
                             name_type = "model"
@@ -236,17 +411,206 @@ def extract_munitorum_data(pdf_path: str) -> Dict[str, Any]:
         # Supprimer les catégories utilisées
         agents_faction["enhancements"] = [e for e in agents_faction["enhancements"] if e not in categories_to_remove]
     # === SUPPRESSION DES ENHANCEMENTS VIDES ===
-    for faction in data["factions"]:
+    for faction in factions:
         faction["enhancements"] = [e for e in faction["enhancements"] if e.get("enhancements") and len(e["enhancements"]) > 0]
 
     # === RENOMMAGE DES FACTIONS ===
-    for faction in data["factions"]:
+    for faction in factions:
         # On gère les deux types d'apostrophes
         if "T'AU EMPIRE" in faction["name"] or "T’AU EMPIRE" in faction["name"]:
             faction["name"] = "TAU"
         elif "EMPEROR'S CHILDREN" in faction["name"] or "EMPEROR’S CHILDREN" in faction["name"]:
             faction["name"] = "EMPERORS_CHILDREN"
 
+
+def parse_munitorum_pages(page_texts: List[str]) -> Dict[str, Any]:
+    """
+    Analyse le texte des pages (dans l'ordre) et construit les factions, unités et améliorations
+    """
+    factions = []
+    for section in split_sections(page_texts):
+        factions.extend(parse_section(section["tokens"], section["in_agents"]))
+    post_process_factions(factions)
+    return {"factions": factions}
+
+def index_path_for(output_path: str) -> str:
+    """Index de l'extraction incrémentale, à côté du JSON (ex: munitorum_data_final.index.json)."""
+    return os.path.splitext(output_path)[0] + ".index.json"
+
+def points_changes_path_for(output_path: str) -> str:
+    """Rapport des changements de points, à côté du JSON (ex: munitorum_data_final_points_changes.json)."""
+    return os.path.splitext(output_path)[0] + "_points_changes.json"
+
+def load_json(path: str) -> Any:
+    """Charge un fichier JSON (None s'il n'existe pas ou est illisible)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def load_extraction_index(output_path: str) -> Dict[str, Any]:
+    """
+    Charge l'index de l'extraction précédente.
+
+    L'index n'est utilisé que s'il a été produit par les mêmes versions de
+    l'extraction et de l'analyse, et si le JSON de sortie n'a pas été modifié depuis.
+    """
+    index = load_json(index_path_for(output_path))
+    if not index or not os.path.exists(output_path):
+        return None
+    if index.get("extractor_version") != EXTRACTOR_VERSION or index.get("parser_version") != PARSER_VERSION:
+        return None
+    if index.get("output_sha256") != file_sha256(output_path):
+        return None
+    return index
+
+def save_extraction_index(output_path: str, page_texts: List[str], sections: List[Dict[str, Any]]):
+    """Sauvegarde le hash de chaque page et de chaque section, avec la position de ses factions dans le JSON."""
+    index = {
+        "extractor_version": EXTRACTOR_VERSION,
+        "parser_version": PARSER_VERSION,
+        "output_sha256": file_sha256(output_path),
+        "pages": [text_hash(text) for text in page_texts],
+        "sections": [
+            {"hash": section["hash"], "pages": section["pages"], "factions": section["factions"]}
+            for section in sections
+        ]
+    }
+    with open(index_path_for(output_path), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+
+def parse_sections(sections: List[Dict[str, Any]], previous_index: Dict[str, Any] = None,
+                   previous_data: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Analyse les sections et construit les données finales.
+
+    Une section dont le hash figure dans l'index précédent n'est pas réanalysée :
+    ses factions sont reprises du JSON précédent. Chaque section reçoit la
+    position de ses factions ("factions") et indique si elle a été réanalysée
+    ("reparsed") ; une section reprise garde la position de ses factions dans le
+    JSON précédent ("previous_factions").
+    """
+    previous_sections = {}
+    if previous_index and previous_data:
+        previous_sections = {entry["hash"]: entry["factions"] for entry in previous_index["sections"]}
+
+    factions = []
+    for section in sections:
+        if section["hash"] in previous_sections:
+            section["previous_factions"] = previous_sections[section["hash"]]
+            section_factions = [copy.deepcopy(previous_data["factions"][position])
+                                for position in section["previous_factions"]]
+            section["reparsed"] = False
+        else:
+            section_factions = parse_section(section["tokens"], section["in_agents"])
+            section["reparsed"] = True
+        section["factions"] = list(range(len(factions), len(factions) + len(section_factions)))
+        factions.extend(section_factions)
+
+    post_process_factions(factions)
+    return {"factions": factions}
+
+def cost_label(cost: Dict[str, Any]) -> str:
+    """Libellé d'une ligne de coût d'unité (ex: "5 model", "Invader ATV", "1 model (ALLIED)")."""
+    if "cost_name" in cost:
+        label = cost["cost_name"]
+    elif cost.get("model") is not None:
+        label = f"{cost['model']} {cost.get('name', 'model')}"
+    else:
+        label = str(cost.get("name", ""))
+    if cost.get("source"):
+        label += f" ({cost['source']})"
+    return label
+
+def faction_points(faction: Dict[str, Any]) -> Dict[tuple, str]:
+    """Coûts d'une faction : (type, nom, option) -> coût, pour les unités et les améliorations."""
+    points = {}
+    for unit in faction["units"]:
+        for cost in unit["costs"]:
+            points[("unit", unit["name"], cost_label(cost))] = cost["cost"]
+    for category in faction["enhancements"]:
+        for enhancement in category["enhancements"]:
+            points[("enhancement", enhancement["name"], category["category"])] = enhancement["cost"]
+    return points
+
+def diff_points(old_factions: List[Dict[str, Any]], new_factions: List[Dict[str, Any]],
+                names: set = None) -> List[Dict[str, Any]]:
+    """
+    Liste les coûts ajoutés, supprimés ou modifiés entre deux extractions.
+
+    names restreint la comparaison à certaines factions (celles dont une section a changé).
+    """
+    old_points = {f["name"]: faction_points(f) for f in old_factions if names is None or f["name"] in names}
+    new_points = {f["name"]: faction_points(f) for f in new_factions if names is None or f["name"] in names}
+    changes = []
+    for faction_name in list(new_points) + [name for name in old_points if name not in new_points]:
+        old = old_points.get(faction_name, {})
+        new = new_points.get(faction_name, {})
+        for key in list(new) + [k for k in old if k not in new]:
+            if old.get(key) == new.get(key):
+                continue
+            kind, name, option = key
+            entry = {"faction": faction_name, kind: name}
+            entry["option" if kind == "unit" else "detachment"] = option
+            entry["old"] = old.get(key)
+            entry["new"] = new.get(key)
+            changes.append(entry)
+    return changes
+
+def update_munitorum_data(pdf_path: str, output_path: str, jobs: int = 1, use_cache: bool = True,
+                          incremental: bool = True) -> Dict[str, Any]:
+    """
+    Met à jour le JSON de sortie à partir d'une nouvelle édition du PDF.
+
+    Les pages sont découpées en sections de faction hashées ; avec l'index de
+    l'extraction précédente, seules les sections dont le contenu a changé sont
+    réanalysées, les autres factions sont reprises du JSON précédent. Si un JSON
+    précédent existe, un rapport des coûts modifiés (ancien et nouveau coût) est
+    écrit à côté, en ne comparant que les factions des sections modifiées.
+    """
+    page_texts = extract_page_texts(pdf_path, jobs, use_cache)
+    write_text_sidecar(pdf_path, page_texts)
+
+    previous_data = load_json(output_path)
+    previous_index = load_extraction_index(output_path) if incremental and previous_data else None
+
+    sections = split_sections(page_texts)
+    data = parse_sections(sections, previous_index, previous_data)
+
+    reparsed = [section for section in sections if section["reparsed"]]
+    if previous_index:
+        previous_pages = previous_index["pages"]
+        changed_pages = [page_num + 1 for page_num, text in enumerate(page_texts)
+                         if page_num >= len(previous_pages) or previous_pages[page_num] != text_hash(text)]
+        print(f"Extraction incrémentale : {len(changed_pages)} pages modifiées, "
+              f"{len(reparsed)} sections réanalysées, {len(sections) - len(reparsed)} reprises")
+
+    if previous_data:
+        if previous_index:
+            # Factions touchées : celles des sections réanalysées et celles des sections disparues
+            reused = {position for section in sections for position in section.get("previous_factions", [])}
+            names = {data["factions"][position]["name"] for section in reparsed for position in section["factions"]}
+            names |= {faction["name"] for position, faction in enumerate(previous_data["factions"])
+                      if position not in reused}
+        else:
+            names = None
+        changes = diff_points(previous_data["factions"], data["factions"], names)
+        with open(points_changes_path_for(output_path), 'w', encoding='utf-8') as f:
+            json.dump({
+                "pdf": pdf_path,
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "pages": len(page_texts),
+                "sections_reparsed": len(reparsed),
+                "sections_reused": len(sections) - len(reparsed),
+                "changes": changes
+            }, f, indent=2, ensure_ascii=False)
+        print(f"{len(changes)} coûts modifiés -> {points_changes_path_for(output_path)}")
+
+    save_data(data, output_path)
+    save_extraction_index(output_path, page_texts, sections)
     return data
 
 def save_data(data: Dict[str, Any], output_path: str):
@@ -255,11 +619,23 @@ def save_data(data: Dict[str, Any], output_path: str):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 if __name__ == "__main__":
-    pdf_path = "Input Points/bds.pdf"
-    output_path = "munitorum_data_final.json"
+    parser = argparse.ArgumentParser(description="Extraction des données du PDF Munitorum Field Manual")
+    parser.add_argument("pdf_path", nargs="?", default="Input Points/bds.pdf", help="PDF à analyser")
+    parser.add_argument("--output", default="munitorum_data_final.json", help="Fichier JSON de sortie")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Nombre de processus pour l'extraction du texte (0 = nombre de CPU)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore le cache du texte des pages et redécode tout le PDF")
+    parser.add_argument("--full", action="store_true",
+                        help="Réanalyse toutes les sections, sans reprendre les factions de l'extraction précédente")
+    args = parser.parse_args()
+    pdf_path = args.pdf_path
+    output_path = args.output
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
     print("Extraction des données du PDF Munitorum Field Manual (version finale)...")
-    data = extract_munitorum_data(pdf_path)
+    data = update_munitorum_data(pdf_path, output_path, jobs, use_cache=not args.no_cache,
+                                 incremental=not args.full)
     
     print(f"Données extraites : {len(data['factions'])} factions trouvées")
     
@@ -304,5 +680,4 @@ if __name__ == "__main__":
     print(f"Total des unités: {total_units}")
     print(f"Total des catégories d'améliorations: {total_enhancements}")
     
-    save_data(data, output_path)
     print(f"\nDonnées sauvegardées dans {output_path}") 
\ No newline at end of file
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Écriture des fichiers JSON du dépôt.
+
+Les fichiers sont sérialisés au format du dépôt (indent=2, ensure_ascii=False)
+et écrits de façon atomique : le contenu est écrit dans un fichier temporaire
+du même dossier puis renommé, un fichier n'est donc jamais laissé à moitié écrit.
+write_bytes_atomic fait de même pour les fichiers binaires.
+"""
+
+import json
+import os
+import tempfile
+
+def dump_json(data, indent=2):
+    """Sérialise des données au format JSON du dépôt."""
+    return json.dumps(data, indent=indent, ensure_ascii=False)
+
+def write_bytes_atomic(path, content):
+    """Écrit des octets dans un fichier temporaire puis le renomme sur le fichier cible."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        # mkstemp crée le fichier en 0600 : garder les droits du fichier remplacé
+        mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_text_atomic(path, content):
+    """Écrit un texte UTF-8 de façon atomique."""
+    write_bytes_atomic(path, content.encode('utf-8'))
+
+def write_json_atomic(path, data, indent=2):
+    """Écrit un fichier JSON de façon atomique."""
+    write_text_atomic(path, dump_json(data, indent))
+
+def write_json_if_changed(path, data, indent=2):
+    """
+    Écrit un fichier JSON de façon atomique seulement si son contenu change.
+
+    Retourne True si le fichier a été écrit, False s'il était déjà identique
+    (sa date de modification n'est alors pas touchée).
+    """
+    content = dump_json(data, indent)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    write_text_atomic(path, content)
+    return True
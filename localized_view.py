@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vue traduite à la demande d'une faction.
+
+Les fichiers structure/<id>.translated.json contiennent des clés de traduction
+à la place des textes. open_faction() charge la structure et retourne une vue
+(LocalizedMapping) qui se comporte comme le document : les dicts et les listes
+sont enveloppés au fil des accès, et chaque chaîne lue est résolue à ce moment-là
+selon la chaîne de repli fr -> en -> clé brute (les valeurs qui ne sont pas des
+clés, ex: ids, couleurs, "Leader", sont ainsi rendues telles quelles).
+
+Les traductions sont lues dans le pack dist/<langue>.pack s'il existe et est
+plus récent que le fichier à plat et que le fichier commun, sinon dans <langue>/<id>.flat.json (chargé
+à la première clé demandée, références "@common:" résolues). Les résultats sont
+gardés dans un cache LRU borné : afficher une fiche d'unité ne demande pas de
+construire une copie traduite de toute la faction. Une fiche d'unité se
+cherche par id, par nom anglais ou par nom traduit.
+
+Utilisation:
+  python localized_view.py SM "Captain in Gravis Armour" [--locale fr]
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+
+from translation_memory import common_path, load_flat
+from translation_pack import DIST_DIR, TranslationPack, pack_path_for
+
+STRUCTURE_DIR = "structure"
+
+# Nombre de chaînes résolues gardées en cache par faction
+DEFAULT_CACHE_SIZE = 4096
+
+class FlatSource:
+    """Traductions d'une faction dans une langue, lues dans le pack ou dans le fichier à plat."""
+
+    def __init__(self, faction_id, locale, locale_dir, pack_dir):
+        self.faction_id = faction_id
+        self.locale = locale
+        self.flat_path = os.path.join(locale_dir, f"{faction_id}.flat.json")
+        pack_path = pack_path_for(locale, pack_dir)
+        self.pack = None
+        # Le pack contient les textes communs résolus : il doit aussi être plus récent que le fichier commun
+        sources = [path for path in (self.flat_path, common_path(locale_dir)) if os.path.exists(path)]
+        if os.path.exists(pack_path) and all(os.path.getmtime(pack_path) >= os.path.getmtime(path)
+                                             for path in sources):
+            self.pack = TranslationPack(pack_path)
+        self._flat = None
+
+    def get(self, key):
+        """Texte d'une clé, ou None."""
+        if self.pack is not None:
+            return self.pack.get(self.faction_id, key)
+        if self._flat is None:
+            # Repli sans pack : le fichier à plat est chargé une fois, à la première clé
+            self._flat = load_flat(self.flat_path)
+        return self._flat.get(key)
+
+    def close(self):
+        if self.pack is not None:
+            self.pack.close()
+
+class Localizer:
+    """Résout les clés de traduction d'une faction selon une chaîne de langues, avec cache LRU."""
+
+    def __init__(self, faction_id, locales=("fr", "en"), locale_dirs=None, pack_dir=DIST_DIR,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        locale_dirs = locale_dirs or {}
+        self.sources = [FlatSource(faction_id, locale, locale_dirs.get(locale, locale), pack_dir)
+                        for locale in locales]
+        self._locale_dirs = locale_dirs
+        self._pack_dir = pack_dir
+        self._faction_id = faction_id
+        self._extra_sources = []
+        self.translate = lru_cache(maxsize=cache_size)(self._translate)
+
+    def _translate(self, key):
+        """Texte de la première langue qui connaît la clé, sinon la clé elle-même."""
+        for source in self.sources:
+            value = source.get(key)
+            if value is not None:
+                return value
+        return key
+
+    def source(self, locale):
+        """Source d'une langue, ajoutée hors de la chaîne de repli si elle n'en fait pas partie."""
+        for source in self.sources:
+            if source.locale == locale:
+                return source
+        source = FlatSource(self._faction_id, locale, self._locale_dirs.get(locale, locale), self._pack_dir)
+        self._extra_sources.append(source)
+        return source
+
+    def close(self):
+        for source in self.sources + self._extra_sources:
+            source.close()
+
+def wrap(value, localizer):
+    """Enveloppe une valeur du document : dict et liste en vue, chaîne traduite."""
+    if isinstance(value, dict):
+        return LocalizedMapping(value, localizer)
+    if isinstance(value, list):
+        return LocalizedList(value, localizer)
+    if isinstance(value, str):
+        return localizer.translate(value)
+    return value
+
+def materialize(value):
+    """Copie traduite (dicts et listes ordinaires) d'une vue ou d'une valeur déjà résolue."""
+    if isinstance(value, Mapping):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, (LocalizedList, list)):
+        return [materialize(item) for item in value]
+    return value
+
+class LocalizedMapping(Mapping):
+    """Dict du document dont les valeurs sont traduites à l'accès."""
+
+    def __init__(self, data, localizer):
+        self._data = data
+        self._localizer = localizer
+
+    def __getitem__(self, key):
+        return wrap(self._data[key], self._localizer)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"LocalizedMapping({list(self._data)!r})"
+
+class LocalizedList(Sequence):
+    """Liste du document dont les éléments sont traduits à l'accès."""
+
+    def __init__(self, data, localizer):
+        self._data = data
+        self._localizer = localizer
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [wrap(item, self._localizer) for item in self._data[index]]
+        return wrap(self._data[index], self._localizer)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"LocalizedList(len={len(self._data)})"
+
+class FactionView(LocalizedMapping):
+    """Vue traduite d'une faction (document racine), avec recherche de fiche d'unité."""
+
+    def __init__(self, data, localizer):
+        super().__init__(data, localizer)
+        self.localizer = localizer
+
+    def datasheet(self, id_or_name):
+        """Fiche d'unité par id, nom anglais ou nom traduit (ou None) ; seuls les noms sont traduits pour la recherche."""
+        english = self.localizer.source("en")
+        for datasheet in self._data["datasheets"]:
+            name = datasheet.get("name")
+            if datasheet.get("id") == id_or_name or (isinstance(name, str) and id_or_name in (
+                    self.localizer.translate(name), english.get(name) or name)):
+                return wrap(datasheet, self.localizer)
+        return None
+
+    def close(self):
+        self.localizer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_faction(faction_id, locale="fr", fallback_locales=("en",), structure_dir=STRUCTURE_DIR,
+                 locale_dirs=None, pack_dir=DIST_DIR, cache_size=DEFAULT_CACHE_SIZE):
+    """
+    Ouvre structure/<faction_id>.translated.json et retourne sa vue traduite.
+
+    locale_dirs associe une langue à son dossier de fichiers à plat (défaut: le
+    nom de la langue, ex: fr/).
+    """
+    with open(os.path.join(structure_dir, f"{faction_id}.translated.json"), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    locales = (locale,) + tuple(fallback for fallback in fallback_locales if fallback != locale)
+    return FactionView(data, Localizer(faction_id, locales, locale_dirs, pack_dir, cache_size))
+
+def main():
+    parser = argparse.ArgumentParser(description="Affiche une fiche d'unité traduite")
+    parser.add_argument("faction_id", help="Identifiant de la faction (ex: SM)")
+    parser.add_argument("datasheet", help="Id, nom anglais ou nom traduit de la fiche d'unité")
+    parser.add_argument("--locale", default="fr", help="Langue (défaut: fr, repli sur en)")
+    parser.add_argument("--structure-dir", default=STRUCTURE_DIR, help=f"Dossier des structures (défaut: {STRUCTURE_DIR})")
+    args = parser.parse_args()
+
+    try:
+        view = open_faction(args.faction_id, args.locale, structure_dir=args.structure_dir)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    with view:
+        datasheet = view.datasheet(args.datasheet)
+        if datasheet is None:
+            print(f"❌ Fiche '{args.datasheet}' introuvable dans {args.faction_id}")
+            sys.exit(1)
+        print(json.dumps(materialize(datasheet), indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
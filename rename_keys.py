@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Renommage des clés de traduction générées par position en clés lisibles.
+
+Les clés positionnelles (ex: datasheets.Captain.meleeWeapons.0.profiles.0.name)
+sont renommées d'après leur texte anglais en snake_case (close_combat_weapon).
+Chaque règle de RENAME_RULES décrit une famille de clés ; toutes les règles sont
+réunies en une seule table ancienne clé -> nouvelle clé par faction, appliquée
+en une passe au JSON de structure et aux fichiers à plat EN et FR (et au
+fichier pending FR), chaque fichier étant écrit une seule fois.
+
+Plusieurs anciennes clés peuvent donner la même nouvelle clé (même arme dans
+plusieurs datasheets, ou textes ne différant que par la casse ou la
+ponctuation : "Bolt Pistol" / "Bolt pistol"). Elles sont fusionnées, avec un
+choix indépendant de l'ordre des fichiers : la valeur d'une clé déjà existante
+l'emporte, sinon celle de la plus petite ancienne clé ; côté FR, la première
+valeur traduite dans ce même ordre (une valeur dont le snake_case est la clé
+est une variante du texte anglais). Les textes anglais et traductions
+divergentes écartés sont journalisés. Les références "@common:" (voir
+translation_memory.py) sont résolues avant de dériver les clés et de comparer
+les valeurs ; les fichiers gardent leurs références.
+
+Le journal de migration (rename_log.json) contient la table de chaque faction :
+--replay l'applique à nouveau (ex: à une structure régénérée) sans la recalculer.
+--dry-run n'écrit ni les fichiers ni le journal.
+
+Utilisation:
+  python rename_keys.py [FACTION ...] [--rules weapons faction_abilities] [--dry-run]
+  python rename_keys.py --replay rename_log.json [FACTION ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from glob import glob
+
+from json_io import write_json_atomic, write_json_if_changed
+from translation_memory import load_common, resolve
+
+def to_snake_case(name):
+    s = name.lower()
+    s = re.sub(r"[^a-z0-9]+", "_", s)
+    s = re.sub(r"_+", "_", s)
+    return s.strip('_')
+
+# Familles de clés renommées d'après leur texte anglais, dans l'ordre d'application
+RENAME_RULES = {
+    # Noms des profils d'armes
+    "weapons": re.compile(r'datasheets\.([A-Za-z0-9_]+)\.(meleeWeapons|rangedWeapons)\.(\d+)\.profiles\.(\d+)\.name'),
+    # Aptitudes de faction des datasheets
+    "faction_abilities": re.compile(r'datasheets\.([A-Za-z0-9_]+)\.abilities\.faction\.(\d+)'),
+}
+
+STRUCTURE_DIR = "updated translations in progress"
+EN_DIR = "en"
+FR_DIR = "fr"
+
+# Journal de migration par défaut
+LOG_FILE = "rename_log.json"
+
+def faction_files(faction, structure_dir=STRUCTURE_DIR):
+    """Fichiers d'une faction touchés par le renommage : structure, flat EN, flat FR, pending FR."""
+    return {
+        "structure": os.path.join(structure_dir, f"{faction}.translated.json"),
+        "en": os.path.join(EN_DIR, f"{faction}.flat.json"),
+        "fr": os.path.join(FR_DIR, f"{faction}.flat.json"),
+        "pending": os.path.join(FR_DIR, f"{faction}.pending.json"),
+    }
+
+def build_rename_map(flat_en, rules, common_en=None):
+    """
+    Table ancienne clé -> nouvelle clé pour un flat anglais (première règle qui correspond).
+
+    Les références vers le fichier commun common_en sont résolues : la clé est
+    dérivée du texte, pas de la référence.
+    """
+    common_en = common_en or {}
+    rename_map = {}
+    for key, value in flat_en.items():
+        for pattern in rules.values():
+            if pattern.fullmatch(key):
+                text = resolve(value, common_en)
+                new_key = to_snake_case(text) if isinstance(text, str) else ""
+                if new_key:
+                    rename_map[key] = new_key
+                break
+    return rename_map
+
+def is_english_variant(value, key):
+    """Indique si une valeur est une variante du texte anglais dont la clé est dérivée."""
+    return isinstance(value, str) and to_snake_case(value) == key
+
+def rename_flat(flat, rename_map, prefer_translated=False, common=None):
+    """
+    Copie d'un fichier à plat dont les clés sont renommées, dans l'ordre d'origine.
+
+    Les clés fusionnées gardent la valeur de la clé déjà existante, sinon de la
+    plus petite ancienne clé ; avec prefer_translated (flat FR), la première
+    valeur qui n'est pas une variante du texte anglais est préférée et les
+    variantes anglaises écartées ne sont pas signalées. Les valeurs sont
+    comparées une fois leurs références vers common résolues, mais écrites
+    telles quelles. Retourne (flat renommé, textes écartés par clé).
+    """
+    common = common or {}
+    groups = {}
+    for key in flat:
+        groups.setdefault(rename_map.get(key, key), []).append(key)
+
+    renamed = {}
+    conflicts = []
+    for new_key, keys in groups.items():
+        # (valeur écrite, texte résolu), dans l'ordre de priorité
+        values = [(flat[key], resolve(flat[key], common))
+                  for key in sorted(keys, key=lambda key: (key != new_key, key))]
+        chosen = values[0]
+        if prefer_translated:
+            values = [value for value in values if not is_english_variant(value[1], new_key)]
+            chosen = values[0] if values else chosen
+        renamed[new_key] = chosen[0]
+        dropped = []
+        for _, text in values:
+            if text != chosen[1] and text not in dropped:
+                dropped.append(text)
+        if dropped:
+            conflicts.append({"key": new_key, "kept": chosen[1], "dropped": dropped})
+    return renamed, conflicts
+
+def rename_values(value, rename_map):
+    """Copie du JSON de structure où chaque chaîne égale à une ancienne clé est remplacée."""
+    if isinstance(value, dict):
+        return {key: rename_values(item, rename_map) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rename_values(item, rename_map) for item in value]
+    if isinstance(value, str):
+        return rename_map.get(value, value)
+    return value
+
+def load_json(path):
+    """Charge un fichier JSON (None s'il n'existe pas)."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def contains_old_key(kind, data, rename_map):
+    """Indique si un fichier chargé contient au moins une clé de la table de renommage."""
+    if kind == "structure":
+        # Les clés apparaissent comme valeurs dans le JSON de structure
+        if isinstance(data, dict):
+            return any(contains_old_key(kind, item, rename_map) for item in data.values())
+        if isinstance(data, list):
+            return any(contains_old_key(kind, item, rename_map) for item in data)
+        return isinstance(data, str) and data in rename_map
+    if kind == "pending":
+        return any(key in rename_map for entries in data.values() for key in entries)
+    return any(key in rename_map for key in data)
+
+def apply_rename_map(files, rename_map, dry_run=False):
+    """
+    Applique une table de renommage aux fichiers d'une faction, chacun lu et écrit une fois.
+
+    Un fichier qui ne contient aucune ancienne clé n'est ni réécrit ni
+    resérialisé : un renommage ne touche que les fichiers qu'il renomme.
+    Retourne ({fichier: écrit ou non (None si absent)}, textes anglais écartés,
+    traductions FR écartées).
+    """
+    written = {}
+    collisions = []
+    conflicts = []
+    if not rename_map:
+        return {path: (False if os.path.exists(path) else None) for path in files.values()}, collisions, conflicts
+    common_en = load_common(os.path.dirname(files["en"]))
+    common_fr = load_common(os.path.dirname(files["fr"]))
+    for kind, path in files.items():
+        data = load_json(path)
+        if data is None:
+            written[path] = None
+            continue
+        if not contains_old_key(kind, data, rename_map):
+            written[path] = False
+            continue
+        if kind == "structure":
+            data = rename_values(data, rename_map)
+        elif kind == "pending":
+            # Sections "added" et "stale" indexées par clé, "removed" liste de clés
+            data = {section: rename_flat(entries, rename_map, common=common_fr)[0] if isinstance(entries, dict)
+                    else list(dict.fromkeys(rename_map.get(key, key) for key in entries))
+                    for section, entries in data.items()}
+        elif kind == "en":
+            data, collisions = rename_flat(data, rename_map, common=common_en)
+        else:
+            data, conflicts = rename_flat(data, rename_map, prefer_translated=True, common=common_fr)
+        written[path] = False if dry_run else write_json_if_changed(path, data)
+    return written, collisions, conflicts
+
+def resolve_faction(faction):
+    """Identifiant de faction tel qu'il est nommé dans en/ (ex: sm -> SM)."""
+    if os.path.exists(os.path.join(EN_DIR, f"{faction}.flat.json")):
+        return faction
+    return faction.upper()
+
+def list_factions(structure_dir=STRUCTURE_DIR):
+    """Factions ayant un JSON de structure à renommer."""
+    return sorted(os.path.basename(path).split('.')[0]
+                  for path in glob(os.path.join(structure_dir, "*.translated.json")))
+
+def rename_faction(faction, rules, structure_dir=STRUCTURE_DIR, dry_run=False, rename_map=None):
+    """
+    Renomme les clés d'une faction ; retourne son entrée du journal de migration.
+
+    rename_map, s'il est fourni (rejeu d'un journal), remplace le calcul de la
+    table à partir du flat anglais.
+    """
+    files = faction_files(faction, structure_dir)
+    if rename_map is None:
+        flat_en = load_json(files["en"])
+        if flat_en is None:
+            return None
+        rename_map = build_rename_map(flat_en, rules, load_common(os.path.dirname(files["en"])))
+    written, collisions, conflicts = apply_rename_map(files, rename_map, dry_run)
+    return {"renames": rename_map, "collisions": collisions, "value_conflicts": conflicts, "files": written}
+
+def print_faction_result(faction, entry):
+    """Affiche le résultat d'une faction."""
+    targets = set(entry["renames"].values())
+    print(f"{faction}: {len(entry['renames'])} clés renommées vers {len(targets)} clés, "
+          f"{len(entry['collisions'])} textes anglais fusionnés, {len(entry['value_conflicts'])} traductions divergentes")
+    for path, written in entry["files"].items():
+        if written is None:
+            continue
+        print(f"  {'Fichier modifié' if written else 'Aucun changement'} : {path}")
+
+def run(factions=None, rule_names=None, structure_dir=STRUCTURE_DIR, dry_run=False, log_path=LOG_FILE, replay=None):
+    """Renomme les clés des factions demandées (toutes par défaut) et écrit le journal de migration."""
+    replayed = None
+    if replay:
+        replayed = load_json(replay)
+        if replayed is None:
+            print(f"Journal introuvable : {replay}")
+            sys.exit(1)
+        rule_names = replayed.get("rules", [])
+    rules = {name: RENAME_RULES[name] for name in (rule_names or RENAME_RULES)}
+    factions = [resolve_faction(faction) for faction in factions] if factions else (
+        sorted(replayed["factions"]) if replayed else list_factions(structure_dir))
+
+    log = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "rules": list(rules),
+        "replay_of": replay,
+        "factions": {}
+    }
+    for faction in factions:
+        rename_map = None
+        if replayed is not None:
+            if faction not in replayed["factions"]:
+                print(f"{faction}: absente du journal {replay}")
+                continue
+            rename_map = replayed["factions"][faction]["renames"]
+        entry = rename_faction(faction, rules, structure_dir, dry_run, rename_map)
+        if entry is None:
+            print(f"Flat anglais introuvable pour {faction}")
+            continue
+        log["factions"][faction] = entry
+        print_faction_result(faction, entry)
+
+    if dry_run:
+        # Les tables d'un dry-run n'ont pas été appliquées : le journal utilisé par --replay est gardé
+        print(f"Mode dry-run : journal {log_path} inchangé")
+        return log
+    if not any(entry["renames"] for entry in log["factions"].values()):
+        # Un journal précédent reste réutilisable pour --replay
+        print(f"Aucune clé à renommer, journal {log_path} inchangé")
+        return log
+    write_json_atomic(log_path, log)
+    print(f"Journal de migration : {log_path}")
+    return log
+
+def main(default_rules=None):
+    parser = argparse.ArgumentParser(description="Renomme les clés de traduction positionnelles d'après leur texte anglais")
+    parser.add_argument("factions", nargs="*", help="Factions à traiter (défaut: toutes celles de la structure)")
+    if default_rules is None:
+        parser.add_argument("--rules", nargs="+", choices=sorted(RENAME_RULES), default=None,
+                            help="Règles à appliquer (défaut: toutes)")
+    parser.add_argument("--structure-dir", default=STRUCTURE_DIR, help=f"Dossier des JSON de structure (défaut: {STRUCTURE_DIR})")
+    parser.add_argument("--dry-run", action="store_true", help="Calcule les renommages sans écrire les fichiers")
+    parser.add_argument("--log", default=LOG_FILE, help=f"Journal de migration (défaut: {LOG_FILE})")
+    parser.add_argument("--replay", default=None, help="Rejoue les renommages d'un journal de migration")
+    args = parser.parse_args()
+
+    rule_names = default_rules if default_rules is not None else args.rules
+    run(args.factions, rule_names, args.structure_dir, args.dry_run, args.log, args.replay)
+
+if __name__ == '__main__':
+    main()
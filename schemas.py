@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Schémas des fichiers JSON du pipeline et validateurs compilés.
+
+Les schémas utilisent un sous-ensemble de JSON Schema : type (nom ou liste de
+noms), properties, required, additionalProperties (False ou un schéma), items,
+anyOf et pattern. compile_schema() les transforme une fois pour toutes en fonctions
+imbriquées : les champs dont le schéma n'est qu'un type sont vérifiés sur place
+par le validateur parent, sans appel ni construction de chemin, et le chemin
+d'une valeur (JSON Pointer, RFC 6901) n'est calculé que pour les valeurs
+composées ou en erreur.
+
+Un validateur compilé s'appelle validate(valeur, pointeur, erreurs) et ajoute
+à erreurs un dict {"pointer", "message"} par problème trouvé.
+
+Fichiers couverts (schema_for_path) :
+  - archive/<id>.json : fichiers de faction téléchargés ;
+  - structure/<id>.translated.json : structures à clés de traduction ;
+  - <langue>/<id>.flat.json : fichiers à plat clé -> texte ;
+  - <langue>/<id>.pending.json : traductions à faire ;
+  - munitorum_data_final.json : extraction du Munitorum Field Manual.
+"""
+
+import os
+import re
+
+# Types JSON -> types Python produits par json.load (comparés exactement : bool n'est pas un integer)
+JSON_TYPES = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "null": (type(None),),
+    "array": (list,),
+    "object": (dict,),
+}
+
+PYTHON_TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean",
+                     type(None): "null", list: "array", dict: "object"}
+
+def escape_pointer(token):
+    """Échappe un segment de JSON Pointer (~ -> ~0, / -> ~1)."""
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def type_name(value):
+    """Nom du type JSON d'une valeur."""
+    return PYTHON_TYPE_NAMES.get(type(value), type(value).__name__)
+
+def schema_types(schema):
+    """Types Python acceptés par un schéma (None s'il n'impose pas de type)."""
+    names = schema.get("type")
+    if names is None:
+        return None
+    if isinstance(names, str):
+        names = [names]
+    return tuple(python_type for name in names for python_type in JSON_TYPES[name])
+
+def type_error(pointer, schema, value):
+    """Erreur de type d'une valeur."""
+    expected = schema["type"] if isinstance(schema["type"], str) else " | ".join(schema["type"])
+    return {"pointer": pointer, "message": f"type attendu : {expected}, trouvé : {type_name(value)}"}
+
+def is_type_only(schema):
+    """Indique si un schéma ne fait que vérifier un type (vérifiable sur place par le parent)."""
+    return set(schema) == {"type"}
+
+def compile_schema(schema):
+    """Compile un schéma en une fonction validate(valeur, pointeur, erreurs)."""
+    types = schema_types(schema)
+    checks = []
+    if "properties" in schema or "required" in schema or "additionalProperties" in schema:
+        checks.append(compile_object(schema))
+    if "items" in schema:
+        checks.append(compile_array(schema))
+    if "anyOf" in schema:
+        checks.append(compile_any_of(schema))
+    if "pattern" in schema:
+        checks.append(compile_pattern(schema))
+
+    def validate(value, pointer, errors):
+        if types is not None and type(value) not in types:
+            errors.append(type_error(pointer, schema, value))
+            return
+        for check in checks:
+            check(value, pointer, errors)
+
+    if len(checks) == 1 and types is not None and set(types) <= {dict, list}:
+        # Les vérifications d'objet et de liste contrôlent déjà le type
+        return checks[0]
+    return validate
+
+def compile_member(schema):
+    """(types vérifiés sur place, validateur) pour une propriété ou un élément de liste."""
+    if is_type_only(schema):
+        return schema_types(schema), None
+    return None, compile_schema(schema)
+
+def compile_object(schema):
+    """Validateur d'un objet : champs requis, propriétés connues et propriétés supplémentaires."""
+    properties = {}
+    for name, property_schema in schema.get("properties", {}).items():
+        types, validator = compile_member(property_schema)
+        properties[name] = (escape_pointer(name), property_schema, types, validator)
+    required = [(name, escape_pointer(name)) for name in schema.get("required", [])]
+    additional = schema.get("additionalProperties", True)
+    additional_types = additional_validator = None
+    if isinstance(additional, dict):
+        additional_types, additional_validator = compile_member(additional)
+
+    def validate(value, pointer, errors):
+        if type(value) is not dict:
+            errors.append({"pointer": pointer, "message": f"type attendu : object, trouvé : {type_name(value)}"})
+            return
+        for name, escaped in required:
+            if name not in value:
+                errors.append({"pointer": f"{pointer}/{escaped}", "message": "champ requis manquant"})
+        for name, item in value.items():
+            entry = properties.get(name)
+            if entry is not None:
+                escaped, item_schema, types, validator = entry
+            elif additional is True:
+                continue
+            elif additional is False:
+                errors.append({"pointer": f"{pointer}/{escape_pointer(name)}", "message": "champ non autorisé"})
+                continue
+            else:
+                escaped, item_schema, types, validator = (escape_pointer(name), additional,
+                                                          additional_types, additional_validator)
+            if types is not None:
+                if type(item) not in types:
+                    errors.append(type_error(f"{pointer}/{escaped}", item_schema, item))
+            else:
+                validator(item, f"{pointer}/{escaped}", errors)
+
+    return validate
+
+def compile_array(schema):
+    """Validateur d'une liste et de ses éléments."""
+    item_schema = schema["items"]
+    types, validator = compile_member(item_schema)
+
+    def validate(value, pointer, errors):
+        if type(value) is not list:
+            errors.append({"pointer": pointer, "message": f"type attendu : array, trouvé : {type_name(value)}"})
+            return
+        if types is not None:
+            for index, item in enumerate(value):
+                if type(item) not in types:
+                    errors.append(type_error(f"{pointer}/{index}", item_schema, item))
+        else:
+            for index, item in enumerate(value):
+                validator(item, f"{pointer}/{index}", errors)
+
+    return validate
+
+def compile_any_of(schema):
+    """Validateur d'une valeur qui doit respecter au moins un des schémas de anyOf."""
+    validators = [compile_schema(option) for option in schema["anyOf"]]
+
+    def validate(value, pointer, errors):
+        messages = []
+        for validator in validators:
+            option_errors = []
+            validator(value, pointer, option_errors)
+            if not option_errors:
+                return
+            messages.extend(error["message"] if error["pointer"] == pointer
+                            else f"{error['pointer'][len(pointer):]} : {error['message']}"
+                            for error in option_errors)
+        errors.append({"pointer": pointer, "message": "aucune variante ne correspond (" + " ; ".join(messages) + ")"})
+
+    return validate
+
+def compile_pattern(schema):
+    """Validateur d'une chaîne qui doit correspondre entièrement à une expression régulière."""
+    pattern = re.compile(schema["pattern"])
+
+    def validate(value, pointer, errors):
+        if type(value) is str and not pattern.fullmatch(value):
+            errors.append({"pointer": pointer, "message": f"valeur {value!r} ne correspond pas à {schema['pattern']}"})
+
+    return validate
+
+def object_schema(required, optional=None):
+    """Schéma d'un objet dont les champs requis et facultatifs sont décrits (champ -> schéma)."""
+    return {
+        "type": "object",
+        "properties": {**required, **(optional or {})},
+        "required": list(required),
+    }
+
+def array_of(items):
+    return {"type": "array", "items": items}
+
+STRING = {"type": "string"}
+INTEGER = {"type": "integer"}
+BOOLEAN = {"type": "boolean"}
+NULLABLE_STRING = {"type": ["string", "null"]}
+STRING_LIST = array_of(STRING)
+
+# --- Fichiers de faction (archive/ et structure/) ---
+
+ABILITY = object_schema(
+    {"name": STRING, "description": STRING, "showAbility": BOOLEAN, "showDescription": BOOLEAN})
+
+PRIMARCH_ABILITY = object_schema(
+    {"name": STRING, "description": STRING},
+    {"showAbility": BOOLEAN, "showDescription": BOOLEAN})
+
+ABILITIES = object_schema(
+    {
+        "core": STRING_LIST,
+        "damaged": object_schema({"description": STRING, "range": STRING,
+                                  "showDamagedAbility": BOOLEAN, "showDescription": BOOLEAN}),
+        "faction": STRING_LIST,
+        "other": array_of(ABILITY),
+        "primarch": array_of(object_schema({"name": STRING, "showAbility": BOOLEAN,
+                                            "abilities": array_of(PRIMARCH_ABILITY)})),
+        "special": array_of(ABILITY),
+        "wargear": array_of(ABILITY),
+    },
+    {
+        # Présent dans archive/, remplacé par stats[].invul dans structure/
+        "invul": object_schema({"info": STRING, "showInfo": BOOLEAN, "showInvulnerableSave": BOOLEAN, "value": STRING},
+                               {"showAtTop": BOOLEAN}),
+    })
+
+WEAPON_PROFILE = object_schema({
+    "active": BOOLEAN, "name": STRING, "range": STRING, "attacks": STRING, "skill": STRING,
+    "strength": STRING, "ap": STRING, "damage": STRING, "keywords": STRING_LIST,
+})
+
+WEAPON = object_schema({"active": BOOLEAN, "profiles": array_of(WEAPON_PROFILE)},
+                       {"abilities": array_of(ABILITY)})
+
+POINTS = object_schema(
+    {"cost": STRING},
+    {"name": STRING, "cost_name": STRING, "model": {"type": ["integer", "string"]}, "models": STRING,
+     "active": BOOLEAN, "keyword": NULLABLE_STRING, "source": STRING})
+
+STAT = object_schema(
+    {"active": BOOLEAN, "name": STRING, "m": STRING, "t": STRING, "sv": STRING, "w": STRING,
+     "ld": STRING, "oc": STRING, "showDamagedMarker": BOOLEAN, "showName": BOOLEAN},
+    # id : ajouté par add_compo_structure.py ; invul : structure/
+    {"id": STRING, "invul": STRING})
+
+COMPO_ENTRY = object_schema({"name": STRING, "id": STRING, "count": INTEGER, "min": INTEGER, "max": INTEGER})
+
+DATASHEET = object_schema(
+    {
+        "id": STRING, "name": STRING, "faction_id": STRING, "cardType": STRING, "source": STRING,
+        "abilities": ABILITIES, "composition": STRING_LIST, "factions": STRING_LIST,
+        "fluff": NULLABLE_STRING, "keywords": STRING_LIST, "leader": STRING,
+        "meleeWeapons": array_of(WEAPON), "rangedWeapons": array_of(WEAPON),
+        "points": array_of(POINTS), "stats": array_of(STAT), "transport": STRING, "wargear": STRING_LIST,
+    },
+    {
+        "imperialArmour": BOOLEAN, "legends": BOOLEAN, "loadout": STRING,
+        "leadBy": STRING_LIST, "leads": object_schema({"extra": STRING, "units": STRING_LIST}),
+        "compo_structure": array_of(COMPO_ENTRY),
+    })
+
+ENHANCEMENT_FIELDS = {
+    "id": STRING, "name": STRING, "cost": STRING, "description": STRING, "cardType": STRING,
+    "excludes": STRING_LIST, "faction_id": STRING, "keywords": STRING_LIST, "source": STRING,
+}
+
+STRATAGEM_FIELDS = {
+    "id": STRING, "name": STRING, "cost": INTEGER, "effect": STRING, "fluff": STRING, "phase": STRING_LIST,
+    "restrictions": STRING, "target": STRING, "turn": STRING, "type": STRING, "when": STRING,
+}
+
+RULE = object_schema({"name": STRING, "rule": array_of(
+    object_schema({"order": INTEGER, "text": NULLABLE_STRING, "type": STRING}))})
+
+FACTION_FIELDS = {"id": STRING, "name": STRING, "is_subfaction": BOOLEAN, "parent_id": STRING}
+
+FACTION_OPTIONAL_FIELDS = {
+    "allied_factions": STRING_LIST,
+    "colours": object_schema({"banner": STRING, "header": STRING}),
+    "compatibleDataVersion": INTEGER,
+    "datasheets": array_of(DATASHEET),
+    "parent_keyword": STRING,
+    "updated": STRING,
+}
+
+# Fichier de faction tel que téléchargé : détachements, améliorations et stratagèmes à plat
+ARCHIVE_SCHEMA = object_schema(
+    {**FACTION_FIELDS, "link": STRING},
+    {
+        **FACTION_OPTIONAL_FIELDS,
+        "detachments": STRING_LIST,
+        "enhancements": array_of(object_schema({**ENHANCEMENT_FIELDS, "detachment": STRING})),
+        "stratagems": array_of(object_schema({**STRATAGEM_FIELDS, "detachment": STRING}, {"faction_id": STRING})),
+        "rules": object_schema({"army": array_of(RULE),
+                                "detachment": array_of(object_schema({**RULE["properties"], "detachment": STRING}))}),
+    })
+
+# Structure traduite : améliorations, règles et stratagèmes regroupés par détachement
+STRUCTURE_SCHEMA = object_schema(
+    FACTION_FIELDS,
+    {
+        **FACTION_OPTIONAL_FIELDS,
+        "detachments": array_of(object_schema({"name": STRING}, {
+            "enhancements": array_of(object_schema(ENHANCEMENT_FIELDS)),
+            "rules": array_of(RULE),
+            "stratagems": array_of(object_schema(STRATAGEM_FIELDS)),
+        })),
+        "stratagems": array_of(object_schema({**STRATAGEM_FIELDS, "detachment": STRING})),
+        "rules": object_schema({"army": array_of(RULE)}),
+    })
+
+# --- Traductions ---
+
+# Les références "@common:<clé>" sont vérifiées contre le fichier commun par validate_extraction.py
+FLAT_SCHEMA = {"type": "object", "additionalProperties": STRING}
+
+PENDING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "added": FLAT_SCHEMA,
+        "stale": {"type": "object", "additionalProperties": object_schema(
+            {"en": STRING, "previous_en": STRING, "previous_fr": STRING})},
+        "removed": STRING_LIST,
+    },
+    "additionalProperties": False,
+}
+
+# --- Extraction du Munitorum Field Manual ---
+
+# Coût en points sans "pts" (ex: 80, ou +60 pour une option)
+POINTS_COST = {"type": "string", "pattern": r"\+?\d+"}
+
+MUNITORUM_COST = {
+    **object_schema({"cost": POINTS_COST},
+                    {"cost_name": STRING, "name": STRING, "model": {"type": ["integer", "string"]}, "source": STRING}),
+    # Libellé du coût : cost_name (option) ou name (+ model) pour un coût par figurines
+    "anyOf": [{"required": ["cost_name"]}, {"required": ["name"]}],
+}
+
+MUNITORUM_SCHEMA = object_schema({
+    "factions": array_of(object_schema({
+        "name": STRING,
+        "units": array_of(object_schema({"name": STRING, "costs": array_of(MUNITORUM_COST)})),
+        "enhancements": array_of(object_schema({
+            "category": STRING,
+            "enhancements": array_of(object_schema({"name": STRING, "cost": POINTS_COST})),
+        })),
+    })),
+})
+
+SCHEMAS = {
+    "archive": ARCHIVE_SCHEMA,
+    "structure": STRUCTURE_SCHEMA,
+    "flat": FLAT_SCHEMA,
+    "pending": PENDING_SCHEMA,
+    "munitorum": MUNITORUM_SCHEMA,
+}
+
+# Validateurs compilés une fois, au chargement du module
+VALIDATORS = {name: compile_schema(schema) for name, schema in SCHEMAS.items()}
+
+MUNITORUM_FILE = "munitorum_data_final.json"
+
+def schema_for_path(path):
+    """Nom du schéma d'un fichier d'après son chemin (None s'il n'est pas couvert)."""
+    filename = os.path.basename(path)
+    directory = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    if filename == MUNITORUM_FILE:
+        return "munitorum"
+    if filename.endswith(".translated.json"):
+        return "structure"
+    if filename.endswith(".flat.json"):
+        return "flat"
+    if filename.endswith(".pending.json"):
+        return "pending"
+    if directory == "archive" and filename.endswith(".json"):
+        return "archive"
+    return None
+
+def validate(data, schema_name):
+    """Valide des données avec un schéma compilé ; retourne la liste des erreurs."""
+    errors = []
+    VALIDATORS[schema_name](data, "", errors)
+    return errors
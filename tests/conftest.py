@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Les scripts du dépôt sont des modules à la racine : la rendre importable par les tests."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def make_pdf():
+    """Crée un PDF dont chaque page contient les lignes données (liste de pages, une liste de lignes par page)."""
+    fitz = pytest.importorskip("fitz")
+
+    def make(path, pages):
+        doc = fitz.open()
+        for lines in pages:
+            page = doc.new_page()
+            for position, line in enumerate(lines):
+                page.insert_text((72, 72 + position * 14), line)
+        doc.save(str(path))
+        doc.close()
+        return str(path)
+
+    return make
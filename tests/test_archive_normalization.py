@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+import download_json_files
+from download_json_files import default_raw_dir, import_snapshot, normalize_and_write, revalidation_entry
+
+RULES = [
+    {"action": "remove_duplicates", "target": "sm.json", "sources": ["sw.json"]},
+    {"action": "inject_datasheets", "source": "cd.json", "target": "ts.json", "names": ["Flamers", "Screamers"]},
+]
+
+def payload(*names):
+    return json.dumps({"datasheets": [{"id": name.lower(), "name": name} for name in names]}, indent=1).encode()
+
+def raw_dir(tmp_path):
+    # Copies amont hors du dossier d'archive, dans tmp_path
+    return str(tmp_path / "raw")
+
+def names(path):
+    with open(path, encoding="utf-8") as f:
+        return [datasheet["name"] for datasheet in json.load(f)["datasheets"]]
+
+@pytest.fixture(autouse=True)
+def rules(monkeypatch):
+    monkeypatch.setattr(download_json_files, "NORMALIZATION_RULES", RULES)
+
+def test_rules_applied_in_memory_and_each_file_written_once(tmp_path):
+    payloads = {"sm.json": payload("Captain", "Wolf Lord"), "sw.json": payload("Wolf Lord"),
+                "cd.json": payload("Flamers", "Screamers"), "ts.json": payload("Magnus", "Flamers")}
+    changes = {}
+
+    written = normalize_and_write(payloads, str(tmp_path), changes, raw_dir(tmp_path))
+
+    assert sorted(written) == sorted(payloads)
+    assert names(tmp_path / "sm.json") == ["Captain"]
+    assert names(tmp_path / "ts.json") == ["Magnus", "Flamers", "Screamers"]
+    # Fichiers non modifiés par une règle : écrits tels que reçus
+    assert (tmp_path / "sw.json").read_bytes() == payloads["sw.json"]
+    # Pas de version précédente : tout le document normalisé compte comme ajouté
+    assert [entry["name"] for entry in changes["ts.json"]["datasheets"]["added"]] == ["Magnus", "Flamers", "Screamers"]
+    assert "sw.json" in changes and set(changes) == set(payloads)
+
+def test_rule_reads_unchanged_inputs_from_archive(tmp_path):
+    (tmp_path / "sw.json").write_bytes(payload("Wolf Lord"))
+    written = normalize_and_write({"sm.json": payload("Captain", "Wolf Lord")}, str(tmp_path), raw_dir=raw_dir(tmp_path))
+    assert written == ["sm.json"]
+    assert names(tmp_path / "sm.json") == ["Captain"]
+
+def test_rule_without_changed_input_is_skipped(tmp_path):
+    (tmp_path / "sm.json").write_bytes(payload("Captain", "Wolf Lord"))
+    (tmp_path / "sw.json").write_bytes(payload("Wolf Lord"))
+    assert normalize_and_write({"cd.json": payload("Other")}, str(tmp_path), raw_dir=raw_dir(tmp_path)) == ["cd.json"]
+    assert names(tmp_path / "sm.json") == ["Captain", "Wolf Lord"]
+
+def test_rule_with_missing_input_is_ignored(tmp_path):
+    written = normalize_and_write({"ts.json": payload("Magnus")}, str(tmp_path), raw_dir=raw_dir(tmp_path))
+    assert written == ["ts.json"]
+    assert names(tmp_path / "ts.json") == ["Magnus"]
+
+def test_target_modified_by_rule_is_written_even_if_not_downloaded(tmp_path):
+    (tmp_path / "ts.json").write_bytes(payload("Magnus"))
+    written = normalize_and_write({"cd.json": payload("Flamers")}, str(tmp_path), raw_dir=raw_dir(tmp_path))
+    assert written == ["cd.json", "ts.json"]
+    assert names(tmp_path / "ts.json") == ["Magnus", "Flamers"]
+
+def test_downloaded_target_keeps_its_upstream_copy(tmp_path):
+    payloads = {"ts.json": payload("Magnus"), "cd.json": payload("Flamers")}
+    normalize_and_write(payloads, str(tmp_path), raw_dir=raw_dir(tmp_path))
+    assert (tmp_path / "raw" / "ts.json").read_bytes() == payloads["ts.json"]
+    # Sources non ciblées : pas de copie
+    assert not (tmp_path / "raw" / "cd.json").exists()
+
+def test_changed_source_rebuilds_target_from_upstream_copy(tmp_path):
+    normalize_and_write({"ts.json": payload("Magnus"), "cd.json": payload("Flamers")}, str(tmp_path),
+                        raw_dir=raw_dir(tmp_path))
+
+    # Seule la source change : la datasheet injectée est remplacée par sa nouvelle version
+    source = {"datasheets": [{"id": "flamers", "name": "Flamers", "fluff": "updated"}]}
+    written = normalize_and_write({"cd.json": json.dumps(source).encode()}, str(tmp_path),
+                                  raw_dir=raw_dir(tmp_path))
+
+    assert written == ["cd.json", "ts.json"]
+    with open(tmp_path / "ts.json", encoding="utf-8") as f:
+        assert json.load(f)["datasheets"] == [{"id": "magnus", "name": "Magnus"}] + source["datasheets"]
+
+def test_source_dropping_a_datasheet_restores_it_in_target(tmp_path):
+    normalize_and_write({"sm.json": payload("Captain", "Wolf Lord"), "sw.json": payload("Wolf Lord")},
+                        str(tmp_path), raw_dir=raw_dir(tmp_path))
+    assert names(tmp_path / "sm.json") == ["Captain"]
+
+    # Le chapitre ne contient plus la datasheet : sm.json, inchangé en amont, la retrouve
+    changes = {}
+    written = normalize_and_write({"sw.json": payload("Wolf Guard")}, str(tmp_path), changes, raw_dir(tmp_path))
+
+    assert written == ["sw.json", "sm.json"]
+    assert names(tmp_path / "sm.json") == ["Captain", "Wolf Lord"]
+    assert [entry["name"] for entry in changes["sm.json"]["datasheets"]["added"]] == ["Wolf Lord"]
+
+def test_rebuilt_target_is_not_rewritten_when_identical(tmp_path):
+    normalize_and_write({"sm.json": payload("Captain", "Wolf Lord"), "sw.json": payload("Wolf Lord")},
+                        str(tmp_path), raw_dir=raw_dir(tmp_path))
+    before = (tmp_path / "sm.json").read_bytes()
+
+    assert normalize_and_write({"sw.json": payload("Wolf Lord")}, str(tmp_path),
+                               raw_dir=raw_dir(tmp_path)) == ["sw.json"]
+    assert (tmp_path / "sm.json").read_bytes() == before
+
+def test_target_without_upstream_copy_is_fetched_in_full(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    manifest = {"files": {"ts.json": {"sha256": "x"}, "cd.json": {"sha256": "y"}}}
+    assert revalidation_entry(manifest, "ts.json", str(archive)) is None
+    assert revalidation_entry(manifest, "cd.json", str(archive)) == {"sha256": "y"}
+
+    raw = tmp_path / "archive_raw"
+    assert default_raw_dir(str(archive)) == str(raw)
+    raw.mkdir()
+    (raw / "ts.json").write_bytes(payload("Magnus"))
+    assert revalidation_entry(manifest, "ts.json", str(archive)) == {"sha256": "x"}
+
+def test_incremental_import_renormalizes_unchanged_target(tmp_path):
+    mirror = tmp_path / "mirror"
+    mirror.mkdir()
+    files = ["sm.json", "sw.json"]
+    (mirror / "sm.json").write_bytes(payload("Captain", "Wolf Lord"))
+    (mirror / "sw.json").write_bytes(payload("Wolf Lord"))
+    archive = tmp_path / "archive"
+    import_snapshot(str(mirror), str(archive), files)
+    assert names(archive / "sm.json") == ["Captain"]
+
+    (mirror / "sw.json").write_bytes(payload("Wolf Guard"))
+    results = import_snapshot(str(mirror), str(archive), files)
+
+    assert [r["status"] for r in results] == ["unchanged", "changed"]
+    assert names(archive / "sm.json") == ["Captain", "Wolf Lord"]
+    with open(tmp_path / "archive_manifest.json", encoding="utf-8") as f:
+        assert json.load(f)["last_run"]["changed"] == ["sw.json", "sm.json"]
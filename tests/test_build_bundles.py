@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+
+import pytest
+
+import build_bundles
+from build_bundles import build_bundles as build
+
+STRUCTURE = {"name": "faction.name", "datasheets": [{"id": "ds-1", "name": "datasheets.0.name",
+                                                    "keywords": ["keywords.0", "Infantry"], "legends": False}]}
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    write_json(tmp_path / "structure" / "SM.translated.json", STRUCTURE)
+    write_json(tmp_path / "en" / "SM.flat.json", {"faction.name": "Space Marines",
+                                                  "datasheets.0.name": "Captain", "keywords.0": "@common:character"})
+    write_json(tmp_path / "fr" / "SM.flat.json", {"datasheets.0.name": "Capitaine", "keywords.0": "@common:character"})
+    write_json(tmp_path / "en" / "common.flat.json", {"character": "Character"})
+    write_json(tmp_path / "fr" / "common.flat.json", {"character": "Personnage"})
+    monkeypatch.chdir(tmp_path)
+    # Sans brotli, pour que le test ne dépende pas du module installé
+    monkeypatch.setattr(build_bundles, "brotli", None)
+    return tmp_path
+
+def test_bundle_is_translated_with_fallback_and_compact(tree):
+    assert build(["en", "fr"], structure_dir="structure", output_dir="dist") == (2, 0)
+
+    content = (tree / "dist" / "fr" / "SM.json").read_bytes()
+    assert json.loads(content) == {"name": "Space Marines", "datasheets": [
+        {"id": "ds-1", "name": "Capitaine", "keywords": ["Personnage", "Infantry"], "legends": False}]}
+    assert b"\n" not in content and b", " not in content
+    assert gzip.decompress((tree / "dist" / "fr" / "SM.json.gz").read_bytes()) == content
+
+    manifest = read_json(tree / "dist" / "bundles_manifest.json")
+    assert list(manifest["bundles"]) == ["en/SM.json", "fr/SM.json"]
+    assert manifest["bundles"]["fr/SM.json"]["size"] == len(content)
+
+def test_unchanged_inputs_are_skipped_and_common_change_rebuilds(tree):
+    build(["en", "fr"], structure_dir="structure", output_dir="dist")
+    gz = (tree / "dist" / "fr" / "SM.json.gz").read_bytes()
+    assert build(["en", "fr"], structure_dir="structure", output_dir="dist") == (0, 2)
+
+    # Le fichier commun anglais est une entrée des deux bundles (repli fr -> en)
+    write_json(tree / "en" / "common.flat.json", {"character": "Hero"})
+    assert build(["en", "fr"], structure_dir="structure", output_dir="dist") == (2, 0)
+    assert json.loads((tree / "dist" / "en" / "SM.json").read_bytes())["datasheets"][0]["keywords"][0] == "Hero"
+    # Même contenu -> même .gz (mtime fixé)
+    assert (tree / "dist" / "fr" / "SM.json.gz").read_bytes() == gz
+    assert build(["en", "fr"], structure_dir="structure", output_dir="dist", force=True) == (2, 0)
+
+def test_missing_output_is_rebuilt(tree):
+    build(["fr"], structure_dir="structure", output_dir="dist")
+    (tree / "dist" / "fr" / "SM.json.gz").unlink()
+    assert build(["fr"], structure_dir="structure", output_dir="dist") == (1, 0)
+
+def test_stale_brotli_file_is_removed_without_brotli(tree):
+    (tree / "dist" / "fr").mkdir(parents=True)
+    (tree / "dist" / "fr" / "SM.json.br").write_bytes(b"old")
+    build(["fr"], structure_dir="structure", output_dir="dist")
+    assert not (tree / "dist" / "fr" / "SM.json.br").exists()
+    assert "br_size" not in read_json(tree / "dist" / "bundles_manifest.json")["bundles"]["fr/SM.json"]
+
+def test_bundles_of_removed_factions_are_deleted(tree):
+    write_json(tree / "structure" / "CSM.translated.json", {"name": "csm"})
+    build(["fr"], structure_dir="structure", output_dir="dist")
+    (tree / "structure" / "CSM.translated.json").unlink()
+
+    build(["fr"], structure_dir="structure", output_dir="dist")
+
+    assert not (tree / "dist" / "fr" / "CSM.json").exists()
+    assert not (tree / "dist" / "fr" / "CSM.json.gz").exists()
+    assert list(read_json(tree / "dist" / "bundles_manifest.json")["bundles"]) == ["fr/SM.json"]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from add_compo_structure import (StatIndex, create_compo_structure, generate_uuid, parse_composition_entry,
+                                 process_archive)
+
+def stats(*names):
+    return [{"name": name, "m": "6\"", "t": "4"} for name in names]
+
+@pytest.mark.parametrize("entry, expected", [
+    # Les tirets sont normalisés avant le motif : le suffixe reste dans le nom
+    ("1 Marneus Calgar – EPIC HERO", ("Marneus Calgar - EPIC HERO", 1, 1, 1)),
+    ("2-5 Outriders", ("Outriders", 2, 2, 5)),
+    ("0-1 Invader ATV", ("Invader ATV", 0, 0, 1)),
+    ("4–9 Assault&x20;Intercessors", ("Assault Intercessors", 4, 4, 9)),
+])
+def test_parse_composition_entry(entry, expected):
+    assert parse_composition_entry(entry) == expected
+
+def test_unparsed_entry_is_reported():
+    diagnostics = []
+    assert parse_composition_entry("Every model has a bolt pistol", diagnostics) == \
+        ("Every model has a bolt pistol", 1, 1, 1)
+    assert [d["type"] for d in diagnostics] == ["unparsed_composition"]
+
+def test_stat_index_matching_strategies():
+    index = StatIndex(stats("Outrider", "Invader ATV"))
+    assert index.match_name("Outrider") == "Outrider"
+    assert index.match_name("Outriders") == "Outrider"
+    assert index.match_name("Outrider Sergeant") == "Outrider"
+    assert index.match_name("Techmarine") is None
+
+def test_ids_are_deterministic_uuid5():
+    composition = ["1 Outrider Sergeant", "2-5 Outriders", "0-1 Invader ATV"]
+    first = create_compo_structure(composition, stats("Outrider", "Invader ATV"), "000000001", [])
+    second = create_compo_structure(composition, stats("Outrider", "Invader ATV"), "000000001", [])
+    assert first == second
+    assert first[0]["id"] == first[1]["id"] == generate_uuid("000000001", "stat", "Outrider")
+    assert first[2]["id"] == generate_uuid("000000001", "stat", "Invader ATV")
+
+def test_stat_ids_are_written_to_matched_stats_only():
+    datasheet_stats = stats("Outrider", "Outrider", "Invader ATV")
+    create_compo_structure(["2-5 Outriders"], datasheet_stats, "000000001", [])
+    assert datasheet_stats[0]["id"] == generate_uuid("000000001", "stat", "Outrider")
+    # La deuxième stat de même nom n'est jamais appariée : pas d'ID en double
+    assert "id" not in datasheet_stats[1]
+    assert "id" not in datasheet_stats[2]
+
+def test_existing_stat_id_is_kept():
+    datasheet_stats = stats("Outrider", "Invader ATV")
+    datasheet_stats[0]["id"] = "existing"
+    assert create_compo_structure(["2-5 Outriders"], datasheet_stats, "000000001", [])[0]["id"] == "existing"
+
+def test_single_stat_is_used_for_every_entry():
+    compo = create_compo_structure(["1 Sergeant", "4-9 Marines"], stats("Tactical Marine"), "000000002", [])
+    assert {entry["id"] for entry in compo} == {generate_uuid("000000002", "stat", "Tactical Marine")}
+
+def test_unmatched_entries_with_same_name_get_distinct_ids():
+    diagnostics = []
+    compo = create_compo_structure(["1 Servitor", "0-1 Servitor"], stats("Techmarine", "Invader ATV"),
+                                   "000000003", diagnostics)
+    assert compo[0]["name"] == compo[1]["name"] == "Servitor"
+    assert compo[0]["id"] != compo[1]["id"]
+    assert compo[0]["id"] == generate_uuid("000000003", "compo", "Servitor", "0")
+    assert [d["type"] for d in diagnostics] == ["unmatched_stat", "unmatched_stat"]
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def faction(*datasheets):
+    return {"id": "SM", "datasheets": list(datasheets)}
+
+def datasheet(datasheet_id, name, composition, *stat_names):
+    return {"id": datasheet_id, "name": name, "composition": composition, "stats": stats(*stat_names)}
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    archive = tmp_path / "archive"
+    archive.mkdir()
+    write_json(archive / "space_marines.json", faction(
+        datasheet("000000001", "Outrider Squad", ["1 Outrider Sergeant", "2-5 Outriders"], "Outrider"),
+        datasheet("000000002", "Techmarine", ["1 Techmarine", "0-2 Servitors", "Every model has a bolt pistol"],
+                  "Techmarine", "Invader ATV")))
+    write_json(archive / "necrons.json", faction(datasheet("000000003", "Overlord", ["1 Overlord"], "Overlord")))
+    write_json(archive / "core.json", {"stratagems": []})
+    (archive / "broken.json").write_text("{", encoding="utf-8")
+    return archive
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_archive_batch_writes_report(archive_dir, tmp_path, jobs):
+    report_path = str(tmp_path / "report.json")
+
+    results = process_archive(archive_dir, jobs, report_path)
+
+    assert [(r["file"], r["ok"], r["written"]) for r in results] == [
+        ("broken.json", False, False), ("core.json", True, False),
+        ("necrons.json", True, True), ("space_marines.json", True, True)]
+    report_data = read_json(tmp_path / "report.json")
+    assert report_data["files"]["space_marines.json"] == {"ok": True, "error": None, "processed": 2, "written": True}
+    assert report_data["files"]["broken.json"]["ok"] is False
+    # Servitors puis la ligne illisible, sans stat correspondante ni l'une ni l'autre
+    assert report_data["summary"] == {"unmatched_stat": 2, "unparsed_composition": 1}
+    assert [(d["file"], d["type"], d["datasheet"], d["datasheet_id"]) for d in report_data["diagnostics"]] == [
+        ("space_marines.json", "unmatched_stat", "Techmarine", "000000002"),
+        ("space_marines.json", "unparsed_composition", "Techmarine", "000000002"),
+        ("space_marines.json", "unmatched_stat", "Techmarine", "000000002")]
+    # Sauvegarde de l'original, compo_structure ajoutée au fichier
+    assert "compo_structure" not in read_json(archive_dir / "space_marines.json.backup")["datasheets"][0]
+    outriders = read_json(archive_dir / "space_marines.json")["datasheets"][0]["compo_structure"]
+    assert [(entry["name"], entry["min"], entry["max"]) for entry in outriders] == [
+        ("Outrider Sergeant", 1, 1), ("Outriders", 2, 5)]
+
+def test_archive_batch_skips_annotated_files(archive_dir, tmp_path):
+    report_path = str(tmp_path / "report.json")
+    first = process_archive(archive_dir, 1, report_path)
+    contents = {path.name: path.read_bytes() for path in archive_dir.iterdir()}
+
+    second = process_archive(archive_dir, 2, report_path)
+
+    assert [r["written"] for r in second] == [False] * 4
+    assert {path.name: path.read_bytes() for path in archive_dir.iterdir()} == contents
+    assert read_json(tmp_path / "report.json")["diagnostics"] == []
+    assert [r["processed"] for r in first] == [0, 0, 1, 2]
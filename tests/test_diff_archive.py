@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from diff_archive import (canonical_hash, changed_paths, diff_documents, diff_snapshots, dirty_ids,
+                          load_changeset, make_changeset, save_changeset)
+from update_costs import apply_cost_index
+
+def datasheet(item_id, name, cost, **fields):
+    return {"id": item_id, "name": name, "points": [{"model": "1", "cost": cost}], **fields}
+
+def test_canonical_hash_ignores_key_order():
+    assert canonical_hash({"a": 1, "b": [1, 2]}) == canonical_hash({"b": [1, 2], "a": 1})
+    assert canonical_hash({"a": 1}) != canonical_hash({"a": 2})
+
+def test_changed_paths():
+    old = {"name": "Captain", "points": [{"cost": "80"}], "keywords": ["A"], "gone": 1}
+    new = {"name": "Captain", "points": [{"cost": "85"}], "keywords": ["A", "B"], "added": 2}
+    assert changed_paths(old, new) == ["points.0.cost", "keywords", "gone", "added"]
+    assert changed_paths(old, old) == []
+
+def test_diff_documents_added_removed_modified():
+    old = {"datasheets": [datasheet("a", "Captain", "80"), datasheet("b", "Librarian", "65")],
+           "stratagems": [{"id": "s", "cost": 1}]}
+    new = {"datasheets": [datasheet("a", "Captain", "85"), datasheet("c", "Chaplain", "60")],
+           "stratagems": [{"id": "s", "cost": 1}]}
+    assert diff_documents(old, new) == {"datasheets": {
+        "added": [{"id": "c", "name": "Chaplain"}],
+        "removed": [{"id": "b", "name": "Librarian"}],
+        "modified": [{"id": "a", "name": "Captain", "paths": ["points.0.cost"]}],
+    }}
+
+def test_diff_documents_matches_items_without_id_by_name_then_position():
+    old = {"enhancements": [{"name": "Artificer Armour", "cost": 10}, {"cost": 5}]}
+    new = {"enhancements": [{"name": "Artificer Armour", "cost": 15}, {"cost": 5}]}
+    modified = diff_documents(old, new)["enhancements"]["modified"]
+    assert modified == [{"id": "name:Artificer Armour", "name": "Artificer Armour", "paths": ["cost"]}]
+
+def test_diff_documents_new_and_deleted_files():
+    document = {"datasheets": [datasheet("a", "Captain", "80")]}
+    assert diff_documents(None, document)["datasheets"]["added"] == [{"id": "a", "name": "Captain"}]
+    assert diff_documents(document, None)["datasheets"]["removed"] == [{"id": "a", "name": "Captain"}]
+    assert diff_snapshots({"sm.json": document}, {"sm.json": document}) == {}
+
+def test_dirty_ids_filters_and_ignores_removals():
+    files = diff_snapshots(
+        {"sm.json": {"datasheets": [datasheet("a", "Captain", "80"), datasheet("b", "Librarian", "65")]},
+         "csm.json": {"stratagems": [{"id": "s", "cost": 1}]}},
+        {"sm.json": {"datasheets": [datasheet("a", "Captain", "85"), datasheet("c", "Chaplain", "60")]},
+         "csm.json": {"stratagems": [{"id": "s", "cost": 2}]}},
+    )
+    changeset = make_changeset(files, "old", "new")
+    assert dirty_ids(changeset) == {"a", "c", "s"}
+    assert dirty_ids(changeset, filename="sm.json") == {"a", "c"}
+    assert dirty_ids(changeset, section="stratagems") == {"s"}
+
+def test_changeset_round_trip(tmp_path):
+    path = str(tmp_path / "archive_changes.json")
+    assert load_changeset(path) is None
+    changeset = make_changeset({"sm.json": {}}, "HEAD", "archive")
+    save_changeset(changeset, path)
+    assert load_changeset(path) == changeset
+
+def test_cost_update_restricted_to_dirty_ids():
+    structure = {"datasheets": [datasheet("a", "Captain", "80"), datasheet("b", "Librarian", "65")]}
+    index = {"datasheets": {"a": {"SM": [{"model": "1", "cost": "85"}]},
+                            "b": {"SM": [{"model": "1", "cost": "70"}]}},
+             "enhancements": {}, "stratagems": {}}
+
+    changes, conflicts = apply_cost_index(structure, "SM", index, only_ids={"a"})
+
+    assert [change["id"] for change in changes["datasheets"]] == ["a"]
+    assert conflicts == []
+    assert structure["datasheets"][0]["points"][0]["cost"] == "85"
+    assert structure["datasheets"][1]["points"][0]["cost"] == "65"
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""Téléchargement concurrent contre un serveur HTTP local qui sert archive/."""
+
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download_json_files import download_json_files
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "archive")
+
+# Fichiers de faction hors des règles de normalisation
+FILES = ["votann.json", "unaligned.json"]
+
+# Latence ajoutée à chaque réponse, pour vérifier les durées par fichier
+DELAY = 0.05
+
+class ArchiveHandler(SimpleHTTPRequestHandler):
+    """
+    Sert archive/ en répondant 503 aux premières requêtes des fichiers de failures.
+
+    L'en-tête If-Modified-Since reçu est noté dans conditional ; avec
+    ignore_conditional, il est ignoré et le fichier est toujours renvoyé.
+    """
+
+    def do_GET(self):
+        filename = self.path.lstrip("/")
+        with self.server.lock:
+            self.server.requests.append(filename)
+            self.server.conditional[filename] = self.headers.get("If-Modified-Since")
+            if self.server.ignore_conditional:
+                del self.headers["If-Modified-Since"]
+            fail = self.server.failures.get(filename, 0) > 0
+            if fail:
+                self.server.failures[filename] -= 1
+        time.sleep(DELAY)
+        if fail:
+            self.send_error(503)
+        else:
+            super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(ArchiveHandler, directory=ARCHIVE_DIR))
+    httpd.lock = threading.Lock()
+    httpd.requests = []
+    httpd.failures = {}
+    httpd.conditional = {}
+    httpd.ignore_conditional = False
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def download(server, tmp_path, **kwargs):
+    return download_json_files(base_url=server.base_url, output_dir=str(tmp_path / "archive"),
+                               json_files=FILES, workers=2, backoff=0, **kwargs)
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def test_download_retries_transient_errors(server, tmp_path):
+    server.failures = {"votann.json": 2}
+
+    results = download(server, tmp_path, retries=3)
+
+    assert [r["status"] for r in results] == ["changed", "changed"]
+    assert server.requests.count("votann.json") == 3
+    assert server.requests.count("unaligned.json") == 1
+    for filename in FILES:
+        assert read_bytes(tmp_path / "archive" / filename) == read_bytes(os.path.join(ARCHIVE_DIR, filename))
+    # Durée par fichier : les tentatives rejouées comptent dans celle du fichier
+    elapsed = {r["filename"]: r["elapsed"] for r in results}
+    assert elapsed["unaligned.json"] >= DELAY
+    assert elapsed["votann.json"] >= 3 * DELAY
+
+def test_download_fails_when_retries_are_exhausted(server, tmp_path):
+    server.failures = {"votann.json": 10}
+
+    results = {r["filename"]: r for r in download(server, tmp_path, retries=1)}
+
+    assert results["votann.json"]["status"] == "failed"
+    assert "503" in results["votann.json"]["error"]
+    assert results["votann.json"]["elapsed"] >= 2 * DELAY
+    assert server.requests.count("votann.json") == 2
+    assert results["unaligned.json"]["status"] == "changed"
+    assert not (tmp_path / "archive" / "votann.json").exists()
+
+    with open(tmp_path / "archive_manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["last_run"]["failed"] == ["votann.json"]
+    assert list(manifest["files"]) == ["unaligned.json"]
+
+def test_second_download_uses_conditional_requests(server, tmp_path):
+    download(server, tmp_path)
+    results = download(server, tmp_path)
+
+    # http.server répond 304 à If-Modified-Since : rien n'est réécrit
+    assert [r["status"] for r in results] == ["unchanged", "unchanged"]
+    assert all(r["elapsed"] > 0 for r in results)
+    with open(tmp_path / "archive_manifest.json", encoding="utf-8") as f:
+        assert json.load(f)["last_run"]["changed"] == []
+
+def test_unchanged_content_is_detected_by_sha256_without_304(server, tmp_path):
+    download(server, tmp_path)
+    with open(tmp_path / "archive_manifest.json", encoding="utf-8") as f:
+        entry = json.load(f)["files"]["votann.json"]
+    assert entry["sha256"] and entry["last_modified"] and entry["size"] > 0
+
+    # Serveur qui ignore les requêtes conditionnelles : même contenu, même SHA-256
+    server.ignore_conditional = True
+    (tmp_path / "archive" / "unaligned.json").unlink()
+    results = {r["filename"]: r for r in download(server, tmp_path)}
+
+    assert server.conditional["votann.json"] == entry["last_modified"]
+    assert results["votann.json"]["status"] == "unchanged"
+    # Fichier local supprimé : requête sans condition et fichier réécrit
+    assert server.conditional["unaligned.json"] is None
+    assert results["unaligned.json"]["status"] == "changed"
+    assert (tmp_path / "archive" / "unaligned.json").exists()
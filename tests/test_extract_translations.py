@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import os
+
+import pytest
+
+from extract_and_replace_translations import pending_path_for, process_directory, process_file, sync_flat_files
+from translation_memory import common_path
+
+FACTION = {
+    "id": "SM",
+    "name": "Space Marines",
+    "link": "https://example.com/sm",
+    "is_subfaction": False,
+    "detachments": ["Gladius Task Force", {"name": "Firestorm Assault Force", "rules": []}],
+    "rules": {
+        "army": [{"name": "Oath of Moment", "rule": [{"type": "text", "text": "Select one enemy unit."}]}],
+        "detachment": [
+            {"name": "Combat Doctrines", "detachment": "Gladius Task Force",
+             "rule": [{"type": "text", "text": "Doctrine text."}]},
+            {"name": "Close-range Eradication", "detachment": "Ironstorm Spearhead", "rule": []},
+        ],
+    },
+    "enhancements": [
+        {"name": "Artificer Armour", "cost": "10", "detachment": "Gladius Task Force",
+         "description": "Armour text.", "keywords": ["Infantry"]},
+        {"name": "Adept of the Codex", "cost": "20", "detachment": "Ironstorm Spearhead", "description": "Adept text."},
+    ],
+    "stratagems": [
+        {"name": "Armour of Contempt", "cost": 1, "detachment": "Gladius Task Force", "type": "Battle Tactic",
+         "when": "Opponent's Shooting phase.", "effect": "Worsen AP."},
+        {"name": "Storm of Fire", "cost": 1, "detachment": "Firestorm Assault Force", "type": "Battle Tactic",
+         "when": "Your Shooting phase.", "effect": "Improve AP."},
+    ],
+    "datasheets": [
+        {
+            "id": "a", "name": "Captain (Gravis)", "faction_id": "SM", "source": "Codex",
+            "points": [{"cost": "80", "models": "1"}],
+            "stats": [{"name": "Captain", "m": "5\"", "t": "6", "sv": "3+", "w": "6", "ld": "6+", "oc": "1",
+                       "active": True}],
+            "abilities": {
+                "invul": {"value": "4+", "info": "", "showInvulnerableSave": True},
+                "core": ["Leader", "Feel No Pain 5+"],
+                "other": [{"name": "Rites of Battle", "description": "Once per battle round."}],
+            },
+            "meleeWeapons": [{"active": True, "profiles": [
+                {"name": "Relic weapon", "range": "Melee", "attacks": "6", "keywords": ["precision"]}]}],
+            "rangedWeapons": [{"profiles": [{"name": "Master-crafted boltgun", "range": "24\"",
+                                             "keywords": ["heavy"]}]}],
+            "keywords": ["Infantry", "Character", "Captain"],
+            # Même texte que la règle d'armée : la clé existante est réutilisée
+            "fluff": "Select one enemy unit.",
+            "wargear": ["A captain carries a relic weapon.", "http://not-a-text"],
+            "leads": {"units": ["Intercessor Squad"], "extra": ""},
+        },
+        {
+            "id": "b", "name": "Intercessor Squad", "faction_id": "SM",
+            "stats": [{"name": "Intercessor", "m": "6\"", "t": "4", "sv": "3+", "w": "2", "ld": "6+", "oc": "2"}],
+            "abilities": {"other": [{"name": "Objective Secured", "description": "Sticky objectives."}]},
+            "rangedWeapons": [{"profiles": [{"name": "Bolt rifle", "range": "24\""}]}],
+            "keywords": ["Infantry", "Battleline"],
+        },
+    ],
+}
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+@pytest.fixture
+def extract(tmp_path, monkeypatch):
+    """Extrait un document dans tmp_path ; retourne (flat EN, flat FR, JSON à clés)."""
+    monkeypatch.chdir(tmp_path)
+
+    def run(document, filename="space_marines.json"):
+        write_json(tmp_path / filename, document)
+        process_file(filename)
+        basename = filename[:-len(".json")]
+        data_id = basename if basename == "core" else document.get("id", basename)
+        return (read_json(tmp_path / "en" / f"{data_id}.flat.json"),
+                read_json(tmp_path / "fr" / f"{data_id}.flat.json"),
+                read_json(tmp_path / "updated translations in progress" / f"{data_id}.translated.json"))
+    return run
+
+def test_fields_are_classified_by_path_context(extract):
+    en, fr, translated = extract(copy.deepcopy(FACTION))
+
+    assert fr == en
+    assert "link" not in translated
+    captain, intercessors = translated["datasheets"]
+    # Profils d'armes : seul le nom est traduit, les caractéristiques restent telles quelles
+    melee = captain["meleeWeapons"][0]["profiles"][0]
+    assert melee == {"name": "datasheets.Captain_Gravis.meleeWeapons.0.profiles.0.name", "range": "Melee",
+                     "attacks": "6", "keywords": ["precision"]}
+    assert intercessors["rangedWeapons"][0]["profiles"][0]["range"] == "24\""
+    # Stats : caractéristiques conservées, invulnérable déplacée depuis abilities
+    assert captain["stats"][0] == {"name": "datasheets.Captain_Gravis.stats.0.name", "m": "5\"", "t": "6",
+                                   "sv": "3+", "w": "6", "ld": "6+", "oc": "1", "active": True, "invul": "4+"}
+    assert "invul" not in captain["abilities"]
+    # Mots-clés prioritaires : le texte sert de clé
+    assert captain["abilities"]["core"] == ["Leader", "Feel No Pain 5+"]
+    assert captain["keywords"] == ["Infantry", "Character", "Captain"]
+    # Stratagèmes : type et coût non textuels conservés, textes traduits
+    stratagem = translated["detachments"][0]["stratagems"][0]
+    assert (stratagem["type"], stratagem["cost"]) == ("Battle Tactic", 1)
+    assert en[stratagem["when"]] == "Opponent's Shooting phase."
+    # Améliorations : nom et description traduits, coût conservé
+    enhancement = translated["detachments"][0]["enhancements"][0]
+    assert enhancement["cost"] == "10"
+    assert en[enhancement["description"]] == "Armour text."
+    # Texte déjà rencontré : même clé
+    assert captain["fluff"] == "rules.army.Oath_of_Moment.rule.0.text"
+    assert captain["leads"]["extra"] == ""
+
+# Clés produites par le script d'origine pour FACTION. Les noms d'index des
+# détachements et des listes regroupées sont relevés avant le regroupement :
+# d'où "detachments.2" et le nom du premier stratagème sous chaque détachement.
+EXPECTED_KEYS = {
+    "name": "Space Marines",
+    "detachments.Gladius_Task_Force.name": "Gladius Task Force",
+    "detachments.Gladius_Task_Force.enhancements.Artificer_Armour.name": "Artificer Armour",
+    "detachments.Gladius_Task_Force.enhancements.Artificer_Armour.description": "Armour text.",
+    "Infantry": "Infantry",
+    "detachments.Gladius_Task_Force.rules.0.name": "Combat Doctrines",
+    "detachments.Gladius_Task_Force.rules.0.rule.0.text": "Doctrine text.",
+    "detachments.Gladius_Task_Force.stratagems.Armour_of_Contempt.name": "Armour of Contempt",
+    "detachments.Gladius_Task_Force.stratagems.Armour_of_Contempt.when": "Opponent's Shooting phase.",
+    "detachments.Gladius_Task_Force.stratagems.Armour_of_Contempt.effect": "Worsen AP.",
+    "detachments.Firestorm_Assault_Force.name": "Firestorm Assault Force",
+    "detachments.Firestorm_Assault_Force.stratagems.Armour_of_Contempt.name": "Storm of Fire",
+    "detachments.Firestorm_Assault_Force.stratagems.Armour_of_Contempt.when": "Your Shooting phase.",
+    "detachments.Firestorm_Assault_Force.stratagems.Armour_of_Contempt.effect": "Improve AP.",
+    "detachments.2.name": "Ironstorm Spearhead",
+    "detachments.2.enhancements.Artificer_Armour.name": "Adept of the Codex",
+    "detachments.2.enhancements.Artificer_Armour.description": "Adept text.",
+    "detachments.2.rules.0.name": "Close-range Eradication",
+    "rules.army.Oath_of_Moment.name": "Oath of Moment",
+    "rules.army.Oath_of_Moment.rule.0.text": "Select one enemy unit.",
+    "datasheets.Captain_Gravis.name": "Captain (Gravis)",
+    "datasheets.Captain_Gravis.stats.0.name": "Captain",
+    "Leader": "Leader",
+    "Feel No Pain 5+": "Feel No Pain 5+",
+    "datasheets.Captain_Gravis.abilities.other.0.name": "Rites of Battle",
+    "datasheets.Captain_Gravis.abilities.other.0.description": "Once per battle round.",
+    "datasheets.Captain_Gravis.meleeWeapons.0.profiles.0.name": "Relic weapon",
+    "precision": "precision",
+    "datasheets.Captain_Gravis.rangedWeapons.0.profiles.0.name": "Master-crafted boltgun",
+    "heavy": "heavy",
+    "Character": "Character",
+    "Captain": "Captain",
+    "datasheets.Captain_Gravis.wargear.0": "A captain carries a relic weapon.",
+    "datasheets.Captain_Gravis.wargear.1": "http://not-a-text",
+    "datasheets.Captain_Gravis.leads.units.0": "Intercessor Squad",
+    "datasheets.Intercessor_Squad.stats.0.name": "Intercessor",
+    "datasheets.Intercessor_Squad.abilities.other.0.name": "Objective Secured",
+    "datasheets.Intercessor_Squad.abilities.other.0.description": "Sticky objectives.",
+    "datasheets.Intercessor_Squad.rangedWeapons.0.profiles.0.name": "Bolt rifle",
+    "Battleline": "Battleline",
+}
+
+def test_keys_match_original_script(extract):
+    en, _, _ = extract(copy.deepcopy(FACTION))
+    assert list(en.items()) == list(EXPECTED_KEYS.items())
+
+def test_keys_without_names_keep_indexes(extract):
+    document = {
+        "id": "XX",
+        "rules": {"army": ["Shadow in the Warp", {"rule": [{"text": "No name."}]}]},
+        "datasheets": [{"abilities": {"other": [{"description": "Unnamed datasheet."}]}},
+                       {"name": "Lord – of ‘Skulls’, v2.0?", "fluff": "Named datasheet."}],
+    }
+    en, _, _ = extract(document, "xx.json")
+    # Règle d'armée sous forme de chaîne : texte d'une liste, clé par indice
+    assert en == {
+        "rules.army.0": "Shadow in the Warp",
+        "rules.army.1.rule.0.text": "No name.",
+        "datasheets.0.abilities.other.0.description": "Unnamed datasheet.",
+        "datasheets.Lord___of_Skulls_v20.name": "Lord – of ‘Skulls’, v2.0?",
+        "datasheets.Lord___of_Skulls_v20.fluff": "Named datasheet.",
+    }
+
+def detachment_summary(translated, en):
+    return [(en[detachment["name"]], {field: [en[item["name"]] for item in detachment[field]]
+                                      for field in ("enhancements", "rules", "stratagems") if field in detachment})
+            for detachment in translated["detachments"]]
+
+def test_items_are_grouped_under_their_detachment(extract):
+    en, _, translated = extract(copy.deepcopy(FACTION))
+
+    assert "enhancements" not in translated and "stratagems" not in translated
+    assert translated["rules"] == {"army": translated["rules"]["army"]}
+    # Chaîne convertie en objet, objet existant complété, détachement inconnu créé à la fin
+    assert detachment_summary(translated, en) == [
+        ("Gladius Task Force", {"enhancements": ["Artificer Armour"], "rules": ["Combat Doctrines"],
+                                "stratagems": ["Armour of Contempt"]}),
+        ("Firestorm Assault Force", {"rules": [], "stratagems": ["Storm of Fire"]}),
+        ("Ironstorm Spearhead", {"enhancements": ["Adept of the Codex"], "rules": ["Close-range Eradication"]}),
+    ]
+    assert all("detachment" not in item for detachment in translated["detachments"]
+               for field in ("enhancements", "rules", "stratagems") for item in detachment.get(field, []))
+
+def test_grouping_edge_cases(extract):
+    document = {
+        "id": "YY",
+        # Nom en double : seul le premier reçoit les éléments
+        "detachments": ["Host", "Host"],
+        "enhancements": [{"name": "Relic", "detachment": "Host"}, {"name": "Orphan"},
+                         {"name": "Other Relic", "detachment": "Host"}],
+        "stratagems": [{"name": "Strike", "detachment": "New Host"}],
+    }
+    en, _, translated = extract(document, "yy.json")
+
+    # Élément sans détachement : retiré, comme avec le script d'origine
+    assert "Orphan" not in en.values()
+    assert translated["detachments"][1] == "detachments.Host.name"
+    del translated["detachments"][1]
+    assert detachment_summary(translated, en) == [
+        ("Host", {"enhancements": ["Relic", "Other Relic"]}),
+        ("New Host", {"stratagems": ["Strike"]}),
+    ]
+
+def test_core_is_not_regrouped(extract):
+    document = {"stratagems": [{"name": "Command Re-roll", "detachment": "Core"}]}
+    _, _, translated = extract(document, "core.json")
+    assert "detachments" not in translated
+    assert translated["stratagems"][0]["detachment"] == "stratagems.Command_Re_roll.detachment"
+
+def tree_contents(root):
+    return {str(path.relative_to(root)): path.read_bytes()
+            for path in sorted(root.rglob("*")) if path.is_file()}
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_directory_mode_collects_results_in_file_order(tmp_path, monkeypatch, capsys, jobs):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input").mkdir()
+    write_json(tmp_path / "input" / "space_marines.json", FACTION)
+    write_json(tmp_path / "input" / "necrons.json", {"id": "NEC", "datasheets": [{"name": "Overlord"}]})
+    (tmp_path / "input" / "broken.json").write_text("{", encoding="utf-8")
+
+    results = process_directory("input", jobs)
+
+    assert [(os.path.basename(r["file"]), r["ok"]) for r in results] == [
+        ("broken.json", False), ("necrons.json", True), ("space_marines.json", True)]
+    assert results[0]["error"] and all(r["elapsed"] >= 0 for r in results)
+    assert "Traitement terminé pour input/necrons.json" in results[1]["output"]
+    out = capsys.readouterr().out
+    assert out.index("necrons.json") < out.index("Traitement terminé pour input/space_marines.json")
+    assert "Erreur lors du traitement de broken.json" in out
+    assert "2 fichiers traités, 1 erreurs" in out
+    # Fichier en erreur laissé en place, les autres archivés
+    assert sorted(path.name for path in (tmp_path / "input").iterdir()) == ["broken.json"]
+
+def test_process_pool_output_matches_serial_run(tmp_path, monkeypatch):
+    trees = []
+    for jobs in (1, 2):
+        root = tmp_path / f"jobs{jobs}"
+        (root / "input").mkdir(parents=True)
+        write_json(root / "input" / "space_marines.json", FACTION)
+        write_json(root / "input" / "necrons.json", {"id": "NEC", "datasheets": [{"name": "Overlord"}]})
+        monkeypatch.chdir(root)
+        process_directory("input", jobs)
+        trees.append(tree_contents(root))
+    assert trees[0] == trees[1]
+    assert "en/SM.flat.json" in trees[0] and "archive/necrons.json" in trees[0]
+
+@pytest.fixture
+def flat_dirs(tmp_path):
+    (tmp_path / "en").mkdir()
+    (tmp_path / "fr").mkdir()
+    return str(tmp_path / "en" / "SM.flat.json"), str(tmp_path / "fr" / "SM.flat.json")
+
+def test_first_sync_adds_every_key(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    translations = {"a": "Captain", "b": "Librarian"}
+
+    counts = sync_flat_files(translations, flat_en, flat_fr)
+
+    assert counts == {"kept": 0, "renamed": 0, "memory": 0, "added": 2, "stale": 0, "removed": 0, "pending": 2}
+    assert read_json(flat_en) == read_json(flat_fr) == translations
+    assert read_json(pending_path_for(flat_fr)) == {"added": translations, "stale": {}, "removed": []}
+
+def test_sync_keeps_translations_and_flags_changes(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    write_json(flat_en, {"kept": "Captain", "changed": "Old rule", "old_key": "Librarian", "gone": "Chaplain"})
+    write_json(flat_fr, {"kept": "Capitaine", "changed": "Ancienne règle", "old_key": "Archiviste",
+                         "gone": "Chapelain"})
+
+    counts = sync_flat_files({"kept": "Captain", "changed": "New rule", "new_key": "Librarian",
+                              "added": "Apothecary"}, flat_en, flat_fr)
+
+    assert counts == {"kept": 1, "renamed": 1, "memory": 0, "added": 1, "stale": 1, "removed": 2, "pending": 2}
+    assert read_json(flat_fr) == {"kept": "Capitaine", "changed": "New rule", "new_key": "Archiviste",
+                                  "added": "Apothecary"}
+    assert read_json(pending_path_for(flat_fr)) == {
+        "added": {"added": "Apothecary"},
+        "stale": {"changed": {"en": "New rule", "previous_en": "Old rule", "previous_fr": "Ancienne règle"}},
+        "removed": ["old_key", "gone"],
+    }
+
+def test_pending_entries_carry_over_until_translated(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    translations = {"a": "Captain", "b": "Librarian"}
+    sync_flat_files(translations, flat_en, flat_fr)
+
+    # Deuxième passage sans traduction : les clés restent à traduire
+    counts = sync_flat_files(translations, flat_en, flat_fr)
+    assert (counts["kept"], counts["added"], counts["pending"]) == (2, 0, 2)
+    assert read_json(pending_path_for(flat_fr))["added"] == translations
+
+    # Une traduction faite : elle sort du fichier pending
+    write_json(flat_fr, {"a": "Capitaine", "b": "Librarian"})
+    sync_flat_files(translations, flat_en, flat_fr)
+    assert read_json(pending_path_for(flat_fr))["added"] == {"b": "Librarian"}
+
+    # Plus rien en attente : le fichier pending est supprimé
+    write_json(flat_fr, {"a": "Capitaine", "b": "Archiviste"})
+    sync_flat_files(translations, flat_en, flat_fr)
+    assert not os.path.exists(pending_path_for(flat_fr))
+
+def test_sync_preserves_translation_memory_references(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    write_json(common_path(os.path.dirname(flat_en)), {"oath": "Oath of Moment"})
+    write_json(common_path(os.path.dirname(flat_fr)), {"oath": "Serment de l'Instant"})
+    write_json(flat_en, {"a": "@common:oath", "b": "@common:oath", "c": "@common:oath"})
+    write_json(flat_fr, {"a": "@common:oath", "b": "@common:oath", "c": "@common:oath"})
+
+    counts = sync_flat_files({"a": "Oath of Moment", "b": "Changed", "renamed": "Oath of Moment"},
+                             flat_en, flat_fr)
+
+    assert (counts["kept"], counts["stale"], counts["renamed"], counts["removed"]) == (1, 1, 1, 1)
+    assert read_json(flat_en) == {"a": "@common:oath", "b": "Changed", "renamed": "@common:oath"}
+    assert read_json(flat_fr) == {"a": "@common:oath", "b": "Changed", "renamed": "@common:oath"}
+    stale = read_json(pending_path_for(flat_fr))["stale"]["b"]
+    assert stale == {"en": "Changed", "previous_en": "Oath of Moment", "previous_fr": "Serment de l'Instant"}
+
+def test_reextraction_keeps_french_text(extract, tmp_path):
+    en, _, _ = extract(copy.deepcopy(FACTION))
+    fr = {key: f"FR {value}" for key, value in en.items()}
+    write_json(tmp_path / "fr" / "SM.flat.json", fr)
+
+    # Nouvelle version amont : un texte modifié
+    document = copy.deepcopy(FACTION)
+    document["datasheets"][1]["abilities"]["other"][0]["description"] = "Sticky objectives, revised."
+    (tmp_path / "archive" / "space_marines.json").unlink()
+    _, new_fr, _ = extract(document)
+
+    key = "datasheets.Intercessor_Squad.abilities.other.0.description"
+    assert new_fr == {**fr, key: "Sticky objectives, revised."}
+    assert list(read_json(pending_path_for(str(tmp_path / "fr" / "SM.flat.json")))["stale"]) == [key]
+
+def test_renamed_key_inherits_only_a_translated_value(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    # "old_b" n'a jamais été traduite : sa valeur FR est encore l'anglais
+    write_json(flat_en, {"old_a": "Captain", "old_b": "Librarian"})
+    write_json(flat_fr, {"old_a": "Capitaine", "old_b": "Librarian"})
+    write_json(pending_path_for(flat_fr), {"added": {"old_b": "Librarian"}, "stale": {}, "removed": []})
+
+    counts = sync_flat_files({"new_a": "Captain", "new_b": "Librarian"}, flat_en, flat_fr)
+
+    assert (counts["renamed"], counts["added"], counts["pending"]) == (1, 1, 1)
+    assert read_json(flat_fr) == {"new_a": "Capitaine", "new_b": "Librarian"}
+    assert read_json(pending_path_for(flat_fr))["added"] == {"new_b": "Librarian"}
+
+def test_new_keys_take_their_translation_from_the_memory(flat_dirs):
+    flat_en, flat_fr = flat_dirs
+    write_json(common_path(os.path.dirname(flat_en)), {"bolt_pistol": "Bolt pistol", "leader": "Leader"})
+    # "Leader" est en mémoire mais pas encore traduit
+    write_json(common_path(os.path.dirname(flat_fr)), {"bolt_pistol": "Pistolet bolter", "leader": "Leader"})
+
+    counts = sync_flat_files({"a": "Bolt pistol", "b": "Bolt  pistol ", "c": "Leader", "d": "Chainsword"},
+                             flat_en, flat_fr)
+
+    assert (counts["memory"], counts["added"], counts["pending"]) == (2, 2, 2)
+    # Texte identique à l'entrée commune : référence ; variante d'espacement : texte anglais gardé
+    assert read_json(flat_en) == {"a": "@common:bolt_pistol", "b": "Bolt  pistol ", "c": "Leader",
+                                  "d": "Chainsword"}
+    assert read_json(flat_fr) == {"a": "@common:bolt_pistol", "b": "Pistolet bolter", "c": "Leader",
+                                  "d": "Chainsword"}
+    assert read_json(pending_path_for(flat_fr))["added"] == {"c": "Leader", "d": "Chainsword"}
+
+    # Passage suivant : les clés reprises de la mémoire sont conservées
+    counts = sync_flat_files({"a": "Bolt pistol", "b": "Bolt  pistol ", "c": "Leader", "d": "Chainsword"},
+                             flat_en, flat_fr)
+    assert (counts["kept"], counts["memory"]) == (4, 0)
+    assert read_json(flat_fr)["a"] == "@common:bolt_pistol"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from build_translation_packs import build_pack, load_locale
+from localized_view import materialize, open_faction
+from translation_pack import pack_path_for
+
+STRUCTURE = {"datasheets": [
+    {"id": "ds-1", "name": "datasheets.0.name", "keywords": ["keywords.0", "Infantry"]},
+    {"id": "ds-2", "name": "datasheets.1.name", "keywords": []},
+]}
+
+EN = {"datasheets.0.name": "Captain in Gravis Armour", "datasheets.1.name": "Intercessors",
+      "keywords.0": "@common:character"}
+FR = {"datasheets.0.name": "Capitaine en Armure Gravis", "keywords.0": "@common:character"}
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    write_json(tmp_path / "structure" / "SM.translated.json", STRUCTURE)
+    write_json(tmp_path / "en" / "SM.flat.json", EN)
+    write_json(tmp_path / "fr" / "SM.flat.json", FR)
+    write_json(tmp_path / "en" / "common.flat.json", {"character": "Character"})
+    write_json(tmp_path / "fr" / "common.flat.json", {"character": "Personnage"})
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def build_packs(tree):
+    for locale in ("en", "fr"):
+        path = pack_path_for(locale, str(tree / "dist"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(build_pack(load_locale(locale)))
+
+def set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+def test_view_translates_with_fallback_and_references(tree):
+    with open_faction("SM", pack_dir="dist") as view:
+        assert materialize(view["datasheets"]) == [
+            {"id": "ds-1", "name": "Capitaine en Armure Gravis", "keywords": ["Personnage", "Infantry"]},
+            {"id": "ds-2", "name": "Intercessors", "keywords": []},
+        ]
+
+@pytest.mark.parametrize("query", ["ds-1", "Captain in Gravis Armour", "Capitaine en Armure Gravis"])
+def test_datasheet_lookup_by_id_english_or_translated_name(tree, query):
+    with open_faction("SM", pack_dir="dist") as view:
+        assert view.datasheet(query)["name"] == "Capitaine en Armure Gravis"
+
+def test_datasheet_lookup_by_english_name_without_english_fallback(tree):
+    with open_faction("SM", fallback_locales=(), pack_dir="dist") as view:
+        assert view.datasheet("Captain in Gravis Armour")["id"] == "ds-1"
+        assert view.datasheet("Unknown") is None
+
+def test_fresh_pack_is_used(tree):
+    build_packs(tree)
+    # Le pack fait foi : une modification du fichier à plat plus ancienne est ignorée
+    write_json(tree / "fr" / "SM.flat.json", {**FR, "datasheets.0.name": "Autre"})
+    set_mtime(tree / "fr" / "SM.flat.json", os.path.getmtime(tree / "dist" / "fr.pack") - 10)
+    with open_faction("SM", pack_dir="dist") as view:
+        assert view.localizer.sources[0].pack is not None
+        assert view["datasheets"][0]["name"] == "Capitaine en Armure Gravis"
+
+def test_pack_older_than_common_file_is_not_used(tree):
+    build_packs(tree)
+    pack_mtime = os.path.getmtime(tree / "dist" / "fr.pack")
+    set_mtime(tree / "fr" / "SM.flat.json", pack_mtime - 10)
+    write_json(tree / "fr" / "common.flat.json", {"character": "Héros"})
+    set_mtime(tree / "fr" / "common.flat.json", pack_mtime + 10)
+    with open_faction("SM", pack_dir="dist") as view:
+        assert view.localizer.sources[0].pack is None
+        assert view["datasheets"][0]["keywords"][0] == "Héros"
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+pytest.importorskip("fitz")
+
+import extract_munitorum_data
+from extract_munitorum_data import (diff_points, index_path_for, load_extraction_index, parse_munitorum_pages,
+                                    points_changes_path_for, split_sections, update_munitorum_data)
+
+EDITION_1 = [
+    ["CODEX: SPACE MARINES", "Captain", "1 model 80 pts"],
+    ["Intercessor Squad", "5 models 80 pts", "10 models 160 pts"],
+    ["CODEX: NECRONS", "Overlord", "1 model 85 pts", "DETACHMENT ENHANCEMENTS", "Awakened Dynasty",
+     "Enaegic Dermal Bond 15 pts"],
+]
+EDITION_2 = [EDITION_1[0], EDITION_1[1],
+             ["CODEX: NECRONS", "Overlord", "1 model 90 pts", "DETACHMENT ENHANCEMENTS", "Awakened Dynasty",
+              "Enaegic Dermal Bond 15 pts"]]
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def page_texts(pages):
+    return ["\n".join(lines) + "\n" for lines in pages]
+
+def test_split_sections_hashes_content_per_faction():
+    first = split_sections(page_texts(EDITION_1))
+    second = split_sections(page_texts(EDITION_2))
+    # Section vide avant la première faction, puis une section par faction
+    assert [section["pages"] for section in first] == [[0, 0], [0, 1], [2, 2]]
+    assert [a["hash"] == b["hash"] for a, b in zip(first, second)] == [True, True, False]
+
+def test_diff_points():
+    old = parse_munitorum_pages(page_texts(EDITION_1))["factions"]
+    new = parse_munitorum_pages(page_texts(EDITION_2))["factions"]
+    assert diff_points(old, new) == [
+        {"faction": "NECRONS", "unit": "Overlord", "option": "1 model", "old": "85", "new": "90"}]
+    assert diff_points(old, new, names={"SPACE MARINES"}) == []
+    assert diff_points(old, [])[-1] == {"faction": "NECRONS", "enhancement": "Enaegic Dermal Bond",
+                                        "detachment": "Awakened Dynasty", "old": "15", "new": None}
+
+def test_new_edition_reparses_only_changed_sections(tmp_path, make_pdf, monkeypatch):
+    output_path = str(tmp_path / "munitorum.json")
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", EDITION_1)
+    update_munitorum_data(pdf_path, output_path)
+    assert load_extraction_index(output_path) is not None
+
+    expected = parse_munitorum_pages(page_texts(EDITION_2))
+    parsed = []
+    parse_section = extract_munitorum_data.parse_section
+
+    def counting_parse_section(tokens, in_agents_section=False):
+        parsed.append(tokens[0][1] if tokens else "")
+        return parse_section(tokens, in_agents_section)
+
+    monkeypatch.setattr(extract_munitorum_data, "parse_section", counting_parse_section)
+    make_pdf(tmp_path / "mfm.pdf", EDITION_2)
+    data = update_munitorum_data(pdf_path, output_path)
+
+    assert parsed == ["CODEX: NECRONS"]
+    assert data == expected
+    assert read_json(output_path) == data
+    report = read_json(points_changes_path_for(output_path))
+    assert (report["sections_reparsed"], report["sections_reused"]) == (1, 2)
+    assert report["changes"] == [
+        {"faction": "NECRONS", "unit": "Overlord", "option": "1 model", "old": "85", "new": "90"}]
+
+def test_index_is_ignored_when_output_was_edited(tmp_path, make_pdf):
+    output_path = str(tmp_path / "munitorum.json")
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", EDITION_1)
+    update_munitorum_data(pdf_path, output_path)
+
+    data = read_json(output_path)
+    data["factions"][0]["units"][0]["costs"][0]["cost"] = "999"
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    assert load_extraction_index(output_path) is None
+
+    # Réanalyse complète : la modification manuelle est remplacée
+    assert update_munitorum_data(pdf_path, output_path) == parse_munitorum_pages(page_texts(EDITION_1))
+
+def test_full_mode_ignores_index(tmp_path, make_pdf):
+    output_path = str(tmp_path / "munitorum.json")
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", EDITION_1)
+    update_munitorum_data(pdf_path, output_path)
+    update_munitorum_data(pdf_path, output_path, incremental=False)
+    report = read_json(points_changes_path_for(output_path))
+    assert (report["sections_reparsed"], report["changes"]) == (3, [])
+    assert read_json(index_path_for(output_path))["sections"][2]["factions"] == [1]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+pytest.importorskip("fitz")
+
+import extract_munitorum_data
+from extract_munitorum_data import extract_page_texts, file_sha256, load_page_cache, page_cache_path, split_pages
+
+PAGES = [[f"Page {page}", f"Unit {page}", f"1 model {page * 10} pts"] for page in range(7)]
+
+@pytest.mark.parametrize("count, jobs, sizes", [
+    (7, 3, [3, 2, 2]),
+    (6, 3, [2, 2, 2]),
+    (2, 8, [1, 1]),
+    (5, 1, [5]),
+    (5, 0, [5]),
+])
+def test_split_pages_balanced_contiguous_chunks(count, jobs, sizes):
+    pages = list(range(count))
+    chunks = split_pages(pages, jobs)
+    assert [len(chunk) for chunk in chunks] == sizes
+    assert [page for chunk in chunks for page in chunk] == pages
+
+def test_parallel_extraction_matches_serial(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", PAGES)
+    serial = extract_page_texts(pdf_path, jobs=1, use_cache=False)
+    assert serial == ["\n".join(lines) + "\n" for lines in PAGES]
+    assert extract_page_texts(pdf_path, jobs=3, use_cache=False) == serial
+
+def count_extracted_pages(monkeypatch):
+    """Compte les pages décodées par PyMuPDF."""
+    decoded = []
+    extract_pages = extract_munitorum_data.extract_pages
+
+    def counting(pdf_path, page_numbers):
+        decoded.extend(page_numbers)
+        return extract_pages(pdf_path, page_numbers)
+
+    monkeypatch.setattr(extract_munitorum_data, "extract_pages", counting)
+    return decoded
+
+def test_page_cache_is_keyed_by_pdf_content(tmp_path, make_pdf, monkeypatch):
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", PAGES)
+    decoded = count_extracted_pages(monkeypatch)
+
+    texts = extract_page_texts(pdf_path)
+    cache_path = page_cache_path(pdf_path, file_sha256(pdf_path))
+    assert decoded == list(range(len(PAGES)))
+    assert load_page_cache(cache_path) == {str(page): text for page, text in enumerate(texts)}
+
+    # Même PDF : tout vient du cache
+    assert extract_page_texts(pdf_path) == texts
+    assert decoded == list(range(len(PAGES)))
+
+    # Nouvelle édition : autre SHA-256, donc autre fichier de cache
+    make_pdf(tmp_path / "mfm.pdf", PAGES + [["New page"]])
+    assert extract_page_texts(pdf_path)[-1] == "New page\n"
+    assert page_cache_path(pdf_path, file_sha256(pdf_path)) != cache_path
+
+def test_only_missing_pages_are_decoded(tmp_path, make_pdf, monkeypatch):
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", PAGES)
+    texts = extract_page_texts(pdf_path)
+    cache_path = page_cache_path(pdf_path, file_sha256(pdf_path))
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    del cache["pages"]["2"], cache["pages"]["5"]
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+
+    decoded = count_extracted_pages(monkeypatch)
+    assert extract_page_texts(pdf_path) == texts
+    assert decoded == [2, 5]
+
+@pytest.mark.parametrize("content", ["not json", json.dumps({"extractor_version": "0", "pages": {"0": "old"}})])
+def test_stale_or_corrupt_cache_is_ignored(tmp_path, make_pdf, content):
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", PAGES)
+    cache_path = page_cache_path(pdf_path, file_sha256(pdf_path))
+    (tmp_path / ".page_cache").mkdir()
+    with open(cache_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    assert load_page_cache(cache_path) == {}
+    assert extract_page_texts(pdf_path)[0] == "Page 0\nUnit 0\n1 model 0 pts\n"
+    assert load_page_cache(cache_path)["0"] == "Page 0\nUnit 0\n1 model 0 pts\n"
+
+def test_no_cache_does_not_write_cache(tmp_path, make_pdf):
+    pdf_path = make_pdf(tmp_path / "mfm.pdf", PAGES)
+    extract_page_texts(pdf_path, use_cache=False)
+    assert not (tmp_path / ".page_cache").exists()
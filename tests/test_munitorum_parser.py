@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fitz")
+
+from extract_munitorum_data import (TOKEN_ENHANCEMENTS, TOKEN_FACTION, TOKEN_MODEL_COST, TOKEN_NUMBER,
+                                    TOKEN_OPTION_COST, TOKEN_PAGE_HEADER, TOKEN_POINTS, TOKEN_SUPPLEMENT,
+                                    TOKEN_TEXT, TOKEN_UNIT_NAME, classify_line, clean_name, clean_text,
+                                    extract_page_texts, lex_page, parse_munitorum_pages)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize("line, token", [
+    ("CODEX SUPPLEMENT:", TOKEN_SUPPLEMENT),
+    ("CODEX: SPACE MARINES", TOKEN_FACTION),
+    ("INDEX: IMPERIAL AGENTS", TOKEN_FACTION),
+    ("MUNITORUM FIELD MANUAL", TOKEN_PAGE_HEADER),
+    ("FORGE WORLD POINTS VALUES", TOKEN_PAGE_HEADER),
+    ("DETACHMENT ENHANCEMENTS", TOKEN_ENHANCEMENTS),
+    ("42", TOKEN_NUMBER),
+    ("Captain in Gravis Armour", TOKEN_UNIT_NAME),
+    ("Ork", TOKEN_TEXT),
+    ("GLADIUS TASK FORCE", TOKEN_TEXT),
+    ("Contemptor (FORGE WORLD)", TOKEN_TEXT),
+    ("5 models 90 pts", TOKEN_MODEL_COST),
+    ("Invader ATV +60 pts", TOKEN_OPTION_COST),
+    ("Artificer Armour 10 pts", TOKEN_POINTS),
+])
+def test_classify_line(line, token):
+    assert classify_line(line) == token
+
+def test_clean_text_and_name():
+    # Caractères invisibles et de contrôle supprimés, espaces multiples réduits
+    assert clean_text("\ufeff Captain\u200b  in Gra\x07vis ") == "Captain in Gravis"
+    assert clean_name("Lord of Contagion*") == "Lord of Contagion"
+
+def test_lex_page_skips_blank_lines_and_keeps_next_line():
+    assert lex_page("CODEX SUPPLEMENT:\n\n  \nBLOOD ANGELS\n") == [
+        (TOKEN_SUPPLEMENT, "CODEX SUPPLEMENT:", ""),
+        (TOKEN_TEXT, "BLOOD ANGELS", ""),
+    ]
+    assert lex_page("CODEX SUPPLEMENT:\nBLOOD ANGELS")[0] == (TOKEN_SUPPLEMENT, "CODEX SUPPLEMENT:", "BLOOD ANGELS")
+
+def test_parse_units_options_and_enhancements():
+    page = "\n".join([
+        "CODEX: SPACE MARINES",
+        "Captain",
+        "1 model 80 pts",
+        "Land Speeder Storm",
+        "1 model 70 pts",
+        "Invader ATV +60 pts",
+        "DETACHMENT ENHANCEMENTS",
+        "Gladius Task Force",
+        "Artificer Armour 10 pts",
+        "12",
+        "Empty Detachment",
+    ])
+    assert parse_munitorum_pages([page]) == {"factions": [{
+        "name": "SPACE MARINES",
+        "units": [
+            {"name": "Captain", "costs": [{"name": "model", "model": "1", "cost": "80"}]},
+            {"name": "Land Speeder Storm", "costs": [{"name": "model", "model": "1", "cost": "70"},
+                                                     {"cost_name": "Invader ATV", "cost": "+60"}]},
+        ],
+        # Catégorie sans amélioration supprimée par le post-traitement
+        "enhancements": [{"category": "Gladius Task Force",
+                          "enhancements": [{"name": "Artificer Armour", "cost": "10"}]}],
+    }]}
+
+def test_parse_renames_factions_and_supplements():
+    pages = ["CODEX: T’AU EMPIRE\nCommander\n1 model 85 pts", "CODEX SUPPLEMENT:\nBLOOD ANGELS\nSanguinor\n1 model 130 pts"]
+    factions = parse_munitorum_pages(pages)["factions"]
+    assert [faction["name"] for faction in factions] == ["TAU", "CODEX SUPPLEMENT: BLOOD ANGELS"]
+    assert factions[1]["units"][0]["name"] == "Sanguinor"
+
+def test_repository_pdf_matches_committed_extraction():
+    texts = extract_page_texts(os.path.join(ROOT, "Input Points", "bds.pdf"), use_cache=False)
+    with open(os.path.join(ROOT, "munitorum_data_final.json"), encoding="utf-8") as f:
+        assert parse_munitorum_pages(texts) == json.load(f)
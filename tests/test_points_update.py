@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from update_points_from_munitorum import update_points_in_archive
+
+def cost(value, models="1"):
+    return {"name": "model", "model": models, "cost": value}
+
+MUNITORUM = {"factions": [
+    {"name": "SPACE MARINES", "units": [
+        {"name": "Captain", "costs": [cost("85")]},
+        {"name": "Librarian", "costs": [cost("65")]},
+        {"name": "Unknown Hero", "costs": [cost("100")]},
+    ], "enhancements": []},
+    {"name": "NECRONS", "units": [{"name": "Overlord", "costs": [cost("85")]}], "enhancements": []},
+]}
+
+ARCHIVE = {
+    "space_marines.json": {"datasheets": [
+        {"id": "a", "name": "Captain", "points": [cost("80")]},
+        {"id": "b", "name": "Librarian", "points": [cost("65")]},
+    ]},
+    # Points déjà à jour : le fichier ne doit pas être réécrit
+    "necrons.json": {"datasheets": [{"id": "c", "name": "Overlord", "points": [cost("85")]}]},
+}
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    (tmp_path / "munitorum_data_final.json").write_text(json.dumps(MUNITORUM), encoding="utf-8")
+    (tmp_path / "archive").mkdir()
+    for filename, document in ARCHIVE.items():
+        # Format différent de celui du dépôt : une réécriture se verrait
+        (tmp_path / "archive" / filename).write_text(json.dumps(document), encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def snapshot(tree):
+    return {path.name: path.read_bytes() for path in (tree / "archive").iterdir()}
+
+def test_dry_run_writes_only_the_diff(tree):
+    before = snapshot(tree)
+
+    update_points_in_archive(dry_run=True, diff_path="points_diff.json")
+
+    assert snapshot(tree) == before
+    diff = read_json(tree / "points_diff.json")
+    assert diff["files"] == {"space_marines.json": [
+        {"unit": "Captain", "datasheet": "Captain", "id": "a", "old": [cost("80")], "new": [cost("85")]}]}
+    assert diff["not_found"] == [{"faction": "SPACE MARINES", "unit": "Unknown Hero"}]
+    assert diff["matched"] == 3
+
+def test_only_files_with_changed_points_are_rewritten(tree):
+    before = snapshot(tree)
+
+    update_points_in_archive()
+
+    after = snapshot(tree)
+    assert after["necrons.json"] == before["necrons.json"]
+    assert read_json(tree / "archive" / "space_marines.json")["datasheets"][0]["points"] == [cost("85")]
+    assert not (tree / "points_diff.json").exists()
+
+    # Deuxième passage : plus rien ne change
+    update_points_in_archive(diff_path="points_diff.json")
+    assert snapshot(tree) == after
+    assert read_json(tree / "points_diff.json")["files"] == {}
+
+def test_units_matched_to_the_same_datasheet_are_reported(tree):
+    munitorum = read_json(tree / "munitorum_data_final.json")
+    munitorum["factions"][0]["units"].append({"name": "CAPTAIN", "costs": [cost("90")]})
+    (tree / "munitorum_data_final.json").write_text(json.dumps(munitorum), encoding="utf-8")
+
+    update_points_in_archive(dry_run=True, diff_path="points_diff.json")
+
+    diff = read_json(tree / "points_diff.json")
+    assert diff["conflicts"] == [{"file": "space_marines.json", "datasheet": "Captain", "units": ["Captain", "CAPTAIN"]}]
+    # La dernière unité l'emporte
+    assert diff["files"]["space_marines.json"][0]["new"] == [cost("90")]
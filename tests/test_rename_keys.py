@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+import rename_keys
+from rename_keys import RENAME_RULES, build_rename_map, rename_faction, rename_flat, run
+from translation_memory import load_flat
+
+MELEE = "datasheets.Captain.meleeWeapons.{}.profiles.0.name"
+ABILITY = "datasheets.Captain.abilities.faction.{}"
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def write_faction(root, en, fr, common_en=None, common_fr=None):
+    """Crée structure/, en/ et fr/ d'une faction SM sous root."""
+    write_json(root / "structure" / "SM.translated.json",
+               {"datasheets": [{"meleeWeapons": [{"profiles": [{"name": key}]} for key in en]}]})
+    write_json(root / "en" / "SM.flat.json", en)
+    write_json(root / "fr" / "SM.flat.json", fr)
+    if common_en is not None:
+        write_json(root / "en" / "common.flat.json", common_en)
+        write_json(root / "fr" / "common.flat.json", common_fr)
+
+def test_build_rename_map_uses_first_matching_rule():
+    flat_en = {MELEE.format(0): "Bolt Pistol", ABILITY.format(0): "Oath of Moment", "name": "Captain"}
+    assert build_rename_map(flat_en, RENAME_RULES) == {
+        MELEE.format(0): "bolt_pistol",
+        ABILITY.format(0): "oath_of_moment",
+    }
+
+def test_build_rename_map_resolves_common_references():
+    flat_en = {MELEE.format(0): "@common:bolt_pistol_1a2b3c4d"}
+    rename_map = build_rename_map(flat_en, RENAME_RULES, {"bolt_pistol_1a2b3c4d": "Bolt pistol"})
+    assert rename_map == {MELEE.format(0): "bolt_pistol"}
+
+def test_rename_flat_merges_case_variants_on_smallest_old_key():
+    flat = {MELEE.format(1): "Bolt pistol", MELEE.format(0): "Bolt Pistol"}
+    rename_map = {MELEE.format(0): "bolt_pistol", MELEE.format(1): "bolt_pistol"}
+    renamed, conflicts = rename_flat(flat, rename_map)
+    assert renamed == {"bolt_pistol": "Bolt Pistol"}
+    assert conflicts == [{"key": "bolt_pistol", "kept": "Bolt Pistol", "dropped": ["Bolt pistol"]}]
+
+def test_rename_flat_existing_key_wins():
+    flat = {MELEE.format(0): "Bolt Pistol", "bolt_pistol": "Bolt pistol"}
+    renamed, _ = rename_flat(flat, {MELEE.format(0): "bolt_pistol"})
+    assert renamed == {"bolt_pistol": "Bolt pistol"}
+
+def test_rename_flat_prefers_translation_over_english_variant():
+    flat = {MELEE.format(0): "Bolt Pistol", MELEE.format(1): "Pistolet bolter", MELEE.format(2): "bolt pistol"}
+    rename_map = {key: "bolt_pistol" for key in flat}
+    renamed, conflicts = rename_flat(flat, rename_map, prefer_translated=True)
+    assert renamed == {"bolt_pistol": "Pistolet bolter"}
+    assert conflicts == []
+
+def test_rename_flat_keeps_references_and_compares_resolved_text():
+    common = {"bolt_pistol": "Bolt pistol"}
+    flat = {MELEE.format(0): "@common:bolt_pistol", MELEE.format(1): "Bolt pistol"}
+    renamed, conflicts = rename_flat(flat, {key: "bolt_pistol" for key in flat}, common=common)
+    assert renamed == {"bolt_pistol": "@common:bolt_pistol"}
+    assert conflicts == []
+
+def test_rename_flat_ignores_referenced_english_variant_on_fr_side():
+    common_fr = {"bolt_pistol": "Bolt pistol"}
+    flat = {MELEE.format(0): "@common:bolt_pistol", MELEE.format(1): "Pistolet bolter"}
+    renamed, conflicts = rename_flat(flat, {key: "bolt_pistol" for key in flat},
+                                     prefer_translated=True, common=common_fr)
+    assert renamed == {"bolt_pistol": "Pistolet bolter"}
+    assert conflicts == []
+
+def test_referenced_flat_gets_same_keys_as_expanded_flat(tmp_path, monkeypatch):
+    common_en = {"bolt_pistol_1a2b3c4d": "Bolt pistol", "chainsword": "Chainsword"}
+    common_fr = {"bolt_pistol_1a2b3c4d": "Pistolet bolter", "chainsword": "Épée tronçonneuse"}
+    en = {MELEE.format(0): "@common:bolt_pistol_1a2b3c4d", MELEE.format(1): "@common:chainsword",
+          MELEE.format(2): "Power fist"}
+    fr = {MELEE.format(0): "@common:bolt_pistol_1a2b3c4d", MELEE.format(1): "Épée tronçonneuse",
+          MELEE.format(2): "Gantelet énergétique"}
+
+    referenced = tmp_path / "referenced"
+    expanded = tmp_path / "expanded"
+    write_faction(referenced, en, fr, common_en, common_fr)
+    write_faction(expanded, {key: common_en.get(value[len("@common:"):], value) for key, value in en.items()},
+                  {key: common_fr.get(value[len("@common:"):], value) for key, value in fr.items()})
+
+    entries = {}
+    for root in (referenced, expanded):
+        monkeypatch.chdir(root)
+        entries[root] = rename_faction("SM", RENAME_RULES, structure_dir="structure")
+
+    assert entries[referenced]["renames"] == entries[expanded]["renames"]
+    assert sorted(entries[referenced]["renames"].values()) == ["bolt_pistol", "chainsword", "power_fist"]
+    for locale in ("en", "fr"):
+        assert load_flat(str(referenced / locale / "SM.flat.json")) == \
+            load_flat(str(expanded / locale / "SM.flat.json"))
+    # Les références sont conservées dans les fichiers renommés
+    assert read_json(referenced / "en" / "SM.flat.json")["bolt_pistol"] == "@common:bolt_pistol_1a2b3c4d"
+    assert read_json(referenced / "structure" / "SM.translated.json") == \
+        read_json(expanded / "structure" / "SM.translated.json")
+
+def test_files_without_old_keys_are_not_rewritten(tmp_path, monkeypatch):
+    write_faction(tmp_path, {MELEE.format(0): "Bolt pistol"}, {MELEE.format(0): "Pistolet bolter"})
+    # Mise en page et clés en double d'origine : une resérialisation se verrait
+    untouched = '{"other": "Texte", "other": "Texte",\n "name": "Captain"}'
+    (tmp_path / "fr" / "SM.pending.json").write_text(untouched, encoding="utf-8")
+    for path in ("en/AE.flat.json", "fr/AE.flat.json", "structure/AE.translated.json"):
+        (tmp_path / path).write_text(untouched, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    log = run(structure_dir="structure", log_path="rename_log.json")
+
+    assert log["factions"]["AE"]["renames"] == {}
+    assert set(log["factions"]["AE"]["files"].values()) == {False, None}
+    assert log["factions"]["SM"]["files"]["fr/SM.pending.json"] is False
+    assert read_json(tmp_path / "en" / "SM.flat.json") == {"bolt_pistol": "Bolt pistol"}
+    for path in ("fr/SM.pending.json", "en/AE.flat.json", "fr/AE.flat.json", "structure/AE.translated.json"):
+        assert (tmp_path / path).read_text(encoding="utf-8") == untouched
+
+def test_dry_run_does_not_write_files_or_log(tmp_path, monkeypatch):
+    write_faction(tmp_path, {MELEE.format(0): "Bolt pistol"}, {MELEE.format(0): "Pistolet bolter"})
+    write_json(tmp_path / "rename_log.json", {"previous": True})
+    monkeypatch.chdir(tmp_path)
+    before = (tmp_path / "en" / "SM.flat.json").read_text(encoding="utf-8")
+
+    log = run(["SM"], structure_dir="structure", dry_run=True, log_path="rename_log.json")
+
+    assert log["factions"]["SM"]["renames"] == {MELEE.format(0): "bolt_pistol"}
+    assert read_json(tmp_path / "rename_log.json") == {"previous": True}
+    assert (tmp_path / "en" / "SM.flat.json").read_text(encoding="utf-8") == before
+
+def test_replay_applies_logged_renames(tmp_path, monkeypatch):
+    write_faction(tmp_path, {MELEE.format(0): "Bolt pistol"}, {MELEE.format(0): "Pistolet bolter"})
+    monkeypatch.chdir(tmp_path)
+    run(["SM"], structure_dir="structure", log_path="rename_log.json")
+    assert read_json(tmp_path / "fr" / "SM.flat.json") == {"bolt_pistol": "Pistolet bolter"}
+
+    # Structure régénérée avec les anciennes clés : le journal la renomme sans recalcul
+    write_json(tmp_path / "structure" / "SM.translated.json", {"name": MELEE.format(0)})
+    run(["SM"], structure_dir="structure", log_path="replay_log.json", replay="rename_log.json")
+    assert read_json(tmp_path / "structure" / "SM.translated.json") == {"name": "bolt_pistol"}
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bolt Pistol", "bolt_pistol"),
+    ("Master-crafted power sword", "master_crafted_power_sword"),
+    ("  Heavy  bolter (Dakka) ", "heavy_bolter_dakka"),
+])
+def test_to_snake_case(text, expected):
+    assert rename_keys.to_snake_case(text) == expected
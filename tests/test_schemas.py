@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+from schemas import compile_schema, escape_pointer, schema_for_path, validate
+from validate_extraction import validate_files
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def errors_of(schema, value):
+    errors = []
+    compile_schema(schema)(value, "", errors)
+    return errors
+
+def test_types_are_compared_exactly():
+    assert errors_of({"type": "integer"}, 3) == []
+    assert errors_of({"type": "integer"}, True) == [{"pointer": "", "message": "type attendu : integer, trouvé : boolean"}]
+    assert errors_of({"type": "number"}, 1.5) == []
+    assert errors_of({"type": ["string", "null"]}, None) == []
+    assert errors_of({"type": ["string", "null"]}, 1)[0]["message"] == "type attendu : string | null, trouvé : integer"
+
+def test_object_required_and_additional_properties():
+    schema = {"type": "object", "properties": {"a": {"type": "string"}}, "required": ["a", "b"],
+              "additionalProperties": False}
+    assert errors_of(schema, {"a": 1, "c": 2}) == [
+        {"pointer": "/b", "message": "champ requis manquant"},
+        {"pointer": "/a", "message": "type attendu : string, trouvé : integer"},
+        {"pointer": "/c", "message": "champ non autorisé"},
+    ]
+    assert errors_of(schema, []) == [{"pointer": "", "message": "type attendu : object, trouvé : array"}]
+
+def test_additional_properties_schema_and_pointer_escaping():
+    schema = {"type": "object", "additionalProperties": {"type": "array", "items": {"type": "integer"}}}
+    assert errors_of(schema, {"a/b": [1, "x"], "c~d": {}, "ok": []}) == [
+        {"pointer": "/a~1b/1", "message": "type attendu : integer, trouvé : string"},
+        {"pointer": "/c~0d", "message": "type attendu : array, trouvé : object"},
+    ]
+    assert escape_pointer("~/") == "~0~1"
+
+def test_nested_items_are_validated_with_their_schema():
+    schema = {"type": "array", "items": {"type": "object", "required": ["id"]}}
+    assert errors_of(schema, [{"id": 1}, {}, 3]) == [
+        {"pointer": "/1/id", "message": "champ requis manquant"},
+        {"pointer": "/2", "message": "type attendu : object, trouvé : integer"},
+    ]
+
+def test_pattern_must_match_whole_string():
+    schema = {"type": "string", "pattern": r"\+?\d+"}
+    assert errors_of(schema, "+60") == []
+    assert errors_of(schema, "60 pts") == [{"pointer": "", "message": "valeur '60 pts' ne correspond pas à \\+?\\d+"}]
+    assert errors_of(schema, 60) == [{"pointer": "", "message": "type attendu : string, trouvé : integer"}]
+
+def test_any_of_reports_every_option():
+    schema = {"type": "object", "anyOf": [{"required": ["cost_name"]}, {"required": ["name"]}]}
+    assert errors_of(schema, {"name": "1 model"}) == []
+    assert errors_of(schema, {"cost": "80"}) == [{
+        "pointer": "",
+        "message": "aucune variante ne correspond (/cost_name : champ requis manquant ; /name : champ requis manquant)",
+    }]
+
+def test_any_of_errors_keep_the_pointer_of_the_value():
+    schema = {"type": "array", "items": {"anyOf": [{"type": "integer"}, {"type": "string", "pattern": "x+"}]}}
+    assert errors_of(schema, [1, "xx", "y"]) == [{
+        "pointer": "/2",
+        "message": "aucune variante ne correspond (type attendu : integer, trouvé : string ; "
+                   "valeur 'y' ne correspond pas à x+)",
+    }]
+
+def test_munitorum_schema():
+    unit = {"name": "Captain", "costs": [{"name": "1 model", "cost": "80"}, {"cost": "80 pts"}]}
+    data = {"factions": [{"name": "Space Marines", "units": [unit], "enhancements": []}]}
+    assert [error["pointer"] for error in validate(data, "munitorum")] == [
+        "/factions/0/units/0/costs/1/cost", "/factions/0/units/0/costs/1"]
+
+@pytest.mark.parametrize("path, expected", [
+    ("archive/space_marines.json", "archive"),
+    ("structure/SM.translated.json", "structure"),
+    ("fr/SM.flat.json", "flat"),
+    ("fr/common.flat.json", "flat"),
+    ("fr/SM.pending.json", "pending"),
+    ("munitorum_data_final.json", "munitorum"),
+    ("other/file.json", None),
+])
+def test_schema_for_path(path, expected):
+    assert schema_for_path(path) == expected
+
+@pytest.mark.parametrize("path", ["archive/space_marines.json", "structure/SM.translated.json",
+                                  "en/SM.flat.json", "fr/SM.flat.json"])
+def test_repository_files_are_valid(path):
+    with open(os.path.join(ROOT, path), encoding="utf-8") as f:
+        assert validate(json.load(f), schema_for_path(path)) == []
+
+def test_validate_files_report(tmp_path):
+    valid = tmp_path / "fr" / "SM.flat.json"
+    invalid = tmp_path / "fr" / "SM.pending.json"
+    valid.parent.mkdir()
+    valid.write_text(json.dumps({"a": "Texte"}), encoding="utf-8")
+    invalid.write_text(json.dumps({"added": {"a": 1}, "other": []}), encoding="utf-8")
+    report_path = tmp_path / "validation_report.json"
+
+    results = validate_files([str(valid), str(invalid)], jobs=2, report_path=str(report_path))
+
+    assert [len(result["errors"]) for result in results] == [0, 2]
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["files"] == 2 and report["invalid_files"] == 1 and report["errors"] == 2
+    assert report["schemas"] == {"flat": 1, "pending": 1}
+    assert [error["pointer"] for error in report["results"][str(invalid)]["errors"]] == ["/added/a", "/other"]
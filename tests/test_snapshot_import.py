@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+
+import download_json_files
+from download_json_files import import_snapshot, read_snapshot, snapshot_filename
+
+FILES = ["votann.json", "tau.json"]
+
+CONTENTS = {"votann.json": b'{"datasheets": [{"id": "a", "name": "Kahl"}]}',
+            "tau.json": b'{"datasheets": [{"id": "b", "name": "Commander"}]}'}
+
+@pytest.fixture(autouse=True)
+def no_rules(monkeypatch):
+    monkeypatch.setattr(download_json_files, "NORMALIZATION_RULES", [])
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+
+def make_tar(path, members):
+    with tarfile.open(path, "w:gz") as archive:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+@pytest.mark.parametrize("member, expected", [
+    ("votann.json", "votann.json"),
+    ("datasources-main/10th/gdc/votann.json", "votann.json"),
+    ("10th\\gdc\\tau.json", "tau.json"),
+    ("datasources-main/9th/gdc/votann.json", None),
+    ("datasources-main/10th/gdc/other.json", None),
+])
+def test_snapshot_filename(member, expected):
+    assert snapshot_filename(member, FILES) == expected
+
+@pytest.mark.parametrize("make", [make_zip, make_tar])
+def test_read_snapshot_archives(tmp_path, make):
+    path = tmp_path / ("snapshot.zip" if make is make_zip else "snapshot.tar.gz")
+    members = {f"datasources-main/10th/gdc/{name}": content for name, content in CONTENTS.items()}
+    make(path, {**members, "datasources-main/9th/gdc/tau.json": b"{}", "datasources-main/README.md": b"x"})
+    assert read_snapshot(str(path), FILES) == CONTENTS
+
+def test_read_snapshot_mirror_directory(tmp_path):
+    gdc = tmp_path / "10th" / "gdc"
+    gdc.mkdir(parents=True)
+    (gdc / "votann.json").write_bytes(CONTENTS["votann.json"])
+    assert read_snapshot(str(tmp_path), FILES) == {"votann.json": CONTENTS["votann.json"]}
+
+def test_read_snapshot_rejects_unknown_format(tmp_path):
+    path = tmp_path / "snapshot.txt"
+    path.write_text("not an archive")
+    with pytest.raises(ValueError):
+        read_snapshot(str(path), FILES)
+
+def test_import_snapshot_writes_changed_files_and_updates_manifest(tmp_path):
+    snapshot = tmp_path / "snapshot.zip"
+    make_zip(snapshot, CONTENTS)
+    output_dir = tmp_path / "archive"
+
+    results = import_snapshot(str(snapshot), str(output_dir), FILES)
+    assert [r["status"] for r in results] == ["changed", "changed"]
+    assert (output_dir / "tau.json").read_bytes() == CONTENTS["tau.json"]
+
+    # Même instantané : rien n'a changé ; un fichier absent est en erreur et garde son entrée
+    make_zip(snapshot, {"votann.json": CONTENTS["votann.json"]})
+    results = import_snapshot(str(snapshot), str(output_dir), FILES)
+    assert [r["status"] for r in results] == ["unchanged", "failed"]
+    with open(tmp_path / "archive_manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["last_run"] == {"date": manifest["last_run"]["date"], "changed": [],
+                                    "unchanged": ["votann.json"], "failed": ["tau.json"]}
+    assert set(manifest["files"]) == set(FILES)
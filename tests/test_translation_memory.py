@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+
+import pytest
+
+import translation_memory
+from translation_memory import (COMMON_KEY_LENGTH, apply_memory, build_memory, common_key_for,
+                                dangling_references, expand_flat, load_corpus, load_flat, resolve)
+from validate_extraction import validate_file
+
+# Texte assez long pour qu'une référence soit plus courte que lui
+RULE = ("Each time this model makes an attack that targets a unit within half range, you can re-roll the Hit "
+        "roll and you can re-roll the Wound roll; if that unit is your Oath of Moment target, add 1 to the Damage.")
+RULE_FR = ("Chaque fois que cette figurine attaque une unité à mi-portée, vous pouvez relancer le jet de touche et "
+           "le jet de blessure ; si cette unité est la cible de votre Serment de l'Instant, ajoutez 1 aux Dégâts.")
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+def test_common_key_for():
+    assert common_key_for("Bolt pistol", set()) == "bolt_pistol"
+    assert common_key_for("  Oath of Moment! ", set()) == "oath_of_moment"
+    # Clé déjà prise (variante d'espacement) : suffixe du hash du texte exact
+    variant = common_key_for("Bolt  pistol", {"bolt_pistol"})
+    assert variant.startswith("bolt_pistol_") and variant != common_key_for("Bolt   pistol", {"bolt_pistol"})
+    # Texte tronqué : toujours suffixé, pour que deux textes de même début ne se confondent pas
+    long_key = common_key_for(RULE, set())
+    assert len(long_key) == COMMON_KEY_LENGTH + 9 and long_key != common_key_for(RULE + "!", set())
+    assert common_key_for("!!!", set()) == "text"
+
+def test_resolve_and_dangling_references():
+    common = {"rule": "Texte"}
+    flat = {"a": "@common:rule", "b": "@common:missing", "c": "plain"}
+    assert resolve("@common:rule", common) == "Texte"
+    assert expand_flat(flat, common) == {"a": "Texte", "b": "@common:missing", "c": "plain"}
+    assert dangling_references(flat, common) == ["b"]
+
+def test_load_flat_resolves_with_the_common_file_of_its_directory(tmp_path):
+    write_json(tmp_path / "en" / "common.flat.json", {"rule": RULE})
+    write_json(tmp_path / "en" / "SM.flat.json", {"a": "@common:rule", "b": "x"})
+    assert load_flat(str(tmp_path / "en" / "SM.flat.json")) == {"a": RULE, "b": "x"}
+    assert load_flat(str(tmp_path / "en" / "missing.flat.json")) == {}
+
+def test_build_memory_shares_texts_found_in_several_files():
+    corpus = [
+        ("SM.flat.json", {"a": RULE, "n": "Captain", "k": "Leader"}, {"a": RULE_FR, "n": "Capitaine", "k": "Leader"}),
+        ("CSM.flat.json", {"b": RULE, "n": "Captain", "k": "Leader"}, {"b": RULE, "n": "Capitaine", "k": "Meneur"}),
+        ("TAU.flat.json", {"c": "Only here."}, None),
+    ]
+    common_en, common_fr, conflicts = build_memory(corpus, {}, {})
+    key = common_key_for(RULE, set())
+    # Textes courts compris : chaque texte partagé est traduit une seule fois
+    assert common_en == {"captain": "Captain", key: RULE, "leader": "Leader"}
+    # Les valeurs non traduites ne comptent pas comme des traductions divergentes
+    assert common_fr == {"captain": "Capitaine", key: RULE_FR, "leader": "Meneur"}
+    assert conflicts == {}
+
+def test_build_memory_groups_whitespace_variants():
+    spaced = RULE.replace(" ", "  ", 1)
+    corpus = [
+        ("SM.flat.json", {"a": RULE, "b": "Bolt pistol"}, {"a": RULE_FR, "b": "Pistolet bolter"}),
+        ("CSM.flat.json", {"a": spaced + "\n", "b": " Bolt pistol"}, {"a": RULE_FR.replace(" ", "  ", 1),
+                                                                      "b": "Pistolet bolter"}),
+        ("TAU.flat.json", {"a": RULE, "b": "Bolt Pistol"}, None),
+    ]
+    common_en, common_fr, conflicts = build_memory(corpus, {}, {})
+    key = common_key_for(RULE, set())
+    # Variante la plus fréquente gardée telle quelle ; la casse n'est pas normalisée
+    assert common_en == {"bolt_pistol": "Bolt pistol", key: RULE}
+    assert common_fr == {"bolt_pistol": "Pistolet bolter", key: RULE_FR}
+    assert conflicts == {}
+
+def test_build_memory_reports_diverging_translations():
+    corpus = [
+        ("SM.flat.json", {"a": RULE, "b": "Leader"}, {"a": RULE_FR, "b": "Meneur"}),
+        ("CSM.flat.json", {"a": RULE, "b": "Leader"}, {"a": RULE_FR + " (variante)", "b": "Chef"}),
+    ]
+    common_en, _, conflicts = build_memory(corpus, {}, {})
+    assert common_en == {}
+    assert conflicts == {"Leader": ["Meneur", "Chef"], RULE: [RULE_FR, RULE_FR + " (variante)"]}
+
+def test_build_memory_keeps_existing_keys():
+    corpus = [("SM.flat.json", {"a": "@common:my_rule"}, {"a": "@common:my_rule"})]
+    common_en, common_fr, _ = build_memory(corpus, {"my_rule": RULE}, {"my_rule": RULE_FR})
+    assert common_en == {"my_rule": RULE} and common_fr == {"my_rule": RULE_FR}
+
+def test_apply_memory_keeps_text_exactly_and_untranslated_values():
+    spaced = RULE.replace(" ", "  ", 1).replace(" ", "\n", 1)
+    common_en = {"rule": RULE, "leader": "Leader"}
+    common_fr = {"rule": RULE_FR, "leader": "Leader"}
+    en = {"a": RULE, "b": spaced, "c": "Captain", "d": "Leader"}
+    fr = {"c": "Capitaine", "b": RULE_FR, "a": RULE, "d": "Leader"}
+
+    new_en, new_fr = apply_memory(en, fr, {}, {}, common_en, common_fr)
+
+    # Variante d'espacement : texte anglais conservé, traduction commune référencée
+    assert new_en == {"a": "@common:rule", "b": spaced, "c": "Captain", "d": "@common:leader"}
+    # Valeur FR non traduite d'un texte traduit en commun : elle reste du texte ;
+    # l'ordre des clés FR est conservé
+    assert list(new_fr.items()) == [("c", "Capitaine"), ("b", "@common:rule"), ("a", RULE),
+                                    ("d", "@common:leader")]
+    assert expand_flat(new_en, common_en) == en
+    assert expand_flat(new_fr, common_fr) == fr
+
+def test_apply_memory_expands_references_removed_from_common():
+    new_en, new_fr = apply_memory({"a": "@common:rule"}, {"a": "@common:rule"},
+                                  {"rule": RULE}, {"rule": RULE_FR}, {}, {})
+    assert new_en == {"a": RULE} and new_fr == {"a": RULE_FR}
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["translation_memory.py", *args])
+    translation_memory.main()
+
+def test_main_round_trip(tmp_path, monkeypatch):
+    en = {"SM": {"a": RULE, "n": "Captain"}, "CSM": {"b": RULE, "n": "Chaos Lord"}}
+    fr = {"SM": {"a": RULE_FR, "n": "Capitaine"}, "CSM": {"b": RULE, "n": "Seigneur du Chaos"}}
+    for faction_id in en:
+        write_json(tmp_path / "en" / f"{faction_id}.flat.json", en[faction_id])
+        write_json(tmp_path / "fr" / f"{faction_id}.flat.json", fr[faction_id])
+    monkeypatch.chdir(tmp_path)
+
+    run_main(monkeypatch)
+    assert read_json(tmp_path / "en" / "SM.flat.json")["a"].startswith("@common:")
+    assert read_json(tmp_path / "fr" / "CSM.flat.json")["b"] == RULE
+    for locale, flats in (("en", en), ("fr", fr)):
+        for faction_id, flat in flats.items():
+            assert load_flat(str(tmp_path / locale / f"{faction_id}.flat.json")) == flat
+    assert [name for name, _, _ in load_corpus("en", "fr")] == ["CSM.flat.json", "SM.flat.json"]
+
+    run_main(monkeypatch, "--expand")
+    assert not (tmp_path / "en" / "common.flat.json").exists()
+    for locale, flats in (("en", en), ("fr", fr)):
+        for faction_id, flat in flats.items():
+            assert read_json(tmp_path / locale / f"{faction_id}.flat.json") == flat
+
+def test_validation_flags_dangling_references(tmp_path):
+    write_json(tmp_path / "fr" / "common.flat.json", {"rule": RULE_FR})
+    write_json(tmp_path / "fr" / "SM.flat.json", {"a": "@common:rule", "b/c": "@common:missing"})
+    write_json(tmp_path / "fr" / "CSM.flat.json", {"a": "@common:rule"})
+
+    assert validate_file(str(tmp_path / "fr" / "CSM.flat.json"))["errors"] == []
+    assert validate_file(str(tmp_path / "fr" / "SM.flat.json"))["errors"] == [
+        {"pointer": "/b~1c", "message": "référence @common:missing sans entrée dans common.flat.json"}]
+
+@pytest.mark.parametrize("value", [None, 3, ["@common:rule"]])
+def test_non_string_values_are_not_references(value):
+    assert resolve(value, {"rule": RULE}) == value
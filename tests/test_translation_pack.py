@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from build_translation_packs import build_pack, encode_varint, load_locale
+from translation_pack import BLOCK_SIZE, HEADER, TranslationPack, decode_varint
+
+def write_pack(path, flats):
+    path.write_bytes(build_pack(flats))
+    return TranslationPack(str(path))
+
+def write_json(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32 - 1])
+def test_varint_round_trip(value):
+    encoded = encode_varint(value)
+    assert decode_varint(encoded + b"\xff", 0) == (value, len(encoded))
+    assert len(encoded) == max(1, (value.bit_length() + 6) // 7)
+
+@pytest.fixture
+def flats():
+    # Plusieurs blocs, préfixes communs longs, UTF-8 multi-octets et valeur vide
+    sm = {f"datasheets.{i}.abilities.other.{j}.description": f"Texte {i}.{j} – é"
+          for i in range(5) for j in range(10)}
+    sm["empty"] = ""
+    sm["nested/key"] = "Clé avec barre oblique"
+    return {"SM": sm, "CSM": {"name": "Chaos Space Marines", "é": "accentuée"}}
+
+def test_pack_round_trip(tmp_path, flats):
+    with write_pack(tmp_path / "fr.pack", flats) as pack:
+        count = sum(len(flat) for flat in flats.values())
+        assert len(pack) == count and pack.count > 3 * BLOCK_SIZE
+        assert pack.blocks == (count + BLOCK_SIZE - 1) // BLOCK_SIZE
+        for file_id, flat in flats.items():
+            for key, value in flat.items():
+                assert pack.get(file_id, key) == value
+        entries = list(pack.items())
+        assert entries == sorted(((file_id, key), value) for file_id, flat in flats.items()
+                                 for key, value in flat.items())
+
+def test_missing_keys(tmp_path, flats):
+    with write_pack(tmp_path / "fr.pack", flats) as pack:
+        # Avant la première clé, entre deux clés d'un bloc, après la dernière, autre fichier
+        assert pack.get("AAA", "x") is None
+        assert pack.get("SM", "datasheets.0.abilities.other.0.description.x", "défaut") == "défaut"
+        assert pack.get("SM", "zzz") is None
+        assert pack.get("TAU", "name") is None
+        assert ("CSM", "name") in pack and ("CSM", "nom") not in pack
+
+def test_block_first_keys_are_stored_whole(tmp_path, flats):
+    content = build_pack(flats)
+    header = HEADER.unpack_from(content, 0)
+    count, blocks, keys_offset = header[3], header[4], header[7]
+    position = keys_offset
+    shared_counts = []
+    for _ in range(count):
+        shared, position = decode_varint(content, position)
+        length, position = decode_varint(content, position)
+        position += length
+        shared_counts.append(shared)
+    assert [shared_counts[block * BLOCK_SIZE] for block in range(blocks)] == [0] * blocks
+    # Les clés suivantes partagent leur préfixe : la table est plus petite que les clés complètes
+    assert sum(shared_counts) > 0
+    assert position - keys_offset < sum(len(f"{file_id}/{key}".encode("utf-8")) + 2
+                                        for file_id, flat in flats.items() for key in flat)
+
+def test_empty_pack(tmp_path):
+    with write_pack(tmp_path / "en.pack", {}) as pack:
+        assert len(pack) == 0
+        assert pack.get("SM", "name") is None
+        assert list(pack.items()) == []
+
+def test_invalid_pack_is_rejected(tmp_path):
+    path = tmp_path / "bad.pack"
+    path.write_bytes(b"\0" * HEADER.size)
+    with pytest.raises(ValueError):
+        TranslationPack(str(path))
+
+def test_load_locale_resolves_references_and_skips_common_file(tmp_path):
+    write_json(tmp_path / "fr" / "common.flat.json", {"rule": "Règle commune"})
+    write_json(tmp_path / "fr" / "SM.flat.json", {"a": "@common:rule", "b": "Texte"})
+    assert load_locale(str(tmp_path / "fr")) == {"SM": {"a": "Règle commune", "b": "Texte"}}
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from update_points_from_munitorum import FUZZY_CONFIDENCE_CEILING, UnitMatcher, normalize_unit_name
+
+def datasheets(*names):
+    return [{"name": name} for name in names]
+
+def test_normalize_unit_name():
+    assert normalize_unit_name("Captain in Gravis Armour!") == "captain in gravis armour"
+    assert normalize_unit_name("  T'au Commander ") == "tau commander"
+
+def test_exact_match_has_full_confidence():
+    matcher = UnitMatcher(datasheets("Captain", "Captain in Gravis Armour"))
+    matches = matcher.match("CAPTAIN")
+    assert matches[0]["datasheet"]["name"] == "Captain"
+    assert matches[0]["confidence"] == 1.0
+    assert matches[1]["confidence"] < 1.0
+
+def test_fuzzy_confidence_stays_below_one_even_above_score_100():
+    # Inclusion + 6 mots communs : score 110, au-dessus d'un nom identique
+    name = "Lord of the Deep Void Legion"
+    matcher = UnitMatcher(datasheets(name + " Command"))
+    match = matcher.match(name)[0]
+    assert match["score"] == 110
+    assert 0 < match["confidence"] < 1.0
+
+def test_fuzzy_confidence_reaching_its_maximum_is_capped():
+    # Mêmes mots, noms différents : le score partiel maximal est atteint
+    matcher = UnitMatcher(datasheets("Wolf Guard Wolf"))
+    match = matcher.match("Wolf Guard")[0]
+    assert match["confidence"] == FUZZY_CONFIDENCE_CEILING
+
+def test_exact_match_ranks_before_higher_scoring_fuzzy_match():
+    name = "Lord of the Deep Void Legion"
+    matcher = UnitMatcher(datasheets(name + " Command", name))
+    matches = matcher.match(name)
+    assert matches[0]["datasheet"]["name"] == name
+    assert matches[0]["confidence"] == 1.0
+    assert matches[1]["score"] > matches[0]["score"]
+
+def test_inclusion_without_shared_word_falls_back_to_full_scan():
+    matcher = UnitMatcher(datasheets("Overlord", "Warriors"))
+    assert [m["datasheet"]["name"] for m in matcher.match("Lord")] == ["Overlord"]
+
+def test_best_records_ambiguity():
+    matcher = UnitMatcher(datasheets("Intercessor Squad Alpha", "Intercessor Squad Beta"))
+    assert matcher.best("Intercessor Squad")["name"] == "Intercessor Squad Alpha"
+    assert matcher.ambiguities == [{
+        "unit": "Intercessor Squad",
+        "chosen": "Intercessor Squad Alpha",
+        "candidates": [{"name": "Intercessor Squad Alpha", "score": 70},
+                       {"name": "Intercessor Squad Beta", "score": 70}],
+    }]
+
+def test_no_match():
+    assert UnitMatcher(datasheets("Captain")).best("Hive Tyrant") is None
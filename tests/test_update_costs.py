@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+
+import pytest
+
+import update_costs
+from update_costs import build_cost_index, resolve_cost, sync_costs
+
+def points(cost):
+    return [{"cost": cost, "models": "1"}]
+
+ARCHIVE = {
+    "space_marines.json": {
+        "datasheets": [{"id": "captain", "points": points("85")}, {"id": "shared", "points": points("100")}],
+        "enhancements": [{"id": "armour", "cost": "15"}],
+        "stratagems": [{"id": "contempt", "cost": 1}],
+    },
+    # Même datasheet, coût différent : le fichier de la faction l'emporte
+    "bloodangels.json": {"datasheets": [{"id": "shared", "points": points("110")},
+                                        {"id": "sanguinor", "points": points("130")}]},
+    # Troisième coût pour "shared" : sans le fichier de la faction, conflit
+    "darkangels.json": {"datasheets": [{"id": "shared", "points": points("120")}]},
+}
+
+STRUCTURE = {
+    "SM.translated.json": {
+        "datasheets": [{"id": "captain", "points": points("80")}, {"id": "shared", "points": points("90")}],
+        "detachments": ["Gladius Task Force", {"name": "detachments.Gladius.name",
+                                               "enhancements": [{"id": "armour", "cost": "15"}],
+                                               "stratagems": [{"id": "contempt", "cost": 2}]}],
+    },
+    "CHBA.translated.json": {"datasheets": [{"id": "shared", "points": points("110")},
+                                            {"id": "sanguinor", "points": points("130")}]},
+    "CHSW.translated.json": {"datasheets": [{"id": "shared", "points": points("90")},
+                                            {"id": "unknown", "points": points("1")}]},
+}
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    for directory, files in (("archive", ARCHIVE), ("structure", STRUCTURE)):
+        (tmp_path / directory).mkdir()
+        for filename, data in files.items():
+            write_json(tmp_path / directory / filename, data)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def snapshot(tree):
+    return {path.name: path.read_bytes() for path in (tree / "structure").iterdir()}
+
+def test_cost_index_and_conflict_resolution(tree):
+    index = build_cost_index("archive")
+    assert index["datasheets"]["shared"] == {"SM": points("100"), "CHBA": points("110"), "CHDA": points("120")}
+    assert index["enhancements"] == {"armour": {"SM": "15"}}
+    assert index["stratagems"] == {"contempt": {"SM": 1}}
+
+    assert resolve_cost(index["datasheets"]["shared"], "CHBA") == (points("110"), False)
+    assert resolve_cost(index["datasheets"]["shared"], "CHSW") == (None, True)
+    assert resolve_cost({"SM": "15", "CHBA": "15"}, "CHSW") == ("15", False)
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_sync_rewrites_only_changed_files(tree, jobs):
+    before = snapshot(tree)
+
+    results = {r["file"]: r for r in sync_costs(jobs=jobs)}
+
+    assert results["SM.translated.json"]["changes"] == {
+        "datasheets": [{"id": "captain", "old": points("80"), "new": points("85")},
+                       {"id": "shared", "old": points("90"), "new": points("100")}],
+        "stratagems": [{"id": "contempt", "old": 2, "new": 1}],
+    }
+    assert results["CHSW.translated.json"]["conflicts"] == [
+        {"section": "datasheets", "id": "shared",
+         "values": {"SM": points("100"), "CHBA": points("110"), "CHDA": points("120")}}]
+    assert [results[name]["written"] for name in sorted(results)] == [False, False, True]
+    after = snapshot(tree)
+    assert after["CHBA.translated.json"] == before["CHBA.translated.json"]
+    assert after["CHSW.translated.json"] == before["CHSW.translated.json"]
+    sm = read_json(tree / "structure" / "SM.translated.json")
+    assert sm["detachments"][1]["stratagems"][0]["cost"] == 1
+    assert sm["detachments"][0] == "Gladius Task Force"
+
+    # Deuxième passage : plus aucun changement
+    assert all(not r["changes"] and not r["written"] for r in sync_costs(jobs=jobs))
+    assert snapshot(tree) == after
+
+def test_dry_run_and_changeset_restriction(tree):
+    before = snapshot(tree)
+    results = sync_costs(dry_run=True)
+    assert snapshot(tree) == before
+    assert not any(r["written"] for r in results)
+
+    results = {r["file"]: r for r in sync_costs(only_ids={"contempt"})}
+    assert results["SM.translated.json"]["changes"] == {"stratagems": [{"id": "contempt", "old": 2, "new": 1}]}
+    # Hors changeset : ni changement ni conflit
+    assert results["CHSW.translated.json"]["conflicts"] == []
+    assert read_json(tree / "structure" / "SM.translated.json")["datasheets"][0]["points"] == points("80")
+
+def test_main_writes_structured_diff(tree, monkeypatch):
+    write_json(tree / "structure" / "broken.translated.json", {"datasheets": "not a list"})
+    write_json(tree / "archive_changes.json", {"files": {"space_marines.json": {
+        "datasheets": {"added": [], "modified": [{"id": "captain"}], "removed": []}}}})
+    monkeypatch.setattr(sys, "argv", ["update_costs.py", "--changes", "archive_changes.json", "--diff", "diff.json"])
+
+    update_costs.main()
+
+    diff = read_json(tree / "diff.json")
+    assert (diff["dry_run"], diff["changeset"]) == (False, "archive_changes.json")
+    assert diff["files"] == {"SM.translated.json": {
+        "datasheets": [{"id": "captain", "old": points("80"), "new": points("85")}]}}
+    assert diff["conflicts"] == {}
+    assert list(diff["errors"]) == ["broken.translated.json"]
+
+def test_main_exits_when_changeset_is_missing(tree, monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["update_costs.py", "--changes", "missing.json"])
+    with pytest.raises(SystemExit):
+        update_costs.main()
+    assert not (tree / "costs_changes.json").exists()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mémoire de traduction partagée entre les factions.
+
+Les textes communs (capacités de base, noms d'armes, mots-clés...) sont
+extraits séparément dans chaque en/<id>.flat.json et fr/<id>.flat.json. Ce
+script les regroupe dans en/common.flat.json et fr/common.flat.json, indexés
+par une clé courte dérivée du texte anglais (ex: "Bolt pistol" -> bolt_pistol) ;
+dans les fichiers de faction la valeur devient une référence
+"@common:bolt_pistol".
+
+La mémoire est indexée par le texte anglais normalisé (espaces consécutifs
+réduits, espaces de bord retirés, voir normalize_text) : les variantes
+d'espacement d'un texte partagent la même entrée et la même traduction.
+L'entrée commune garde la variante la plus fréquente telle qu'elle est écrite,
+et seules les valeurs identiques à l'entrée deviennent des références : une
+référence redonne donc exactement le texte remplacé.
+
+Tout texte qui apparaît dans au moins --min-files fichiers est mis en commun,
+quelle que soit sa longueur, si ses traductions françaises concordent (les
+valeurs encore identiques à l'anglais ne comptent pas comme des traductions) ;
+sinon il est signalé comme conflit et reste dans les fichiers de faction.
+extract_and_replace_translations.py reprend la traduction commune pour les
+nouvelles clés dont le texte anglais est déjà en mémoire. --expand remet les
+textes dans les fichiers de faction.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+
+from json_io import dump_json, write_json_if_changed
+
+# Fichier commun, dans en/ et fr/
+COMMON_FILENAME = "common.flat.json"
+
+# Préfixe des valeurs qui renvoient à une entrée du fichier commun
+REFERENCE_PREFIX = "@common:"
+
+# Longueur maximale de la partie lisible d'une clé commune
+COMMON_KEY_LENGTH = 40
+
+# Nombre minimal de fichiers de faction où un texte doit apparaître pour être mis en commun
+DEFAULT_MIN_FILES = 2
+
+def common_key_for(text, taken):
+    """
+    Clé commune d'un texte : le texte en snake_case (casse, espaces et ponctuation
+    normalisés), tronqué, suivi d'un hash du texte exact s'il a été tronqué ou si
+    la clé est déjà prise par un autre texte (ex: variante d'espacement).
+    """
+    slug = re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+    key = slug[:COMMON_KEY_LENGTH].strip('_') or "text"
+    if len(slug) > COMMON_KEY_LENGTH or key in taken:
+        key = f"{key}_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:8]}"
+    return key
+
+def normalize_text(text):
+    """Forme d'un texte qui indexe la mémoire : espaces consécutifs réduits à un seul, bords retirés."""
+    return " ".join(text.split())
+
+def most_frequent(counter):
+    """Texte le plus fréquent d'un Counter ; à égalité, un texte déjà normalisé, puis le plus petit."""
+    return min(counter, key=lambda text: (-counter[text], text != normalize_text(text), text))
+
+def is_reference(value):
+    """Indique si une valeur de fichier à plat renvoie au fichier commun."""
+    return isinstance(value, str) and value.startswith(REFERENCE_PREFIX)
+
+def make_reference(common_key):
+    """Référence vers une entrée du fichier commun."""
+    return REFERENCE_PREFIX + common_key
+
+def resolve(value, common):
+    """Texte d'une valeur de fichier à plat (la référence est résolue si l'entrée commune existe)."""
+    if is_reference(value):
+        return common.get(value[len(REFERENCE_PREFIX):], value)
+    return value
+
+def expand_flat(flat, common):
+    """Copie d'un fichier à plat dont toutes les références sont remplacées par leur texte."""
+    return {key: resolve(value, common) for key, value in flat.items()}
+
+def common_path(directory):
+    """Chemin du fichier commun d'un dossier de langue."""
+    return os.path.join(directory, COMMON_FILENAME)
+
+def load_json(path):
+    """Charge un fichier JSON (dict vide s'il n'existe pas)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def load_common(directory):
+    """Fichier commun d'un dossier de langue (dict vide s'il n'existe pas)."""
+    return load_json(common_path(directory))
+
+def load_flat(path, common=None):
+    """
+    Lit un fichier à plat et résout ses références (dict vide s'il n'existe pas).
+
+    Lecteur à utiliser par tout script qui a besoin des textes d'un fichier à
+    plat ; common est le fichier commun déjà chargé (par défaut celui du dossier
+    du fichier).
+    """
+    if common is None:
+        common = load_common(os.path.dirname(path))
+    return expand_flat(load_json(path), common)
+
+def dangling_references(flat, common):
+    """Clés dont la valeur est une référence sans entrée dans le fichier commun."""
+    return [key for key, value in flat.items()
+            if is_reference(value) and value[len(REFERENCE_PREFIX):] not in common]
+
+def load_corpus(en_dir, fr_dir):
+    """
+    Charge les fichiers à plat de faction : liste de (nom de fichier, flat EN, flat FR ou None).
+
+    Le flat FR vaut None s'il n'existe pas ; le fichier commun est exclu.
+    """
+    corpus = []
+    for filename in sorted(os.listdir(en_dir)):
+        if not filename.endswith(".flat.json") or filename == COMMON_FILENAME:
+            continue
+        fr_path = os.path.join(fr_dir, filename)
+        fr_flat = load_json(fr_path) if os.path.exists(fr_path) else None
+        corpus.append((filename, load_json(os.path.join(en_dir, filename)), fr_flat))
+    return corpus
+
+def build_memory(corpus, common_en, common_fr, min_files=DEFAULT_MIN_FILES):
+    """
+    Choisit les textes à mettre en commun.
+
+    Les occurrences sont regroupées par texte anglais normalisé. Un texte
+    partagé (présent dans au moins min_files fichiers) dont les traductions
+    concordent, une fois normalisées elles aussi, est mis dans le fichier
+    commun quelle que soit sa longueur : noms d'armes et mots-clés compris.
+    L'entrée anglaise est la variante la plus fréquente du texte, l'entrée
+    française la traduction la plus fréquente (ou le texte anglais si aucune
+    occurrence n'est traduite). Une entrée déjà dans le fichier commun y reste
+    et garde sa clé.
+
+    Retourne (common_en, common_fr, conflicts) : les nouveaux fichiers communs
+    (clé commune -> texte) et, pour chaque texte partagé dont les traductions
+    divergent, la liste des traductions rencontrées.
+    """
+    # Texte normalisé -> clé commune existante
+    existing_keys = {normalize_text(text): key for key, text in common_en.items() if isinstance(text, str)}
+
+    # Texte normalisé -> fichiers, variantes anglaises exactes et traductions FR rencontrées
+    files = defaultdict(set)
+    variants = defaultdict(Counter)
+    translations = defaultdict(Counter)
+    for filename, en_flat, fr_flat in corpus:
+        for key, en_value in en_flat.items():
+            en_text = resolve(en_value, common_en)
+            if not isinstance(en_text, str) or is_reference(en_text) or not en_text.strip():
+                continue
+            text = normalize_text(en_text)
+            files[text].add(filename)
+            variants[text][en_text] += 1
+            fr_text = resolve(fr_flat.get(key, en_text), common_fr) if fr_flat is not None else en_text
+            if isinstance(fr_text, str) and not is_reference(fr_text) and normalize_text(fr_text) != text:
+                translations[text][fr_text] += 1
+
+    shared = []
+    conflicts = {}
+    for text in sorted(files):
+        if len(files[text]) < min_files and text not in existing_keys:
+            continue
+        if len({normalize_text(translation) for translation in translations[text]}) > 1:
+            conflicts[most_frequent(variants[text])] = list(translations[text])
+            continue
+        shared.append(text)
+
+    # Les clés existantes sont réservées avant d'en attribuer de nouvelles
+    taken = {existing_keys[text] for text in shared if text in existing_keys}
+    new_common_en = {}
+    new_common_fr = {}
+    for text in shared:
+        en_text = most_frequent(variants[text])
+        key = existing_keys.get(text)
+        if key is None:
+            key = common_key_for(en_text, taken)
+            taken.add(key)
+        new_common_en[key] = en_text
+        new_common_fr[key] = most_frequent(translations[text]) if translations[text] else en_text
+    return dict(sorted(new_common_en.items())), dict(sorted(new_common_fr.items())), conflicts
+
+def apply_memory(en_flat, fr_flat, common_en, common_fr, new_common_en, new_common_fr):
+    """
+    Réécrit un couple de fichiers à plat de faction avec des références vers le fichier commun.
+
+    Les valeurs sont d'abord résolues avec les anciens fichiers communs, puis les
+    textes identiques à une entrée de new_common_en sont remplacés par une
+    référence ; les autres (variantes d'espacement, anciennes références
+    retirées du commun) redeviennent du texte. Une valeur FR dont l'anglais
+    normalisé est en mémoire ne devient une référence que si elle est déjà la
+    traduction commune : une valeur non traduite le reste, aucun texte ne change.
+    """
+    key_by_text = {normalize_text(text): key for key, text in new_common_en.items()}
+    new_en = {}
+    common_keys = {}
+    for key, en_value in en_flat.items():
+        en_text = resolve(en_value, common_en)
+        common_key = key_by_text.get(normalize_text(en_text)) if isinstance(en_text, str) else None
+        if common_key:
+            common_keys[key] = common_key
+        new_en[key] = make_reference(common_key) if common_key and new_common_en[common_key] == en_text else en_text
+    if fr_flat is None:
+        return new_en, None
+
+    new_fr = {}
+    for key, fr_value in fr_flat.items():
+        fr_text = resolve(fr_value, common_fr)
+        common_key = common_keys.get(key)
+        new_fr[key] = make_reference(common_key) if common_key and new_common_fr[common_key] == fr_text else fr_text
+    return new_en, new_fr
+
+def corpus_size(corpus, common_en, common_fr):
+    """Taille sérialisée (octets) des fichiers à plat et communs, par langue : (EN, FR)."""
+    en_size = len(dump_json(common_en).encode('utf-8'))
+    fr_size = len(dump_json(common_fr).encode('utf-8'))
+    for _, en_flat, fr_flat in corpus:
+        en_size += len(dump_json(en_flat).encode('utf-8'))
+        if fr_flat is not None:
+            fr_size += len(dump_json(fr_flat).encode('utf-8'))
+    return en_size, fr_size
+
+def main():
+    parser = argparse.ArgumentParser(description="Mémoire de traduction partagée entre les factions")
+    parser.add_argument("--en-dir", default="en", help="Dossier des fichiers à plat anglais")
+    parser.add_argument("--fr-dir", default="fr", help="Dossier des fichiers à plat français")
+    parser.add_argument("--min-files", type=int, default=DEFAULT_MIN_FILES,
+                        help=f"Nombre minimal de fichiers où un texte apparaît (défaut: {DEFAULT_MIN_FILES})")
+    parser.add_argument("--expand", action="store_true",
+                        help="Remet tous les textes dans les fichiers de faction et supprime le fichier commun")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche le résultat sans écrire")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.en_dir):
+        print(f"❌ Le dossier '{args.en_dir}' n'existe pas")
+        sys.exit(1)
+
+    common_en = load_common(args.en_dir)
+    common_fr = load_common(args.fr_dir)
+    corpus = load_corpus(args.en_dir, args.fr_dir)
+    size_before = corpus_size(corpus, common_en, common_fr)
+
+    if args.expand:
+        new_common_en, new_common_fr, conflicts = {}, {}, {}
+    else:
+        new_common_en, new_common_fr, conflicts = build_memory(corpus, common_en, common_fr, args.min_files)
+
+    new_corpus = []
+    references = 0
+    for filename, en_flat, fr_flat in corpus:
+        new_en, new_fr = apply_memory(en_flat, fr_flat, common_en, common_fr, new_common_en, new_common_fr)
+        references += sum(1 for value in new_en.values() if is_reference(value))
+        new_corpus.append((filename, new_en, new_fr))
+    size_after = corpus_size(new_corpus, new_common_en, new_common_fr)
+
+    print(f"📁 {len(corpus)} fichiers de faction")
+    print(f"🔗 {len(new_common_en)} textes communs, {references} références dans les fichiers de faction")
+    print(f"📉 Taille EN : {size_before[0] / 1024:.0f} Ko -> {size_after[0] / 1024:.0f} Ko, "
+          f"FR : {size_before[1] / 1024:.0f} Ko -> {size_after[1] / 1024:.0f} Ko")
+    if conflicts:
+        print(f"⚠️ {len(conflicts)} textes partagés non mis en commun (traductions divergentes), ex:")
+        for text, variants in list(conflicts.items())[:5]:
+            print(f"    - {text[:60]!r}: {len(variants)} traductions")
+
+    if args.dry_run:
+        print("ℹ️ Mode dry-run : aucun fichier écrit")
+        return
+
+    written = 0
+    for filename, new_en, new_fr in new_corpus:
+        written += write_json_if_changed(os.path.join(args.en_dir, filename), new_en)
+        if new_fr is not None:
+            written += write_json_if_changed(os.path.join(args.fr_dir, filename), new_fr)
+    for directory, common in ((args.en_dir, new_common_en), (args.fr_dir, new_common_fr)):
+        if common:
+            written += write_json_if_changed(common_path(directory), common)
+        elif os.path.exists(common_path(directory)):
+            os.remove(common_path(directory))
+            written += 1
+    print(f"✅ {written} fichiers écrits")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture des packs binaires de traductions (dist/<langue>.pack).
+
+Un pack, généré par build_translation_packs.py, contient tous les fichiers
+<langue>/<id>.flat.json d'une langue, références au fichier commun déjà
+résolues, dans un format lisible sans tout charger :
+
+  - en-tête : magic, version, taille de bloc, nombre de clés et de blocs,
+    position des sections suivantes (entiers little-endian) ;
+  - index des blocs : position de la première entrée de chaque bloc ;
+  - positions des valeurs : count + 1 entiers, la valeur i est
+    valeurs[positions[i]:positions[i + 1]] ;
+  - table des clés "<id>/<clé>" triées (octets UTF-8), compressée par préfixe :
+    chaque entrée est (longueur du préfixe commun avec la clé précédente,
+    longueur du suffixe, suffixe), en varints ; la première entrée de chaque
+    bloc de BLOCK_SIZE clés est complète ;
+  - valeurs : textes UTF-8 concaténés.
+
+TranslationPack ouvre le pack avec mmap : une recherche fait une recherche
+dichotomique sur les premières clés des blocs puis parcourt un seul bloc.
+Ce module n'importe que la bibliothèque standard légère (pas de json ni re)
+pour garder un démarrage rapide.
+"""
+
+import mmap
+import os
+import struct
+
+# Identifiant du format
+PACK_MAGIC = b"W40KPACK"
+PACK_VERSION = 1
+
+# Nombre de clés par bloc (la première clé de chaque bloc est stockée complète)
+BLOCK_SIZE = 16
+
+# magic, version, taille de bloc, nombre de clés, nombre de blocs,
+# position de l'index des blocs, des positions des valeurs, des clés, des valeurs
+HEADER = struct.Struct("<8sHHIIIIII")
+UINT32 = struct.Struct("<I")
+
+# Dossier de sortie par défaut
+DIST_DIR = "dist"
+
+def pack_path_for(locale, output_dir=DIST_DIR):
+    """Chemin du pack d'une langue (ex: dist/fr.pack)."""
+    return os.path.join(output_dir, f"{locale}.pack")
+
+def pack_key(file_id, key):
+    """Clé d'une entrée dans le pack : identifiant du fichier à plat et clé de traduction."""
+    return f"{file_id}/{key}"
+
+def decode_varint(buffer, position):
+    """Lit un varint ; retourne (valeur, position suivante)."""
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+class TranslationPack:
+    """Lecteur d'un pack de traductions ouvert avec mmap."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.block_size, self.count, self.blocks, self._block_index_offset,
+         self._value_offsets_offset, self._keys_offset, self._values_offset) = HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} n'est pas un pack de traductions (version {PACK_VERSION})")
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _block_start(self, block):
+        """Position (dans le mmap) de la première entrée d'un bloc."""
+        return self._keys_offset + UINT32.unpack_from(self._mmap, self._block_index_offset + UINT32.size * block)[0]
+
+    def _first_key(self, block):
+        """Première clé (complète) d'un bloc."""
+        position = self._block_start(block)
+        _, position = decode_varint(self._mmap, position)
+        length, position = decode_varint(self._mmap, position)
+        return self._mmap[position:position + length]
+
+    def _value(self, index):
+        """Valeur de la i-ème entrée."""
+        start, end = struct.unpack_from("<II", self._mmap, self._value_offsets_offset + UINT32.size * index)
+        return self._mmap[self._values_offset + start:self._values_offset + end].decode('utf-8')
+
+    def _find(self, key):
+        """Index de l'entrée d'une clé (octets), ou None."""
+        # Dernier bloc dont la première clé est <= key
+        low, high = 0, self.blocks
+        while low < high:
+            middle = (low + high) // 2
+            if self._first_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        block = low - 1
+        if block < 0:
+            return None
+
+        position = self._block_start(block)
+        current = b""
+        first = block * self.block_size
+        for index in range(first, min(first + self.block_size, self.count)):
+            shared, position = decode_varint(self._mmap, position)
+            length, position = decode_varint(self._mmap, position)
+            current = current[:shared] + self._mmap[position:position + length]
+            position += length
+            if current == key:
+                return index
+            if current > key:
+                return None
+        return None
+
+    def get(self, file_id, key, default=None):
+        """Texte d'une clé d'un fichier à plat (ex: get("SM", "heavy_bolter"))."""
+        index = self._find(pack_key(file_id, key).encode('utf-8'))
+        return default if index is None else self._value(index)
+
+    def __contains__(self, item):
+        file_id, key = item
+        return self._find(pack_key(file_id, key).encode('utf-8')) is not None
+
+    def items(self):
+        """Parcourt toutes les entrées dans l'ordre : ((identifiant, clé), texte)."""
+        position = self._keys_offset
+        current = b""
+        for index in range(self.count):
+            shared, position = decode_varint(self._mmap, position)
+            length, position = decode_varint(self._mmap, position)
+            current = current[:shared] + self._mmap[position:position + length]
+            position += length
+            file_id, key = current.decode('utf-8').split('/', 1)
+            yield (file_id, key), self._value(index)
@@ -1,7 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synchronise les coûts de structure/*.translated.json avec les fichiers d'archive.
+
+Un index global id -> coût est construit en une passe sur tous les fichiers de
+archive/ (points des datasheets, coût des enhancements et des stratagèmes),
+puis appliqué à chaque fichier de structure, sur plusieurs processus avec
+--jobs. Quand un même id a des coûts différents selon les fichiers d'archive,
+celui du fichier de la faction l'emporte ; sans lui, le conflit est signalé et
+le coût n'est pas modifié.
+
+Un fichier de structure n'est réécrit que si un coût a changé ; les changements
+(ancien et nouveau coût par élément) et les conflits sont enregistrés dans
+costs_changes.json.
+
+Avec --changes, seuls les éléments ajoutés ou modifiés du changeset de
+diff_archive.py (ex: archive_changes.json, écrit par download_json_files.py)
+sont mis à jour ; les autres coûts ne sont pas comparés.
+"""
+
+import argparse
 import json
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
 
+from diff_archive import dirty_ids, load_changeset
+from json_io import write_json_atomic
+
+# Champ de coût de chaque section de l'index
+COST_FIELDS = {
+    "datasheets": "points",
+    "enhancements": "cost",
+    "stratagems": "cost"
+}
+
+# Rapport des changements par défaut
+CHANGES_FILE = "costs_changes.json"
+
 def get_faction_id_from_filename(filename):
     """
     Extrait l'ID de faction à partir du nom de fichier.
@@ -41,137 +80,181 @@ def get_faction_id_from_filename(filename):
     
     return filename_to_faction_id.get(filename)
 
+def owner_of(archive_filename):
+    """Faction propriétaire d'un fichier d'archive (son ID, à défaut le nom du fichier sans extension)."""
+    return get_faction_id_from_filename(archive_filename) or Path(archive_filename).stem
+
+def add_to_cost_index(index, archive_data, owner):
+    """Ajoute les coûts d'un fichier d'archive à l'index : section -> id -> {faction: coût}."""
+    for section, field in COST_FIELDS.items():
+        section_index = index.setdefault(section, {})
+        for item in archive_data.get(section, []):
+            item_id = item.get('id')
+            if item_id and field in item:
+                section_index.setdefault(item_id, {})[owner] = item[field]
+
+def build_cost_index(archive_dir):
+    """Index global des coûts de tous les fichiers JSON d'un dossier d'archive, en une passe."""
+    index = {section: {} for section in COST_FIELDS}
+    for archive_file in sorted(Path(archive_dir).glob("*.json")):
+        with open(archive_file, 'r', encoding='utf-8') as f:
+            add_to_cost_index(index, json.load(f), owner_of(archive_file.name))
+    return index
+
+def resolve_cost(candidates, faction_id):
+    """
+    Coût à appliquer pour une faction parmi les coûts d'un id par fichier d'archive.
+
+    Retourne (coût, conflit) : le coût du fichier de la faction s'il existe,
+    sinon le coût commun des autres fichiers ; conflit vaut True (et le coût
+    None) s'ils ne sont pas d'accord.
+    """
+    if faction_id in candidates:
+        return candidates[faction_id], False
+    values = list(candidates.values())
+    if all(value == values[0] for value in values[1:]):
+        return values[0], False
+    return None, True
+
+def cost_targets(translated_data):
+    """Éléments à coût d'un fichier de structure : (section, élément)."""
+    for datasheet in translated_data.get('datasheets', []):
+        yield 'datasheets', datasheet
+    # Enhancements et stratagèmes sont rangés dans les détachements
+    for detachment in translated_data.get('detachments', []):
+        if not isinstance(detachment, dict):
+            continue
+        for section in ('enhancements', 'stratagems'):
+            for item in detachment.get(section, []):
+                yield section, item
+
+def apply_cost_index(translated_data, faction_id, index, only_ids=None):
+    """
+    Applique l'index des coûts à un fichier de structure chargé.
+
+    Retourne (changements par section, conflits) ; seuls les coûts différents
+    de la valeur actuelle sont modifiés et comptés. only_ids restreint la mise
+    à jour à ces ids (éléments modifiés d'un changeset).
+    """
+    changes = {}
+    conflicts = []
+    for section, item in cost_targets(translated_data):
+        if only_ids is not None and item.get('id') not in only_ids:
+            continue
+        candidates = index[section].get(item.get('id'))
+        if not candidates:
+            continue
+        field = COST_FIELDS[section]
+        cost, conflict = resolve_cost(candidates, faction_id)
+        if conflict:
+            conflicts.append({"section": section, "id": item['id'], "values": candidates})
+        elif item.get(field) != cost:
+            changes.setdefault(section, []).append({"id": item['id'], "old": item.get(field), "new": cost})
+            item[field] = cost
+    return changes, conflicts
+
 def update_costs_for_faction(archive_file_path, translated_file_path):
     """
     Met à jour les coûts dans le fichier traduit en utilisant les données du fichier d'archive.
     """
+    index = {section: {} for section in COST_FIELDS}
+    with open(archive_file_path, 'r', encoding='utf-8') as f:
+        add_to_cost_index(index, json.load(f), owner_of(Path(archive_file_path).name))
+    result = sync_structure_file(translated_file_path, index)
+    return {section: len(result["changes"].get(section, [])) for section in COST_FIELDS}
+
+def sync_structure_file(translated_file_path, index, dry_run=False, only_ids=None):
+    """
+    Applique l'index des coûts à un fichier structure/<id>.translated.json.
+
+    Le fichier n'est réécrit que si un coût a changé. Retourne
+    {"file", "ok", "error", "changes", "conflicts", "written"}.
+    """
+    translated_file_path = Path(translated_file_path)
+    result = {"file": translated_file_path.name, "ok": True, "error": None,
+              "changes": {}, "conflicts": [], "written": False}
     try:
-        # Lire le fichier d'archive
-        with open(archive_file_path, 'r', encoding='utf-8') as f:
-            archive_data = json.load(f)
-        
-        # Lire le fichier traduit
         with open(translated_file_path, 'r', encoding='utf-8') as f:
             translated_data = json.load(f)
-        
-        updated_counts = {
-            'datasheets': 0,
-            'enhancements': 0,
-            'stratagems': 0
-        }
-        
-        # 1. Mettre à jour les coûts des datasheets
-        archive_datasheets = {}
-        for datasheet in archive_data.get('datasheets', []):
-            datasheet_id = datasheet.get('id')
-            if datasheet_id:
-                archive_datasheets[datasheet_id] = datasheet
-        
-        for translated_datasheet in translated_data.get('datasheets', []):
-            datasheet_id = translated_datasheet.get('id')
-            if datasheet_id in archive_datasheets:
-                archive_datasheet = archive_datasheets[datasheet_id]
-                
-                # Mettre à jour les points si ils existent dans l'archive
-                if 'points' in archive_datasheet:
-                    translated_datasheet['points'] = archive_datasheet['points']
-                    updated_counts['datasheets'] += 1
-        
-        # 2. Mettre à jour les coûts des enhancements
-        archive_enhancements = {}
-        for enhancement in archive_data.get('enhancements', []):
-            enhancement_id = enhancement.get('id')
-            if enhancement_id:
-                archive_enhancements[enhancement_id] = enhancement
-        
-        # Chercher les enhancements dans les détachements du fichier traduit
-        for detachment in translated_data.get('detachments', []):
-            if 'enhancements' in detachment:
-                for enhancement in detachment['enhancements']:
-                    enhancement_id = enhancement.get('id')
-                    if enhancement_id in archive_enhancements:
-                        archive_enhancement = archive_enhancements[enhancement_id]
-                        if 'cost' in archive_enhancement:
-                            enhancement['cost'] = archive_enhancement['cost']
-                            updated_counts['enhancements'] += 1
-        
-        # 3. Mettre à jour les coûts des stratagèmes
-        archive_stratagems = {}
-        for stratagem in archive_data.get('stratagems', []):
-            stratagem_id = stratagem.get('id')
-            if stratagem_id:
-                archive_stratagems[stratagem_id] = stratagem
-        
-        # Chercher les stratagèmes dans les détachements du fichier traduit
-        for detachment in translated_data.get('detachments', []):
-            if 'stratagems' in detachment:
-                for stratagem in detachment['stratagems']:
-                    stratagem_id = stratagem.get('id')
-                    if stratagem_id in archive_stratagems:
-                        archive_stratagem = archive_stratagems[stratagem_id]
-                        if 'cost' in archive_stratagem:
-                            stratagem['cost'] = archive_stratagem['cost']
-                            updated_counts['stratagems'] += 1
-        
-        # Sauvegarder le fichier traduit mis à jour
-        with open(translated_file_path, 'w', encoding='utf-8') as f:
-            json.dump(translated_data, f, indent=2, ensure_ascii=False)
-        
-        return updated_counts
-        
+        faction_id = translated_file_path.name[:-len(".translated.json")]
+        result["changes"], result["conflicts"] = apply_cost_index(translated_data, faction_id, index, only_ids)
+        if result["changes"] and not dry_run:
+            write_json_atomic(translated_file_path, translated_data)
+            result["written"] = True
     except Exception as e:
-        print(f"Erreur lors de la mise à jour de {translated_file_path}: {e}")
-        return {'datasheets': 0, 'enhancements': 0, 'stratagems': 0}
+        result.update(ok=False, error=str(e))
+    return result
+
+def sync_costs(archive_dir="archive", structure_dir="structure", jobs=1, dry_run=False, only_ids=None):
+    """Construit l'index des coûts puis l'applique à tous les fichiers de structure, sur jobs processus."""
+    index = build_cost_index(archive_dir)
+    translated_files = sorted(Path(structure_dir).glob("*.translated.json"))
+    sync = partial(sync_structure_file, index=index, dry_run=dry_run, only_ids=only_ids)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(sync, translated_files))
+    return [sync(translated_file) for translated_file in translated_files]
 
 def main():
     """
-    Fonction principale qui traite tous les fichiers d'archive et met à jour les coûts.
+    Fonction principale qui construit l'index des coûts de l'archive et met à jour les fichiers de structure.
     """
-    archive_dir = Path("archive")
-    structure_dir = Path("structure")
-    
-    if not archive_dir.exists():
-        print("Le dossier 'archive' n'existe pas.")
-        return
-    
-    if not structure_dir.exists():
-        print("Le dossier 'structure' n'existe pas.")
-        return
-    
-    total_updated = {
-        'datasheets': 0,
-        'enhancements': 0,
-        'stratagems': 0
-    }
-    
-    # Parcourir tous les fichiers JSON dans le dossier archive
-    for archive_file in archive_dir.glob("*.json"):
-        if archive_file.name == "core.json":
-            continue  # Ignorer le fichier core.json
-            
-        faction_id = get_faction_id_from_filename(archive_file.name)
-        if not faction_id:
-            print(f"Impossible de déterminer l'ID de faction pour {archive_file.name}")
-            continue
-        
-        # Construire le chemin du fichier traduit correspondant
-        translated_file = structure_dir / f"{faction_id}.translated.json"
-        
-        if not translated_file.exists():
-            print(f"Fichier traduit non trouvé pour {faction_id}: {translated_file}")
+    parser = argparse.ArgumentParser(description="Synchronise les coûts des fichiers de structure avec l'archive")
+    parser.add_argument("--archive-dir", default="archive", help="Dossier des fichiers d'archive (défaut: archive)")
+    parser.add_argument("--structure-dir", default="structure", help="Dossier des fichiers de structure (défaut: structure)")
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de processus (0 = nombre de CPU)")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche les changements sans écrire les fichiers de structure")
+    parser.add_argument("--diff", default=CHANGES_FILE, help=f"Rapport des changements (défaut: {CHANGES_FILE})")
+    parser.add_argument("--changes", help="Changeset de l'archive : ne met à jour que ses éléments ajoutés ou modifiés "
+                                          "(ex: archive_changes.json)")
+    args = parser.parse_args()
+
+    for directory in (args.archive_dir, args.structure_dir):
+        if not os.path.isdir(directory):
+            print(f"Le dossier '{directory}' n'existe pas.")
+            sys.exit(1)
+
+    only_ids = None
+    if args.changes:
+        changeset = load_changeset(args.changes)
+        if changeset is None:
+            print(f"Le changeset '{args.changes}' n'existe pas.")
+            sys.exit(1)
+        only_ids = dirty_ids(changeset)
+        print(f"{len(only_ids)} éléments modifiés dans {args.changes}")
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = sync_costs(args.archive_dir, args.structure_dir, jobs, args.dry_run, only_ids)
+
+    total_updated = {section: 0 for section in COST_FIELDS}
+    for result in results:
+        if not result["ok"]:
+            print(f"Erreur lors de la mise à jour de {result['file']}: {result['error']}")
             continue
-        
-        print(f"Traitement de {archive_file.name} -> {faction_id}")
-        updated_counts = update_costs_for_faction(archive_file, translated_file)
-        
-        # Ajouter aux totaux
-        for key in total_updated:
-            total_updated[key] += updated_counts[key]
-        
-        print(f"  ✓ {updated_counts['datasheets']} datasheets, {updated_counts['enhancements']} enhancements, {updated_counts['stratagems']} stratagèmes mis à jour")
-    
-    print(f"\nMise à jour terminée.")
-    print(f"Total: {total_updated['datasheets']} datasheets, {total_updated['enhancements']} enhancements, {total_updated['stratagems']} stratagèmes mis à jour.")
+        counts = {section: len(result["changes"].get(section, [])) for section in COST_FIELDS}
+        for section in COST_FIELDS:
+            total_updated[section] += counts[section]
+        if result["changes"]:
+            print(f"  ✓ {result['file']}: {counts['datasheets']} datasheets, {counts['enhancements']} enhancements, "
+                  f"{counts['stratagems']} stratagèmes mis à jour")
+        for conflict in result["conflicts"]:
+            print(f"  ⚠️ {result['file']}: coûts divergents pour {conflict['section']} {conflict['id']} "
+                  f"({', '.join(sorted(conflict['values']))}), non modifié")
+
+    write_json_atomic(args.diff, {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "dry_run": args.dry_run,
+        "changeset": args.changes,
+        "files": {result["file"]: result["changes"] for result in results if result["changes"]},
+        "conflicts": {result["file"]: result["conflicts"] for result in results if result["conflicts"]},
+        "errors": {result["file"]: result["error"] for result in results if not result["ok"]}
+    })
+
+    written = sum(1 for result in results if result["written"])
+    print(f"\nMise à jour terminée{' (dry-run, aucun fichier écrit)' if args.dry_run else ''}.")
+    print(f"Total: {total_updated['datasheets']} datasheets, {total_updated['enhancements']} enhancements, "
+          f"{total_updated['stratagems']} stratagèmes mis à jour dans {written} fichiers sur {len(results)}.")
+    print(f"Changements enregistrés dans {args.diff}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -5,11 +5,14 @@ Script pour mettre à jour les points des unités dans les fichiers d'archive
 avec les données du fichier munitorum_data_final.json
 """
 
+import argparse
 import json
 import os
 import re
 from pathlib import Path
 
+from json_io import write_json_atomic
+
 # Icônes pour améliorer la lisibilité
 ICONS = {
     "success": "✅",
@@ -79,73 +82,163 @@ def normalize_faction_name(name):
     fallback_name = normalized_name.lower().replace(" ", "").replace("'", "")
     return faction_mapping.get(normalized_name, fallback_name)
 
+# Caractères retirés des noms d'unités avant comparaison
+UNIT_NAME_STRIP_RE = re.compile(r'[^\w\s]')
+
+# Confiance maximale d'une correspondance partielle (1.0 est réservé au nom exact)
+FUZZY_CONFIDENCE_CEILING = 0.95
+
 def normalize_unit_name(name):
     """Normalise le nom d'unité pour la correspondance"""
     # Supprime les caractères spéciaux et met en minuscules
-    normalized = re.sub(r'[^\w\s]', '', name.lower())
+    normalized = UNIT_NAME_STRIP_RE.sub('', name.lower())
     return normalized.strip()
 
-def find_matching_unit(unit_name, datasheets):
-    """Trouve l'unité correspondante dans les datasheets avec une correspondance plus précise"""
-    normalized_search = normalize_unit_name(unit_name)
-    
-    # Liste pour stocker toutes les correspondances trouvées
-    matches = []
-    
-    for datasheet in datasheets:
-        datasheet_name = datasheet.get('name', '')
-        normalized_datasheet = normalize_unit_name(datasheet_name)
-        
+class UnitMatcher:
+    """
+    Apparie des noms d'unités du Munitorum aux datasheets d'une faction.
+
+    Les noms des datasheets sont normalisés une seule fois, dans un index des
+    noms exacts et un index inversé mot -> datasheets. Seules les datasheets
+    partageant un mot avec le nom cherché sont évaluées, avec le même score que
+    la comparaison complète : 100 pour un nom identique, sinon 50 par sens
+    d'inclusion plus 10 par mot commun. Une inclusion sans mot commun (ex:
+    "lord" dans "overlord") vaut au plus 50 et ne peut donc gagner que si aucun
+    candidat ne partage de mot : dans ce cas seulement, toutes les datasheets
+    sont parcourues. Le meilleur résultat est donc celui de la comparaison complète.
+
+    La confiance vaut 1.0 pour un nom identique ; une correspondance partielle
+    est ramenée au score maximal qu'elle pourrait atteindre (inclusion et tous
+    les mots des deux noms en commun) puis plafonnée à FUZZY_CONFIDENCE_CEILING.
+    """
+
+    def __init__(self, datasheets):
+        self.datasheets = datasheets
+        self.names = []
+        self.words = []
+        self.exact_index = {}
+        self.word_index = {}
+        self.ambiguities = []
+        for position, datasheet in enumerate(datasheets):
+            normalized = normalize_unit_name(datasheet.get('name', ''))
+            words = set(normalized.split())
+            self.names.append(normalized)
+            self.words.append(words)
+            self.exact_index.setdefault(normalized, []).append(position)
+            for word in words:
+                self.word_index.setdefault(word, []).append(position)
+
+    def score(self, normalized_search, search_words, position):
+        """Score d'une datasheet pour un nom normalisé (None si elle ne correspond pas)."""
+        normalized_datasheet = self.names[position]
         # Correspondance exacte
         if normalized_search == normalized_datasheet:
-            matches.append((datasheet, 100))  # Score parfait
+            return 100
         # Correspondance partielle
-        elif normalized_search in normalized_datasheet or normalized_datasheet in normalized_search:
-            # Calculer un score de similarité
-            score = 0
-            if normalized_search in normalized_datasheet:
-                score += 50
-            if normalized_datasheet in normalized_search:
-                score += 50
-            # Bonus pour les mots communs
-            search_words = set(normalized_search.split())
-            datasheet_words = set(normalized_datasheet.split())
-            common_words = search_words.intersection(datasheet_words)
-            score += len(common_words) * 10
-            matches.append((datasheet, score))
-    
-    if not matches:
-        return None
-    
-    # Trier par score et retourner le meilleur match
-    matches.sort(key=lambda x: x[1], reverse=True)
-    best_match = matches[0]
-    
-    # Si il y a plusieurs matches avec le même score, afficher un warning
-    if len(matches) > 1 and matches[0][1] == matches[1][1]:
-        print(f"{ICONS['warning']} Plusieurs correspondances trouvées pour '{unit_name}':")
-        for match, score in matches[:3]:  # Afficher les 3 premiers
-            print(f"    - {match.get('name', 'Unknown')} (score: {score})")
-    
-    return best_match[0]
+        score = 0
+        if normalized_search in normalized_datasheet:
+            score += 50
+        if normalized_datasheet in normalized_search:
+            score += 50
+        if not score:
+            return None
+        # Bonus pour les mots communs
+        return score + len(search_words & self.words[position]) * 10
+
+    def confidence(self, search_words, position, score):
+        """Confiance d'une correspondance partielle, dans [0, FUZZY_CONFIDENCE_CEILING]."""
+        # Inclusion et tous les mots des deux noms en commun
+        reachable = 50 + len(search_words | self.words[position]) * 10
+        return FUZZY_CONFIDENCE_CEILING * min(score, reachable) / reachable
+
+    def _scored(self, normalized_search, search_words, positions):
+        """Candidats correspondants, dans l'ordre des datasheets, avec leur score."""
+        scored = []
+        for position in positions:
+            score = self.score(normalized_search, search_words, position)
+            if score is not None:
+                scored.append((position, score))
+        return scored
+
+    def match(self, unit_name):
+        """
+        Correspondances classées pour un nom d'unité : liste de dicts
+        {"datasheet", "score", "confidence"}, du meilleur au moins bon score.
+
+        À score égal, l'ordre des datasheets dans le fichier est conservé.
+        """
+        normalized_search = normalize_unit_name(unit_name)
+        search_words = set(normalized_search.split())
+
+        candidates = set(self.exact_index.get(normalized_search, []))
+        for word in search_words:
+            candidates.update(self.word_index.get(word, []))
+        scored = self._scored(normalized_search, search_words, sorted(candidates))
+        if not scored:
+            scored = self._scored(normalized_search, search_words, range(len(self.datasheets)))
+
+        # Un nom identique passe avant une correspondance partielle, même de score supérieur
+        exact = set(self.exact_index.get(normalized_search, []))
+        scored.sort(key=lambda x: (x[0] in exact, x[1]), reverse=True)
+        return [
+            {"datasheet": self.datasheets[position], "score": score,
+             "confidence": 1.0 if position in exact else self.confidence(search_words, position, score)}
+            for position, score in scored
+        ]
+
+    def best(self, unit_name):
+        """
+        Meilleure correspondance pour un nom d'unité (None si aucune).
+
+        Si plusieurs datasheets ont le meilleur score, l'ambiguïté est ajoutée à
+        self.ambiguities : {"unit", "chosen", "candidates": [{"name", "score"}]}.
+        """
+        matches = self.match(unit_name)
+        if not matches:
+            return None
+        if len(matches) > 1 and matches[0]["score"] == matches[1]["score"]:
+            self.ambiguities.append({
+                "unit": unit_name,
+                "chosen": matches[0]["datasheet"].get('name', 'Unknown'),
+                "candidates": [
+                    {"name": m["datasheet"].get('name', 'Unknown'), "score": m["score"]}
+                    for m in matches if m["score"] == matches[0]["score"]
+                ]
+            })
+        return matches[0]["datasheet"]
+
+def print_ambiguity(ambiguity):
+    """Affiche un avertissement pour une correspondance ambiguë."""
+    print(f"{ICONS['warning']} Plusieurs correspondances trouvées pour '{ambiguity['unit']}':")
+    for candidate in ambiguity["candidates"][:3]:  # Afficher les 3 premiers
+        print(f"    - {candidate['name']} (score: {candidate['score']})")
+
+def find_matching_unit(unit_name, datasheets):
+    """Trouve l'unité correspondante dans les datasheets avec une correspondance plus précise"""
+    matcher = UnitMatcher(datasheets)
+    best_match = matcher.best(unit_name)
+    for ambiguity in matcher.ambiguities:
+        print_ambiguity(ambiguity)
+    return best_match
+
+def cost_summary(points):
+    """Premier coût d'une liste de points, pour l'affichage."""
+    return points[0].get('cost', 'N/A') if points else 'N/A'
+
+def compute_points_diff(munitorum_data, archive_dir):
+    """
+    Calcule en mémoire les mises à jour de points de toutes les factions.
+
+    Retourne (documents, diff) : documents associe chaque fichier d'archive chargé
+    à son contenu mis à jour ; diff contient, par fichier, les datasheets dont
+    les points changent réellement ("files"), les unités non trouvées
+    ("not_found") et les correspondances ambiguës ("ambiguities").
+    """
+    documents = {}
+    original_points = {}
+    matched_units = {}
+    diff = {"files": {}, "not_found": [], "ambiguities": [], "conflicts": [], "matched": 0}
 
-def update_points_in_archive():
-    """Met à jour les points dans les fichiers d'archive"""
-    
-    # Charger les données du munitorum
-    print(f"{ICONS['info']} Chargement du fichier munitorum_data_final.json...")
-    with open('munitorum_data_final.json', 'r', encoding='utf-8') as f:
-        munitorum_data = json.load(f)
-    
-    archive_dir = Path('archive')
-    if not archive_dir.exists():
-        print(f"{ICONS['error']} Le dossier 'archive' n'existe pas!")
-        return
-    
-    total_updates = 0
-    total_factions = 0
-    total_not_found = 0
-    
     # Parcourir chaque faction dans les données du munitorum
     for faction_data in munitorum_data.get('factions', []):
         faction_name = faction_data.get('name', '')
@@ -164,17 +257,19 @@ def update_points_in_archive():
         
         print(f"\n{ICONS['file']} Traitement de {faction_name} ({archive_filename})...")
         
-        # Charger le fichier d'archive
-        try:
-            with open(archive_path, 'r', encoding='utf-8') as f:
-                archive_data = json.load(f)
-        except Exception as e:
-            print(f"{ICONS['error']} Erreur lors du chargement de {archive_filename}: {e}")
-            continue
+        # Charger le fichier d'archive (une seule fois si plusieurs factions y correspondent)
+        if archive_filename not in documents:
+            try:
+                with open(archive_path, 'r', encoding='utf-8') as f:
+                    documents[archive_filename] = json.load(f)
+            except Exception as e:
+                print(f"{ICONS['error']} Erreur lors du chargement de {archive_filename}: {e}")
+                continue
+        archive_data = documents[archive_filename]
         
         datasheets = archive_data.get('datasheets', [])
-        faction_updates = 0
-        faction_not_found = 0
+        matcher = UnitMatcher(datasheets)
+        faction_matched = 0
         
         # Parcourir chaque unité de la faction
         for unit_data in units_data:
@@ -185,43 +280,111 @@ def update_points_in_archive():
                 continue
             
             # Trouver l'unité correspondante dans les datasheets
-            matching_datasheet = find_matching_unit(unit_name, datasheets)
+            ambiguity_count = len(matcher.ambiguities)
+            matching_datasheet = matcher.best(unit_name)
+            for ambiguity in matcher.ambiguities[ambiguity_count:]:
+                print_ambiguity(ambiguity)
             
-            if matching_datasheet:
-                # Mettre à jour les points
-                old_points = matching_datasheet.get('points', [])
-                old_cost = old_points[0].get('cost', 'N/A') if old_points else 'N/A'
-                new_cost = new_costs[0].get('cost', 'N/A') if new_costs else 'N/A'
-                
-                matching_datasheet['points'] = new_costs
-                
-                print(f"  {ICONS['success']} {unit_name}: {old_cost} → {new_cost}")
-                faction_updates += 1
-            else:
+            if not matching_datasheet:
                 print(f"  {ICONS['error']} {unit_name}: unité non trouvée dans les datasheets")
-                faction_not_found += 1
+                diff["not_found"].append({"faction": faction_name, "unit": unit_name})
+                continue
+            
+            diff["matched"] += 1
+            faction_matched += 1
+            key = (archive_filename, id(matching_datasheet))
+            original_points.setdefault(key, (matching_datasheet, matching_datasheet.get('points')))
+            matched_units.setdefault(key, []).append(unit_name)
+            
+            # Mettre à jour les points (en mémoire)
+            matching_datasheet['points'] = new_costs
         
-        # Sauvegarder le fichier d'archive mis à jour
-        if faction_updates > 0:
+        for ambiguity in matcher.ambiguities:
+            diff["ambiguities"].append(dict(ambiguity, faction=faction_name))
+        
+        print(f"  {ICONS['check']} {faction_name}: {faction_matched} unités appariées")
+
+    # Ne garder que les datasheets dont les points finaux diffèrent des points d'origine
+    for key, (datasheet, old_points) in original_points.items():
+        archive_filename = key[0]
+        units = matched_units[key]
+        if len(units) > 1:
+            # Plusieurs unités du Munitorum sur la même datasheet : la dernière l'emporte
+            diff["conflicts"].append({"file": archive_filename, "datasheet": datasheet.get('name', ''), "units": units})
+        new_points = datasheet.get('points')
+        if new_points != old_points:
+            diff["files"].setdefault(archive_filename, []).append({
+                "unit": units[-1],
+                "datasheet": datasheet.get('name', ''),
+                "id": datasheet.get('id'),
+                "old": old_points,
+                "new": new_points
+            })
+
+    return documents, diff
+
+def update_points_in_archive(dry_run=False, diff_path=None):
+    """
+    Met à jour les points dans les fichiers d'archive
+
+    Seuls les fichiers dont des points changent réellement sont réécrits, de
+    façon atomique. En mode dry_run, rien n'est écrit dans l'archive : le diff
+    est seulement affiché et, si diff_path est donné, sauvegardé en JSON.
+    """
+    
+    # Charger les données du munitorum
+    print(f"{ICONS['info']} Chargement du fichier munitorum_data_final.json...")
+    with open('munitorum_data_final.json', 'r', encoding='utf-8') as f:
+        munitorum_data = json.load(f)
+    
+    archive_dir = Path('archive')
+    if not archive_dir.exists():
+        print(f"{ICONS['error']} Le dossier 'archive' n'existe pas!")
+        return
+    
+    documents, diff = compute_points_diff(munitorum_data, archive_dir)
+    total_updates = sum(len(changes) for changes in diff["files"].values())
+    
+    # Afficher uniquement les points qui changent
+    print()
+    for archive_filename, changes in diff["files"].items():
+        print(f"{ICONS['file']} {archive_filename}")
+        for change in changes:
+            print(f"  {ICONS['success']} {change['datasheet']}: {cost_summary(change['old'])} → {cost_summary(change['new'])}")
+    if not diff["files"]:
+        print(f"{ICONS['skip']} Aucun point modifié")
+    
+    if diff_path:
+        write_json_atomic(diff_path, diff)
+        print(f"\n{ICONS['file']} Diff des points sauvegardé dans {diff_path}")
+    
+    if dry_run:
+        print(f"\n{ICONS['info']} Mode dry-run : aucun fichier modifié")
+    else:
+        # Sauvegarder uniquement les fichiers d'archive dont des points ont changé
+        for archive_filename in diff["files"]:
             try:
-                with open(archive_path, 'w', encoding='utf-8') as f:
-                    json.dump(archive_data, f, indent=2, ensure_ascii=False)
-                print(f"{ICONS['success']} {faction_name}: {faction_updates} unités mises à jour")
-                total_updates += faction_updates
-                total_factions += 1
+                write_json_atomic(archive_dir / archive_filename, documents[archive_filename])
+                print(f"{ICONS['success']} {archive_filename}: {len(diff['files'][archive_filename])} datasheets mises à jour")
             except Exception as e:
                 print(f"{ICONS['error']} Erreur lors de la sauvegarde de {archive_filename}: {e}")
-        else:
-            print(f"{ICONS['skip']} {faction_name}: aucune mise à jour nécessaire")
-        
-        if faction_not_found > 0:
-            total_not_found += faction_not_found
+        print(f"\n{ICONS['success']} Mise à jour terminée!")
     
-    print(f"\n{ICONS['success']} Mise à jour terminée!")
-    print(f"{ICONS['info']} Total: {total_updates} unités mises à jour dans {total_factions} factions")
-    if total_not_found > 0:
-        print(f"{ICONS['warning']} {total_not_found} unités non trouvées")
+    print(f"{ICONS['info']} Total: {total_updates} datasheets modifiées dans {len(diff['files'])} fichiers "
+          f"({diff['matched']} unités appariées)")
+    if diff["not_found"]:
+        print(f"{ICONS['warning']} {len(diff['not_found'])} unités non trouvées")
+    if diff["ambiguities"]:
+        print(f"{ICONS['warning']} {len(diff['ambiguities'])} correspondances ambiguës")
+    if diff["conflicts"]:
+        print(f"{ICONS['warning']} {len(diff['conflicts'])} datasheets appariées à plusieurs unités")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mise à jour des points de l'archive depuis munitorum_data_final.json")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Calcule et affiche le diff des points sans modifier l'archive")
+    parser.add_argument("--diff", default=None, help="Fichier JSON où sauvegarder le diff des points")
+    args = parser.parse_args()
+
     print(f"{ICONS['processing']} Début de la mise à jour des points depuis munitorum_data_final.json")
-    update_points_in_archive() 
\ No newline at end of file
+    update_points_in_archive(dry_run=args.dry_run, diff_path=args.diff)
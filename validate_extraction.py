@@ -1,154 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation des fichiers JSON du pipeline avec les schémas de schemas.py.
+
+Sans argument, valide l'extraction du Munitorum (munitorum_data_final.json) et
+affiche ses statistiques. Avec des fichiers, valide chacun d'eux avec le schéma
+déduit de son chemin ; avec --all, valide toute l'arborescence de données
+(archive/, structure/, en/, fr/ et l'extraction du Munitorum).
+
+Les références "@common:" des fichiers à plat doivent avoir une entrée dans le
+fichier commun de leur dossier. Les fichiers sont répartis sur --jobs processus
+et les erreurs, repérées par un JSON Pointer (ex: /datasheets/3/points/0/cost),
+sont regroupées dans un rapport JSON. Le code de sortie est 1 dès qu'un fichier est invalide.
+
+Utilisation:
+  python validate_extraction.py
+  python validate_extraction.py --all [--jobs 0] [--report validation_report.json]
+  python validate_extraction.py archive/SM.json fr/SM.flat.json
+"""
+
+import argparse
 import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from glob import glob
+
+from json_io import write_json_atomic
+from schemas import MUNITORUM_FILE, escape_pointer, schema_for_path, validate
+from translation_memory import COMMON_FILENAME, dangling_references, load_common
+
+# Rapport de validation
+REPORT_FILE = "validation_report.json"
+
+# Nombre d'erreurs affichées par fichier (toutes sont dans le rapport)
+PRINTED_ERRORS = 5
 
 def validate_data(data):
-    """Valide que les données extraites correspondent au format demandé"""
-    print("=== VALIDATION DES DONNÉES EXTRACTES ===\n")
-    
-    if not isinstance(data, dict) or "factions" not in data:
-        print("❌ ERREUR: Le format de base n'est pas correct")
-        return False
-    
-    factions = data["factions"]
-    if not isinstance(factions, list):
-        print("❌ ERREUR: 'factions' doit être une liste")
-        return False
-    
-    print(f"✅ Format de base correct: {len(factions)} factions trouvées\n")
-    
-    total_units = 0
-    total_enhancements = 0
-    valid_factions = 0
-    
-    for i, faction in enumerate(factions):
-        if not isinstance(faction, dict):
-            print(f"❌ ERREUR: Faction {i} n'est pas un dictionnaire")
-            continue
-        
-        if "name" not in faction or "units" not in faction or "enhancements" not in faction:
-            print(f"❌ ERREUR: Faction {i} manque de champs requis")
-            continue
-        
-        faction_name = faction["name"]
-        units = faction["units"]
-        enhancements = faction["enhancements"]
-        
-        print(f"Faction: {faction_name}")
-        
-        # Validation des unités
-        if not isinstance(units, list):
-            print(f"  ❌ ERREUR: 'units' n'est pas une liste")
-            continue
-        
-        units_count = 0
-        for unit in units:
-            if not isinstance(unit, dict) or "name" not in unit or "costs" not in unit:
-                print(f"  ❌ ERREUR: Format d'unité incorrect")
-                continue
-            
-            costs = unit["costs"]
-            if not isinstance(costs, list):
-                print(f"  ❌ ERREUR: 'costs' n'est pas une liste pour {unit['name']}")
-                continue
-            
-            for cost in costs:
-                if not isinstance(cost, dict) or "cost_name" not in cost or "cost" not in cost:
-                    print(f"  ❌ ERREUR: Format de coût incorrect pour {unit['name']}")
-                    continue
-            
-            units_count += 1
-        
-        total_units += units_count
-        print(f"  ✅ {units_count} unités valides")
-        
-        # Validation des améliorations
-        if not isinstance(enhancements, list):
-            print(f"  ❌ ERREUR: 'enhancements' n'est pas une liste")
-            continue
-        
-        enhancements_count = 0
-        for category in enhancements:
-            if not isinstance(category, dict) or "category" not in category or "enhancements" not in category:
-                print(f"  ❌ ERREUR: Format de catégorie d'amélioration incorrect")
-                continue
-            
-            category_enhancements = category["enhancements"]
-            if not isinstance(category_enhancements, list):
-                print(f"  ❌ ERREUR: 'enhancements' dans la catégorie n'est pas une liste")
+    """Valide l'extraction du Munitorum avec son schéma et affiche ses statistiques ; retourne True si elle est valide."""
+    print("=== VALIDATION DES DONNÉES EXTRAITES ===\n")
+
+    errors = validate(data, "munitorum")
+    if isinstance(data, dict) and isinstance(data.get("factions"), list):
+        factions = data["factions"]
+        print(f"{len(factions)} factions trouvées\n")
+        for faction in factions:
+            if not isinstance(faction, dict):
                 continue
-            
-            for enhancement in category_enhancements:
-                if not isinstance(enhancement, dict) or "name" not in enhancement or "cost" not in enhancement:
-                    print(f"  ❌ ERREUR: Format d'amélioration incorrect")
-                    continue
-                
-                enhancements_count += 1
-        
-        total_enhancements += enhancements_count
-        print(f"  ✅ {enhancements_count} améliorations valides")
-        print()
-        
-        valid_factions += 1
-    
-    print(f"=== RÉSUMÉ DE VALIDATION ===")
-    print(f"✅ Factions valides: {valid_factions}/{len(factions)}")
-    print(f"✅ Total des unités: {total_units}")
-    print(f"✅ Total des améliorations: {total_enhancements}")
-    
-    # Vérification du format demandé
-    print(f"\n=== VÉRIFICATION DU FORMAT DEMANDÉ ===")
-    
-    # Exemple de format attendu
-    expected_format = {
-        "factions": [
-            {
-                "name": "Nom de la Faction",
-                "units": [
-                    {
-                        "name": "Nom de l'unité",
-                        "costs": [
-                            {
-                                "cost_name": "Nom du coût (ex: 3 models)",
-                                "cost": "valeur sans 'pts', ex: 80 ou +60"
-                            }
-                        ]
-                    }
-                ],
-                "enhancements": [
-                    {
-                        "category": "Nom de la catégorie",
-                        "enhancements": [
-                            {
-                                "name": "Nom de l'amélioration",
-                                "cost": "valeur sans 'pts', ex: 15"
-                            }
-                        ]
-                    }
-                ]
-            }
-        ]
-    }
-    
-    print("✅ Le format extrait correspond exactement au format demandé")
+            units = faction.get("units")
+            categories = faction.get("enhancements")
+            enhancements = sum(len(category.get("enhancements") or []) for category in categories
+                               if isinstance(category, dict)) if isinstance(categories, list) else 0
+            print(f"Faction: {faction.get('name')}: "
+                  f"{len(units) if isinstance(units, list) else 0} unités, {enhancements} améliorations")
+
+    print(f"\n=== RÉSUMÉ DE VALIDATION ===")
+    if errors:
+        print(f"❌ {len(errors)} erreurs :")
+        for error in errors:
+            print(f"  {error['pointer'] or '/'} : {error['message']}")
+        return False
+
+    print("✅ Le format extrait correspond au format demandé")
     print("✅ Les coûts sont au format numérique sans 'pts'")
     print("✅ Les améliorations sont groupées par catégorie")
-    print("✅ Les noms des unités et améliorations sont préservés")
-    
     return True
 
-if __name__ == "__main__":
+@lru_cache(maxsize=None)
+def common_for(directory):
+    """Fichier commun d'un dossier de langue, chargé une fois par processus."""
+    return load_common(directory)
+
+def reference_errors(path, flat):
+    """Erreurs des références "@common:" d'un fichier à plat qui n'ont pas d'entrée dans le fichier commun."""
+    # Le fichier commun ne peut pas lui-même contenir de références
+    common = {} if os.path.basename(path) == COMMON_FILENAME else common_for(os.path.dirname(os.path.abspath(path)))
+    return [{"pointer": f"/{escape_pointer(key)}",
+             "message": f"référence {flat[key]} sans entrée dans {COMMON_FILENAME}"}
+            for key in dangling_references(flat, common)]
+
+def validate_file(path):
+    """Valide un fichier avec le schéma déduit de son chemin ; retourne son résultat."""
+    result = {"file": path, "schema": schema_for_path(path), "errors": []}
+    if result["schema"] is None:
+        result["errors"].append({"pointer": "", "message": "aucun schéma pour ce fichier"})
+        return result
     try:
-        with open("munitorum_data_final.json", 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        
-        validate_data(data)
-        
-    except FileNotFoundError:
-        print("❌ ERREUR: Fichier munitorum_data_final.json non trouvé")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"❌ ERREUR: JSON invalide: {e}")
+    except (OSError, json.JSONDecodeError) as e:
+        result["errors"].append({"pointer": "", "message": f"lecture impossible : {e}"})
+        return result
+    result["errors"] = validate(data, result["schema"])
+    if result["schema"] == "flat" and not result["errors"]:
+        try:
+            result["errors"] = reference_errors(path, data)
+        except (OSError, json.JSONDecodeError) as e:
+            result["errors"].append({"pointer": "", "message": f"lecture du fichier commun impossible : {e}"})
+    return result
+
+def data_files(root="."):
+    """Fichiers de l'arborescence de données couverts par un schéma."""
+    patterns = [
+        os.path.join(root, "archive", "*.json"),
+        os.path.join(root, "structure", "*.translated.json"),
+        os.path.join(root, "en", "*.json"),
+        os.path.join(root, "fr", "*.json"),
+        os.path.join(root, MUNITORUM_FILE),
+    ]
+    paths = sorted(path for pattern in patterns for path in glob(pattern))
+    return [path for path in paths if schema_for_path(path) is not None]
+
+def validate_files(paths, jobs=1, report_path=REPORT_FILE):
+    """Valide des fichiers sur jobs processus, affiche les erreurs et écrit le rapport ; retourne les résultats."""
+    start = time.perf_counter()
+    if jobs > 1 and len(paths) > 1:
+        # Les plus gros fichiers d'abord, pour équilibrer les processus
+        by_size = sorted(paths, key=lambda path: -os.path.getsize(path) if os.path.exists(path) else 0)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths))) as executor:
+            results = {result["file"]: result for result in executor.map(validate_file, by_size)}
+        results = [results[path] for path in paths]
+    else:
+        results = [validate_file(path) for path in paths]
+    wall_clock = time.perf_counter() - start
+
+    invalid = [result for result in results if result["errors"]]
+    for result in invalid:
+        print(f"❌ {result['file']} ({result['schema']}) : {len(result['errors'])} erreurs")
+        for error in result["errors"][:PRINTED_ERRORS]:
+            print(f"  {error['pointer'] or '/'} : {error['message']}")
+        if len(result["errors"]) > PRINTED_ERRORS:
+            print(f"  ... {len(result['errors']) - PRINTED_ERRORS} autres erreurs dans {report_path}")
+
+    counts = {}
+    for result in results:
+        counts[result["schema"]] = counts.get(result["schema"], 0) + 1
+    write_json_atomic(report_path, {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": len(results),
+        "invalid_files": len(invalid),
+        "errors": sum(len(result["errors"]) for result in results),
+        "schemas": counts,
+        "results": {result["file"]: {"schema": result["schema"], "errors": result["errors"]} for result in invalid},
+    })
+
+    print(f"\n{'❌' if invalid else '✅'} {len(results) - len(invalid)}/{len(results)} fichiers valides "
+          f"({', '.join(f'{name} {count}' for name, count in sorted(counts.items(), key=lambda item: str(item[0])))}) "
+          f"en {wall_clock:.2f} s")
+    print(f"📁 Rapport : {report_path}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Valide les fichiers JSON du pipeline avec leurs schémas")
+    parser.add_argument("files", nargs="*", help=f"Fichiers à valider (défaut: {MUNITORUM_FILE})")
+    parser.add_argument("--all", action="store_true", help="Valide toute l'arborescence de données")
+    parser.add_argument("--root", default=".", help="Racine de l'arborescence pour --all (défaut: .)")
+    parser.add_argument("--jobs", type=int, default=0, help="Nombre de processus (0 = nombre de CPU)")
+    parser.add_argument("--report", default=REPORT_FILE, help=f"Rapport de validation (défaut: {REPORT_FILE})")
+    args = parser.parse_args()
+
+    if not args.all and not args.files:
+        try:
+            with open(MUNITORUM_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ ERREUR: Fichier {MUNITORUM_FILE} non trouvé")
+            sys.exit(1)
+        except json.JSONDecodeError as e:
+            print(f"❌ ERREUR: JSON invalide: {e}")
+            sys.exit(1)
+        sys.exit(0 if validate_data(data) else 1)
+
+    paths = data_files(args.root) if args.all else args.files
+    if not paths:
+        print("❌ Aucun fichier à valider")
         sys.exit(1)
-    except Exception as e:
-        print(f"❌ ERREUR: {e}")
-        sys.exit(1) 
\ No newline at end of file
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    results = validate_files(paths, jobs, args.report)
+    sys.exit(1 if any(result["errors"] for result in results) else 0)
+
+if __name__ == "__main__":
+    main()